@@ -0,0 +1,47 @@
+"""Benchmark of the exchange format of the redundancy removal input.
+
+Compares writing and reading A, b and x_bounds with
+:meth:`~pomato.grid.GridModel.write_cbco_info` and :meth:`~pomato.grid.GridModel.read_cbco_info`
+as text (*csv*) and binary (*npy*) files, for N-1 ptdf matrices of 10k x 118 and
+100k x 450 random entries.
+
+Run from the repository root: python benchmarks/benchmark_cbco_io.py
+"""
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import pomato
+from benchmark_lodf import WDIR, DATASETS, timeit
+
+if __name__ == "__main__":
+    data_file, options_file = DATASETS["NREL-118"]
+    with open(WDIR.joinpath(options_file)) as opt_file:
+        options = pomato.tools.add_default_options(json.load(opt_file))
+    data = pomato.data.DataManagement(options, WDIR)
+    data.logger.setLevel(logging.ERROR)
+    data.load_data(data_file)
+
+    wdir = Path(tempfile.mkdtemp())
+    grid_model = pomato.grid.GridModel(wdir, None, data, options)
+    grid_model.logger.setLevel(logging.ERROR)
+    folder = wdir.joinpath("data_temp/julia_files/cbco_data")
+
+    rng = np.random.default_rng(0)
+    for rows, columns in [(10000, 118), (100000, 450)]:
+        A, b = rng.normal(size=(rows, columns)), rng.uniform(100, 1000, size=(rows, 1))
+        x_bounds = rng.uniform(100, 1000, size=(columns, 1))
+        for file_format in ["csv", "npy"]:
+            _, t_write = timeit(lambda: grid_model.write_cbco_info(folder, "py", file_format=file_format,
+                                                                   A=A, b=b, x_bounds=x_bounds), repeat=1)
+            cbco_info, t_read = timeit(lambda: grid_model.read_cbco_info(folder, "py", file_format=file_format),
+                                       repeat=1)
+            size = sum(f.stat().st_size for f in folder.glob(f"*_py.{file_format}"))/1e6
+            assert np.array_equal(cbco_info["A"], A)
+            print(f"{rows} x {columns} {file_format}: write {t_write:.2f} s, read {t_read:.2f} s, "
+                  f"{size:.0f} MB")
+    shutil.rmtree(wdir, ignore_errors=True)
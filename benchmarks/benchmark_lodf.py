@@ -0,0 +1,55 @@
+"""Benchmark of the N-1 LODF calculation.
+
+Compares the closed form, vectorized :meth:`~pomato.grid.GridTopology.create_n_1_lodf_matrix`
+with the previous implementation, which calculated the lodf column by column with
+:meth:`~pomato.grid.GridTopology.create_lodf`, on the NREL-118 and DE datasets.
+
+Run from the repository root: python benchmarks/benchmark_lodf.py
+"""
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+import pomato
+
+WDIR = Path(__file__).parent.parent.joinpath("examples")
+DATASETS = {"NREL-118": ("data_input/nrel_118.zip", "profiles/nrel118.json"),
+            "DE": ("data_input/dataset_de.zip", "profiles/de.json")}
+
+def load_grid(data_file, options_file):
+    """Load dataset and return a GridTopology with calculated parameters."""
+    with open(WDIR.joinpath(options_file)) as opt_file:
+        options = pomato.tools.add_default_options(json.load(opt_file))
+    data = pomato.data.DataManagement(options, WDIR)
+    data.logger.setLevel(logging.ERROR)
+    data.load_data(data_file)
+    grid = pomato.grid.GridTopology(options)
+    grid.logger.setLevel(logging.ERROR)
+    grid.calculate_parameters(data.nodes, data.lines)
+    return grid
+
+def columnwise_lodf(grid):
+    """Previous implementation, one call of create_lodf per outage."""
+    lines = list(range(0, len(grid.lines)))
+    return np.hstack([grid.create_lodf(lines, [outage]) for outage in lines])
+
+def timeit(func, repeat=3):
+    """Return the result and the best time of multiple runs."""
+    times = []
+    for _ in range(0, repeat):
+        t_start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t_start)
+    return result, min(times)
+
+if __name__ == "__main__":
+    for name, (data_file, options_file) in DATASETS.items():
+        grid = load_grid(data_file, options_file)
+        lodf_columnwise, t_columnwise = timeit(lambda: columnwise_lodf(grid), repeat=1)
+        lodf_vectorized, t_vectorized = timeit(grid.create_n_1_lodf_matrix)
+        print(f"{name}: {len(grid.lines)} lines, column-wise {t_columnwise:.3f} s, "
+              f"vectorized {t_vectorized:.3f} s, speed-up {t_columnwise/t_vectorized:.0f}x, "
+              f"max abs deviation {np.max(np.abs(lodf_columnwise - lodf_vectorized)):.2e}")
@@ -0,0 +1,109 @@
+"""Benchmark of the topology checks of GridTopology.
+
+Compares the vectorized :meth:`~pomato.grid.GridTopology.create_incidence_matrix`,
+:meth:`~pomato.grid.GridTopology.check_grid_topology`,
+:meth:`~pomato.grid.GridTopology.add_number_of_systems` and
+:meth:`~pomato.grid.GridTopology.create_contingency_groups` with the previous,
+loop based, implementations on synthetic grids of 1k to 20k lines. Since these
+methods only depend on the topology, the ptdf is an all-zero placeholder, i.e. no
+line is radial by its ptdf.
+
+Run from the repository root: python benchmarks/benchmark_topology.py
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+import pomato
+from benchmark_lodf import timeit
+
+def synthetic_grid(number_of_lines, seed=0):
+    """Random meshed grid with 1.5 lines per node, of which 10% are double lines."""
+    rng = np.random.default_rng(seed)
+    number_of_nodes = int(number_of_lines/1.5)
+    nodes = pd.DataFrame(index=["n" + str(i) for i in range(0, number_of_nodes)])
+    nodes["slack"] = False
+    nodes.loc["n0", "slack"] = True
+    # spanning tree, additional meshing lines and double lines
+    node_i = np.hstack([np.arange(1, number_of_nodes), rng.integers(0, number_of_nodes, number_of_lines)])
+    node_j = np.hstack([rng.integers(0, np.arange(1, number_of_nodes)), rng.integers(0, number_of_nodes, number_of_lines)])
+    node_i, node_j = node_i[node_i != node_j], node_j[node_i != node_j]
+    number_of_double_lines = int(number_of_lines/10)
+    node_i = np.hstack([node_i[:number_of_lines - number_of_double_lines], node_i[:number_of_double_lines]])
+    node_j = np.hstack([node_j[:number_of_lines - number_of_double_lines], node_j[:number_of_double_lines]])
+    lines = pd.DataFrame(index=["l" + str(i) for i in range(0, len(node_i))])
+    lines["node_i"], lines["node_j"] = nodes.index[node_i], nodes.index[node_j]
+    lines["b"], lines["maxflow"], lines["contingency"] = 1., 100., True
+
+    grid = pomato.grid.GridTopology()
+    grid.logger.setLevel(logging.ERROR)
+    grid.nodes, grid.lines = nodes, lines
+    grid.ptdf = np.broadcast_to(np.zeros(1), (len(lines), len(nodes)))
+    return grid
+
+def legacy_incidence_matrix(grid):
+    incidence = np.zeros((len(grid.lines), len(grid.nodes)))
+    for i, elem in enumerate(grid.lines.index):
+        incidence[i, grid.nodes.index.get_loc(grid.lines.node_i[elem])] = 1
+        incidence[i, grid.nodes.index.get_loc(grid.lines.node_j[elem])] = -1
+    return incidence
+
+def legacy_check_grid_topology(grid):
+    radial_nodes = []
+    for node in grid.nodes.index:
+        if len(grid.lines[(grid.lines.node_i == node) | (grid.lines.node_j == node)]) < 2:
+            radial_nodes.append(node)
+    radial_lines = []
+    for idx, line in enumerate(grid.lines.index):
+        tmp = np.around(np.abs(grid.ptdf[idx, :]), decimals=3)
+        if 1 in tmp:
+            radial_lines.append(line)
+    condition = (grid.lines.node_i.isin(radial_nodes)) | \
+                (grid.lines.node_j.isin(radial_nodes)) & grid.lines.contingency
+    grid.lines.loc[condition, "contingency"] = False
+    condition = grid.lines.index.isin(radial_lines) & grid.lines.contingency
+    grid.lines.loc[condition, "contingency"] = False
+
+def legacy_add_number_of_systems(grid):
+    tmp = grid.lines[["node_i", "node_j"]].copy()
+    tmp.loc[:, "systems"] = 1
+    tmp = tmp.groupby(["node_i", "node_j"]).sum().reset_index()
+    grid.lines.loc[:, "systems"] = 1
+    grid.lines.loc[:, "no"] = 1
+    for node_i, node_j, systems in zip(tmp.node_i, tmp.node_j, tmp.systems):
+        condition = (grid.lines.node_i == node_i)&(grid.lines.node_j == node_j)
+        grid.lines.loc[condition, "systems"] = systems
+        grid.lines.loc[condition, "no"] = np.array([nr for nr in range(0, systems)])
+
+def legacy_contingency_groups(grid):
+    combined_contingencies = {line : [line] for line in grid.lines.index}
+    double_lines = list(grid.lines[grid.lines.systems == 2].index)
+    for line in double_lines:
+        condition = (grid.lines.loc[double_lines, ["node_i", "node_j"]].apply(tuple, axis=1) == tuple(grid.lines.loc[line, ["node_i", "node_j"]])).values
+        double_line = list(grid.lines.loc[double_lines][condition].index)
+        double_line_idx = [grid.lines.index.get_loc(line) for line in double_line]
+        if not any(np.sum(np.around(np.abs(grid.ptdf[double_line_idx, :]), decimals=3), axis=0) == 1):
+            combined_contingencies[line] = double_line
+    return combined_contingencies
+
+if __name__ == "__main__":
+    for number_of_lines in [1000, 5000, 10000, 20000]:
+        legacy, vectorized = synthetic_grid(number_of_lines), synthetic_grid(number_of_lines)
+        times = {}
+        for name, legacy_func, func in [
+                ("incidence", legacy_incidence_matrix, lambda grid: grid.create_incidence_matrix()),
+                ("topology", legacy_check_grid_topology, lambda grid: grid.check_grid_topology()),
+                ("systems", legacy_add_number_of_systems, lambda grid: grid.add_number_of_systems()),
+                ("groups", legacy_contingency_groups, lambda grid: grid.create_contingency_groups())]:
+            result_legacy, t_legacy = timeit(lambda: legacy_func(legacy), repeat=1)
+            result, t_vectorized = timeit(lambda: func(vectorized), repeat=1)
+            if isinstance(result, np.ndarray):
+                assert np.array_equal(result_legacy, result)
+            else:
+                assert result_legacy == result
+            times[name] = (t_legacy, t_vectorized)
+        for column in ["contingency", "systems", "no"]:
+            assert legacy.lines[column].equals(vectorized.lines[column])
+        print(f"{len(legacy.lines)} lines, {len(legacy.nodes)} nodes: " + ", ".join(
+            f"{name} {t_legacy:.2f} s -> {t_vectorized:.3f} s" for name, (t_legacy, t_vectorized) in times.items()))
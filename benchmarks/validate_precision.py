@@ -0,0 +1,56 @@
+"""Validation of grid parameters in reduced precision.
+
+Reports the maximum N-0 and N-1 flow deviation when the ptdf and lodf are used in
+single instead of double precision (option *dtype* of the grid options), see
+:meth:`~pomato.grid.GridTopology.precision_deviation`, and compares the time of
+the N-0 flow calculation.
+
+Flows result from the demand of the first 24 timesteps of each dataset, which is
+supplied by all plants proportionally to their capacity.
+
+Run from the repository root: python benchmarks/validate_precision.py
+"""
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+import pomato
+from benchmark_lodf import DATASETS, WDIR, timeit
+
+def load_data(data_file, options_file):
+    """Load dataset and return DataManagement and GridTopology."""
+    with open(WDIR.joinpath(options_file)) as opt_file:
+        options = pomato.tools.add_default_options(json.load(opt_file))
+    data = pomato.data.DataManagement(options, WDIR)
+    data.logger.setLevel(logging.ERROR)
+    data.load_data(data_file)
+    grid = pomato.grid.GridTopology(options)
+    grid.logger.setLevel(logging.ERROR)
+    grid.calculate_parameters(data.nodes, data.lines)
+    return data, grid
+
+def nodal_injections(data, timesteps=24):
+    """Demand of the first timesteps, supplied proportionally to installed capacity."""
+    demand = data.demand_el.pivot_table(index="timestep", columns="node", values="demand_el",
+                                        aggfunc="sum")
+    demand = demand.iloc[:timesteps].reindex(columns=data.nodes.index, fill_value=0).fillna(0)
+    capacity = data.plants.groupby("node").g_max.sum().reindex(data.nodes.index, fill_value=0)
+    generation = np.outer(demand.sum(axis=1), capacity/capacity.sum())
+    return generation - demand.values
+
+if __name__ == "__main__":
+    for name, (data_file, options_file) in DATASETS.items():
+        data, grid = load_data(data_file, options_file)
+        injections = nodal_injections(data)
+        deviation = grid.precision_deviation(injections, dtype="float32")
+        ptdf, ptdf_32 = grid.ptdf.astype("float64"), grid.ptdf.astype("float32")
+        injections_64 = np.tile(injections.T, 100)
+        injections_32 = injections_64.astype("float32")
+        _, t_64 = timeit(lambda: np.dot(ptdf, injections_64), repeat=5)
+        _, t_32 = timeit(lambda: np.dot(ptdf_32, injections_32), repeat=5)
+        print(f"{name}: max flow deviation N-0 {deviation.n_0:.2e} MW "
+              f"({deviation.n_0_relative:.2e} of capacity), N-1 {deviation.n_1:.2e} MW "
+              f"({deviation.n_1_relative:.2e} of capacity); N-0 flows for {100*len(injections)} "
+              f"timesteps float64 {t_64*1e3:.1f} ms, float32 {t_32*1e3:.1f} ms")
@@ -445,8 +445,9 @@ class Results():
 
         All arguments are optional and per default this method calculates the
         power flow on all lines considering outages with significant impact.
-        This is calculated with :meth:`~pomato.grid.create_filtered_n_1_ptdf`
-        where this is described in greater detail.
+        This is calculated with :meth:`~pomato.grid.GridTopology.iterate_n_1_ptdf`,
+        which processes the N-1 ptdf in blocks and is described in greater detail
+        in :meth:`~pomato.grid.GridTopology.create_filtered_n_1_ptdf`.
 
         Parameters
         ----------
@@ -487,42 +488,26 @@ class Results():
             self.logger.info("Using all lines from grid model as CBs")
             lines = list(self.grid.lines.index)
 
-        use_lodf = False
+        cbco = None
         if not outages:
             self.logger.info("Using COs with a sensitivity of %d percent to CBs",
                              round(sensitivity*100, 2))
-            use_lodf = True
-
-        ptdf = [self.grid.ptdf]
-        label_lines = list(self.grid.lines.index)
-        label_outages = ["basecase" for i in range(0, len(self.grid.lines.index))]
-
-        for line in self.grid.lines.index[self.grid.lines.contingency]:
-            if use_lodf:
-                outages = list(self.grid.lodf_filter(line, sensitivity))
-            label_lines.extend([line for i in range(0, len(outages))])
-            label_outages.extend(outages)
-
-        # estimate size of array = nr_elements * bytes per element
-        # (float64 + sep = 8 + 1) / (1024**2) MB
-        estimate_size = len(label_lines)*len(self.grid.nodes.index)*(8 + 1)/(1024*1024)
-        if estimate_size > 10000:
-            self.logger.error("Estimated size of N-1 PTDF = %d", estimate_size)
-            raise Exception('Matrix N-1 PTDF MAtrix too large! Use a higher sensitivity!')
-
-        for line in self.grid.lines.index[self.grid.lines.contingency]:
-            if use_lodf:
-                outages = list(self.grid.lodf_filter(line, sensitivity))
-            tmp_ptdf = np.vstack([self.grid.create_n_1_ptdf_cbco(line, out) for out in outages])
-            ptdf.append(tmp_ptdf)
-
-        ptdf = np.concatenate(ptdf).reshape(len(label_lines),
-                                            len(list(self.grid.nodes.index)))
+        else:
+            contingencies = self.grid.lines.index[self.grid.lines.contingency]
+            cbco = (list(self.grid.lines.index) + [line for line in contingencies for outage in outages],
+                    ["basecase" for line in self.grid.lines.index] + list(outages)*len(contingencies))
 
         inj = self.INJ.pivot(index="t", columns="n", values="INJ")
         inj = inj.loc[timesteps, self.data.nodes.index]
-        flow = np.dot(ptdf, inj.T)
-        n_1_flows = pd.DataFrame(columns=timesteps, data=flow)
+
+        # The N-1 ptdf is processed in blocks, only the flows are kept in memory.
+        flow, label_lines, label_outages = [], [], []
+        for ptdf, cb, co in self.grid.iterate_n_1_ptdf(sensitivity=sensitivity, cbco=cbco):
+            flow.append(np.dot(ptdf, inj.values.T.astype(ptdf.dtype)))
+            label_lines.extend(cb)
+            label_outages.extend(co)
+
+        n_1_flows = pd.DataFrame(columns=timesteps, data=np.vstack(flow))
         n_1_flows["cb"] = label_lines
         n_1_flows["co"] = label_outages
 
@@ -622,8 +607,7 @@ class Results():
         agg_info["avg load"] = n_1_overload.groupby(by=["cb"]).mean().mean(axis=1).values
 
         condition = n_1_overload.co == "basecase"
-        bool_values = [line in n_1_overload.cb[condition].values for line in agg_info.index]
-        agg_info["basecase overload"] = bool_values
+        agg_info["basecase overload"] = agg_info.index.isin(n_1_overload.cb[condition])
         self.logger.info("Done")
 
         return agg_info, n_1_overload
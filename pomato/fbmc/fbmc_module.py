@@ -16,6 +16,7 @@ import pandas as pd
 import pomato
 import pomato.tools as tools
 from pomato.grid import GridModel
+from pomato.grid.gsk import generation_shift_keys, zonal_ptdf
 
 class FBMCModule():
     """ Class to do all calculations in connection with cbco calculation"""
@@ -60,43 +61,24 @@ class FBMCModule():
         
         return gsk.values
         
-    def create_gsk(self, option="flat"):
+    def create_gsk(self, option="flat", sparse=False):
         """returns GSK, either flat or gmax"""
-        gsk = pd.DataFrame(index=self.nodes.index)
-
         plant_types = self.data.options["optimization"]["plant_types"]
         condition = (~self.data.plants.plant_type.isin(plant_types["ts"])) & \
                     (~self.data.plants.plant_type.isin(plant_types["es"]))
-        
-        gmax_per_node = self.data.plants.loc[condition, ["g_max", "node"]] \
-                        .groupby("node").sum()
-
-        for zone in self.data.zones.index:
-            nodes_in_zone = self.nodes.index[self.nodes.zone == zone]
-            gsk[zone] = 0
-            gmax_in_zone = gmax_per_node[gmax_per_node.index.isin(nodes_in_zone)]
-            if option == "gmax":
-                if not gmax_in_zone.empty:
-                    gsk_value = gmax_in_zone.g_max/gmax_in_zone.values.sum()
-                    gsk.loc[gsk.index.isin(gmax_in_zone.index), zone] = gsk_value
-                else:
-                    gsk.loc[gsk.index.isin(nodes_in_zone), zone] = 1/len(nodes_in_zone)
-
-            elif option == "flat":
-                gsk.loc[gsk.index.isin(nodes_in_zone), zone] = 1/len(nodes_in_zone)
-
-        return gsk.values
+        gsk = generation_shift_keys(self.nodes, self.data.zones.index, self.data.plants[condition],
+                                    fill_empty_zones=True)
+        return gsk[option] if sparse else gsk[option].toarray()
 
     def return_critical_branches(self, threshold=1e-2, gsk_strategy="gmax"):
 
         self.logger.info("List of CBs is generated from zone-to-zone PTDFs with:")
         self.logger.info("GSK Strategy: %s, Threshold: %d percent", gsk_strategy, threshold*100)
 
-        gsk = self.create_gsk(gsk_strategy)
-        zonal_ptdf = np.dot(self.grid.ptdf, gsk)
+        gsk = self.create_gsk(gsk_strategy, sparse=True)
         zonal_ptdf_df = pd.DataFrame(index=self.lines.index,
                                      columns=self.data.zones.index,
-                                     data=zonal_ptdf)
+                                     data=zonal_ptdf(self.grid.ptdf, gsk))
 
         z2z_ptdf_df = pd.DataFrame(index=self.lines.index)
         for zone in self.flowbased_region:
@@ -127,44 +109,49 @@ class FBMCModule():
         if isinstance(self.cbco_list, pd.DataFrame):
             base_cb = list(self.cbco_list.cb[self.cbco_list.co == "basecase"])
 
-            index_position = [self.lines.index.get_loc(line) for line in base_cb]
-            base_ptdf = self.grid.ptdf[index_position, :]
-            full_ptdf = [base_ptdf, -base_ptdf]
-            label_lines = list(base_cb)+list(base_cb)
-            label_outages = ["basecase" for line in label_lines]
-
             self.cbco_list = self.cbco_list[~(self.cbco_list.co == "basecase")]
-            select_lines = []
-            select_outages = {}
-            for line in self.cbco_list.cb.unique():
-                select_lines.append(line)
-                select_outages[line] = list(self.cbco_list.co[self.cbco_list.cb == line])
+            select_outages = self.cbco_list.groupby("cb", sort=False).co.apply(list).to_dict()
+            select_lines = list(select_outages)
 
         else:
             self.lines["cb"] = False
             critical_branches = self.return_critical_branches(threshold=self.options["grid"]["sensitivity"])
             self.lines.loc[self.lines.index.isin(critical_branches), "cb"] = True
 
-            select_lines = self.lines.index[(self.lines["cb"])&(self.lines.contingency)]
+            base_cb = self.lines.index[(self.lines["cb"])&(self.lines.contingency)]
+            select_lines = base_cb
+            screening = self.grid.lodf_screening(lodf_sensitivity)
             select_outages = {}
             for line in select_lines:
-                select_outages[line] = list(self.grid.lodf_filter(line, lodf_sensitivity))
-
-            index_position = [self.lines.index.get_loc(line) for line in select_lines]
-            base_ptdf = self.grid.ptdf[index_position, :]
-            full_ptdf = [base_ptdf, -base_ptdf]
-            label_lines = list(select_lines)+list(select_lines)
-            label_outages = ["basecase" for line in label_lines]
-
-        for line in select_lines:
-            outages = select_outages[line]
-            tmp_ptdf = np.vstack([self.grid.create_n_1_ptdf_cbco(line, out) for out in outages])
-            full_ptdf.extend([tmp_ptdf, -1*tmp_ptdf])
-            label_lines.extend([line for i in range(0, 2*len(outages))])
-            label_outages.extend(outages*2)
-
-        nodal_fbmc_ptdf = np.concatenate(full_ptdf)
-        nodal_fbmc_ptdf = nodal_fbmc_ptdf.reshape(len(label_lines), len(list(self.nodes.index)))
+                outages = screening[self.lines.index.get_loc(line)].indices
+                select_outages[line] = list(self.lines.index[outages])
+
+        # The ptdf of each cbco is followed by its negative, first for the basecase then
+        # for each line under its outages. The N-1 ptdf blocks are written to their rows
+        # directly, so that only the resulting ptdf and one block are kept in memory.
+        number_of_outages = np.array([len(select_outages[line]) for line in select_lines], dtype=int)
+        offset = np.cumsum(number_of_outages) - number_of_outages
+        label_lines = list(base_cb)*2 + [line for line, number in zip(select_lines, number_of_outages)
+                                         for i in range(0, 2*number)]
+        label_outages = ["basecase" for line in range(0, 2*len(base_cb))] \
+                        + [out for line in select_lines for out in select_outages[line]*2]
+
+        nodal_fbmc_ptdf = np.empty((len(label_lines), len(self.nodes.index)), dtype=self.grid.ptdf.dtype)
+        base_ptdf = self.grid.ptdf[self.lines.index.get_indexer(base_cb)]
+        nodal_fbmc_ptdf[:len(base_cb)] = base_ptdf
+        nodal_fbmc_ptdf[len(base_cb):2*len(base_cb)] = -base_ptdf
+
+        cb = [line for line in select_lines for out in select_outages[line]]
+        co = [out for line in select_lines for out in select_outages[line]]
+        line_index = np.repeat(np.arange(0, len(select_lines)), number_of_outages)
+        rows = 2*len(base_cb) + offset[line_index] + np.arange(0, len(cb))
+        start = 0
+        for block, _, _ in self.grid.iterate_n_1_ptdf(cbco=(cb, co)):
+            block_rows = rows[start:start + len(block)]
+            block_lines = line_index[start:start + len(block)]
+            nodal_fbmc_ptdf[block_rows] = block
+            nodal_fbmc_ptdf[block_rows + number_of_outages[block_lines]] = -block
+            start += len(block)
 
         domain_info = pd.DataFrame(columns=list(self.data.zones.index))
         domain_info["cb"] = label_lines
@@ -188,14 +175,16 @@ class FBMCModule():
         frm_fav = pd.DataFrame(index=self.domain_info.cb.unique())
         frm_fav["value"] = self.lines.maxflow[frm_fav.index]*0
 
-        injection = basecase.INJ.INJ[basecase.INJ.t == timestep].values
+        # injections and gsk in the precision of the ptdf, see option grid.dtype
+        dtype = self.nodal_fbmc_ptdf.dtype
+        injection = basecase.INJ.INJ[basecase.INJ.t == timestep].values.astype(dtype)
 
         f_ref_base_case = np.dot(self.nodal_fbmc_ptdf, injection)
         if gsk_strategy == "dynamic":
             gsk = self.create_dynamic_gsk(basecase, timestep)
         else:
-            gsk = self.create_gsk(gsk_strategy)
-        zonal_fbmc_ptdf = np.dot(self.nodal_fbmc_ptdf, gsk)
+            gsk = self.create_gsk(gsk_strategy, sparse=True)
+        zonal_fbmc_ptdf = zonal_ptdf(self.nodal_fbmc_ptdf, gsk)
 
         # F Day Ahead (should include LTNs)
         net_position = basecase.net_position() * 1
@@ -259,7 +248,7 @@ class FBMCModule():
         domain_data = {}
         grid_model = GridModel(self.wdir, self.grid, self.data, self.data.options)
         
-        if reduce:
+        if reduce and grid_model.options["grid"]["redundancy_removal"] == "julia":
             grid_model._start_julia_daemon()
             
         grid_model.options["optimization"]["type"] = "cbco_zonal"
@@ -277,9 +266,8 @@ class FBMCModule():
             cbco_index = list(range(0, len(cbco_info)))
 
         fbmc_rep = grid_model.return_cbco(cbco_info, cbco_index)
-        fbmc_rep.set_index(fbmc_rep.cb + "_" + fbmc_rep.co, inplace=True)
  
-        if reduce:
+        if grid_model.julia_instance:
             grid_model.julia_instance.join()
             grid_model.julia_instance.julia_instance = None
 
@@ -18,6 +18,9 @@ The functionality of the GridTopology are include:
     - A selection of methods that allow for contingency analysis by obtaining
       N-1 ptdf matrices by lines, outages or with a sensitivity filter.
 
+Beyond N-1, the ContingencyAnalysis evaluates the worst-case line loading under
+simultaneous outages of multiple lines (N-k) for given nodal injections.
+
 
 The purpose of the GridModel is to create a usable grid representation for
 the market model. This module acts as a combinator of the data and grid modules
@@ -83,4 +86,5 @@ Screening <https://arxiv.org/abs/1910.09034>`_.
 """
 
 from pomato.grid.grid_topology import GridTopology
-from pomato.grid.grid_model import GridModel
\ No newline at end of file
+from pomato.grid.grid_model import GridModel
+from pomato.grid.contingency_analysis import ContingencyAnalysis
\ No newline at end of file
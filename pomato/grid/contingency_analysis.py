@@ -0,0 +1,283 @@
+"""N-k Contingency Analysis of POMATO"""
+import collections
+import concurrent.futures
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import scipy.sparse.csgraph
+
+# Data shared with the worker processes, set once per process by _init_worker.
+_WORKER_DATA = {}
+
+def _init_worker(ptdf_incidence, flow, maxflow, incidence):
+    """Initialize worker process with the data required to evaluate outages."""
+    _WORKER_DATA["ptdf_incidence"] = ptdf_incidence
+    _WORKER_DATA["flow"] = flow
+    _WORKER_DATA["maxflow"] = maxflow
+    _WORKER_DATA["incidence"] = incidence
+
+def _evaluate_worker(outages):
+    return evaluate_outages(outages, _WORKER_DATA["ptdf_incidence"], _WORKER_DATA["flow"], 
+                            _WORKER_DATA["maxflow"], _WORKER_DATA["incidence"])
+
+def _number_of_components(node_i, node_j, number_of_nodes, lines):
+    """Return the number of connected components of the network with the lines (boolean mask)."""
+    graph = scipy.sparse.coo_matrix((np.ones(np.sum(lines)), (node_i[lines], node_j[lines])),
+                                    shape=(number_of_nodes, number_of_nodes))
+    return scipy.sparse.csgraph.connected_components(graph, directed=False)[0]
+
+def disconnecting_outages(outages, incidence):
+    """Return which outage sets disconnect the network.
+
+    Parameters
+    ----------
+    outages : np.ndarray
+        Integer indices of the outaged lines, one outage set per row (B x k).
+    incidence : tuple(np.ndarray, np.ndarray, int)
+        Integer indices of the from (node_i) and to (node_j) node of each line and the 
+        number of nodes.
+
+    Returns
+    -------
+    islanding : np.ndarray
+        Boolean array indicating which rows of *outages* disconnect the network.
+    """
+    node_i, node_j, number_of_nodes = incidence
+    lines = np.ones(len(node_i), dtype=bool)
+    number_of_components = _number_of_components(node_i, node_j, number_of_nodes, lines)
+    islanding = np.zeros(len(outages), dtype=bool)
+    for i, outage_set in enumerate(outages):
+        lines[:] = True
+        lines[outage_set] = False
+        islanding[i] = _number_of_components(node_i, node_j, number_of_nodes, lines) > number_of_components
+    return islanding
+
+def evaluate_outages(outages, ptdf_incidence, flow, maxflow, incidence):
+    """Evaluate the worst loading per line for a batch of outage sets.
+
+    For an outage set O the post-contingency flows are
+    :math:`F' = F + M_{:,O} (I - M_{O,O})^{-1} F_O`, with :math:`M = PTDF \\cdot A^T`,
+    and 0 for the outaged lines. The system :math:`I - M_{O,O}` is solved for all outage
+    sets of the batch at once. This system is singular for outage sets that disconnect 
+    the network, these are skipped. Outage sets with an ill-conditioned system, i.e. a ratio
+    of smallest to largest singular value below 1e-3, are checked for islanding by the 
+    connectivity of the network without the outaged lines (see :func:`~disconnecting_outages`).
+
+    Parameters
+    ----------
+    outages : np.ndarray
+        Integer indices of the outaged lines, one outage set per row (B x k).
+    ptdf_incidence : np.ndarray
+        :math:`M = PTDF \\cdot A^T` (L x L).
+    flow : np.ndarray
+        N-0 line flows (L x T).
+    maxflow : np.ndarray
+        Line capacities (L).
+    incidence : tuple(np.ndarray, np.ndarray, int)
+        Integer indices of the from (node_i) and to (node_j) node of each line and the 
+        number of nodes.
+
+    Returns
+    -------
+    loading : np.ndarray
+        Worst loading per line within the batch (L).
+    outage : np.ndarray
+        Row of *outages* that causes the worst loading per line (L).
+    timestep : np.ndarray
+        Timestep that causes the worst loading per line (L).
+    islanding : np.ndarray
+        Boolean array indicating which rows of *outages* disconnect the network.
+    """
+    number_of_outages = outages.shape[1]
+    system = np.eye(number_of_outages) - ptdf_incidence[outages[:, :, np.newaxis], outages[:, np.newaxis, :]]
+    singular_values = np.linalg.svd(system, compute_uv=False)
+    ill_conditioned = np.flatnonzero(singular_values[:, -1] < 1e-3*singular_values[:, 0])
+    islanding = np.zeros(len(outages), dtype=bool)
+    islanding[ill_conditioned] = disconnecting_outages(outages[ill_conditioned], incidence)
+    valid = np.flatnonzero(~islanding)
+
+    loading = np.zeros(len(maxflow))
+    outage, timestep = np.zeros(len(maxflow), dtype=int), np.zeros(len(maxflow), dtype=int)
+    if len(valid) == 0:
+        return loading, outage, timestep, islanding
+
+    # post-contingency loading (B x T x L), relative to the line capacities
+    outages = outages[valid]
+    outage_flow = np.linalg.solve(system[valid], flow[outages])
+    post_loading = np.matmul(outage_flow.transpose(0, 2, 1), ptdf_incidence.T[outages]/maxflow)
+    post_loading += (flow/maxflow[:, np.newaxis]).T
+    post_loading[np.arange(0, len(valid))[:, np.newaxis], :, outages] = 0
+
+    lines = np.arange(0, len(maxflow))
+    worst = np.argmax(np.maximum(np.max(post_loading, axis=1), -np.min(post_loading, axis=1)), axis=0)
+    post_loading = np.abs(post_loading[worst, :, lines])
+    timestep = np.argmax(post_loading, axis=1)
+    loading = post_loading[lines, timestep]
+    return loading, valid[worst], timestep, islanding
+
+
+class ContingencyAnalysis():
+    """N-k contingency analysis based on a GridTopology.
+
+    Evaluates the worst-case loading of each line under simultaneous outages of k
+    lines for given nodal injections, e.g. the injections of a market result
+    (:attr:`~pomato.data.Results.INJ`).
+
+    The outage sets are enumerated from all lines that are a contingency and can
+    optionally be pre-screened by the lodf: only outages of lines that are mutually
+    coupled by a lodf of at least *sensitivity* are considered. Outage sets are
+    evaluated in batches (see :func:`~evaluate_outages`), where outage sets that
+    disconnect the network are skipped. The batches can be distributed across a
+    process pool.
+
+    Parameters
+    ----------
+    grid : :class:`~pomato.grid.GridTopology`
+        GridTopology with calculated grid parameters.
+
+    Attributes
+    ----------
+    grid : :class:`~pomato.grid.GridTopology`
+        GridTopology with calculated grid parameters.
+    islanding_outages : list
+        Outage sets that disconnect the network, found in the last analysis.
+    """
+    def __init__(self, grid):
+        self.logger = logging.getLogger('Log.MarketModel.ContingencyAnalysis')
+        self.grid = grid
+        self.islanding_outages = []
+
+    def outage_sets(self, k=2, sensitivity=None):
+        """Enumerate outage sets of k contingencies.
+
+        Parameters
+        ----------
+        k : int, optional
+            Number of simultaneous outages, defaults to 2.
+        sensitivity : float, optional
+            If supplied, only lines that are pairwise coupled by an absolute lodf of
+            at least *sensitivity* (in either direction) form an outage set.
+
+        Yields
+        ------
+        outage_set : tuple
+            Integer indices of the lines in the outage set.
+        """
+        contingency = np.flatnonzero(self.grid.lines.contingency.values)
+        if sensitivity is None:
+            for outage_set in itertools.combinations(contingency, k):
+                yield outage_set
+            return
+
+        lodf = np.abs(self.grid.lodf[np.ix_(contingency, contingency)])
+        coupled = (lodf >= sensitivity) | (lodf.T >= sensitivity)
+        np.fill_diagonal(coupled, False)
+
+        def extend(outage_set, candidates):
+            if len(outage_set) == k:
+                yield tuple(contingency[outage_set])
+                return
+            for candidate in candidates:
+                remaining = candidates[(candidates > candidate) & coupled[candidate, candidates]]
+                for extended_set in extend(outage_set + [candidate], remaining):
+                    yield extended_set
+
+        for first in range(0, len(contingency)):
+            candidates = np.flatnonzero(coupled[first])
+            for outage_set in extend([first], candidates[candidates > first]):
+                yield outage_set
+
+    def worst_case_loading(self, injections, k=2, sensitivity=None, batch_size=None, processes=1):
+        """Worst-case loading per line under all outage sets of k lines.
+
+        Parameters
+        ----------
+        injections : pd.DataFrame, np.ndarray
+            Nodal injections, either in the long format of
+            :attr:`~pomato.data.Results.INJ` (columns t, n, INJ) or as array of
+            one (N) or multiple timesteps (T x N).
+        k : int, optional
+            Number of simultaneous outages, defaults to 2.
+        sensitivity : float, optional
+            Pre-screening of outage sets by lodf, see :meth:`~outage_sets`.
+        batch_size : int, optional
+            Number of outage sets evaluated at once, defaults to a batch size that
+            limits the post-contingency flows of each batch to 1e7 values.
+        processes : int, optional
+            Number of processes used to evaluate the batches, defaults to 1.
+
+        Returns
+        -------
+        worst_case : pd.DataFrame
+            Per line the N-0 loading (*n_0*), the worst N-k loading (*loading*),
+            the outage set (*outages*) and the timestep (*timestep*) causing it.
+        """
+        if isinstance(injections, pd.DataFrame):
+            injections = injections.pivot(index="t", columns="n", values="INJ")
+            timesteps = list(injections.index)
+            injections = injections.loc[:, self.grid.nodes.index].values
+        else:
+            injections = np.atleast_2d(injections)
+            timesteps = list(range(0, len(injections)))
+
+        ptdf = self.grid.ptdf
+        node_i = self.grid.nodes.index.get_indexer(self.grid.lines.node_i)
+        node_j = self.grid.nodes.index.get_indexer(self.grid.lines.node_j)
+        incidence = (node_i, node_j, len(self.grid.nodes))
+        ptdf_incidence = ptdf[:, node_i] - ptdf[:, node_j]
+        flow = np.dot(ptdf, injections.T.astype(ptdf.dtype))
+        # lines without capacity are excluded from the loading
+        maxflow = np.where(self.grid.lines.maxflow.values > 0, self.grid.lines.maxflow.values, np.inf)
+        if not batch_size:
+            batch_size = max(1, int(1e7/(len(maxflow)*len(timesteps))))
+
+        def batches(outage_sets):
+            batch = list(itertools.islice(outage_sets, batch_size))
+            while batch:
+                yield np.array(batch, dtype=int)
+                batch = list(itertools.islice(outage_sets, batch_size))
+
+        def evaluate(batches):
+            if processes > 1:
+                # Batches are submitted lazily with at most two batches per process in flight,
+                # so that the outage sets are not enumerated upfront.
+                with concurrent.futures.ProcessPoolExecutor(
+                        max_workers=processes, initializer=_init_worker,
+                        initargs=(ptdf_incidence, flow, maxflow, incidence)) as executor:
+                    pending = collections.deque()
+                    for batch in batches:
+                        pending.append((batch, executor.submit(_evaluate_worker, batch)))
+                        if len(pending) >= 2*processes:
+                            batch, future = pending.popleft()
+                            yield batch, future.result()
+                    while pending:
+                        batch, future = pending.popleft()
+                        yield batch, future.result()
+            else:
+                for batch in batches:
+                    yield batch, evaluate_outages(batch, ptdf_incidence, flow, maxflow, incidence)
+
+        loading, outage, timestep = np.zeros(len(maxflow)), [()]*len(maxflow), np.zeros(len(maxflow), dtype=int)
+        self.islanding_outages = []
+        number_of_outage_sets = 0
+        results = evaluate(batches(self.outage_sets(k, sensitivity)))
+        for batch, (batch_loading, batch_outage, batch_timestep, islanding) in results:
+            number_of_outage_sets += len(batch)
+            self.islanding_outages.extend([tuple(self.grid.lines.index[outages])
+                                           for outages in batch[islanding]])
+            for line in np.flatnonzero(batch_loading > loading):
+                outage[line] = tuple(self.grid.lines.index[batch[batch_outage[line]]])
+                timestep[line] = batch_timestep[line]
+                loading[line] = batch_loading[line]
+
+        self.logger.info("Evaluated %d outage sets of %d lines, %d disconnect the network.",
+                         number_of_outage_sets, k, len(self.islanding_outages))
+        worst_case = pd.DataFrame(index=self.grid.lines.index)
+        worst_case["n_0"] = np.max(np.abs(flow)/maxflow[:, np.newaxis], axis=1)
+        worst_case["loading"] = loading
+        worst_case["outages"] = outage
+        worst_case["timestep"] = [timesteps[t] for t in timestep]
+        return worst_case
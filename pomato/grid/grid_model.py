@@ -1,14 +1,72 @@
 
+import concurrent.futures
 import logging
 import datetime as dt
-import itertools
+import json
 import numpy as np
 import pandas as pd
+import scipy.cluster.vq
+import scipy.sparse
 import types
 from pathlib import Path
 
 import pomato
 import pomato.tools as tools
+from pomato.grid.gsk import generation_shift_keys, zonal_ptdf
+from pomato.grid.redundancy_removal import map_redundancy_removal, prescreen, redundancy_removal
+
+# Data shared with the worker processes, set once per process by _init_worker.
+_WORKER_DATA = {}
+
+def _init_worker(grid, line_zones, sensitivity):
+    """Initialize worker process with the data required to build zonal redispatch grids."""
+    _WORKER_DATA["grid"] = grid
+    _WORKER_DATA["line_zones"] = line_zones
+    _WORKER_DATA["sensitivity"] = sensitivity
+
+def _zonal_redispatch_grid_worker(zone):
+    return zonal_redispatch_grid(_WORKER_DATA["grid"], _WORKER_DATA["line_zones"], zone,
+                                 _WORKER_DATA["sensitivity"])
+
+def zonal_redispatch_grid(grid, line_zones, zone, sensitivity=None):
+    """Create the redispatch grid of a zone.
+
+    The redispatch grid of a zone is restricted to the lines that touch the zone, i.e.
+    with at least one node in the zone. Without *sensitivity* it is the N-0 ptdf of
+    these lines, otherwise additionally the N-1 ptdf of these lines under all outages
+    with significant impact (see :meth:`~pomato.grid.GridTopology.create_filtered_n_1_ptdf`).
+
+    Parameters
+    ----------
+    grid : :class:`~pomato.grid.GridTopology`
+        GridTopology with calculated grid parameters.
+    line_zones : pd.DataFrame
+        Zones of the start and end node (zone_i, zone_j) of each line.
+    zone : str
+        The zone.
+    sensitivity : float, optional
+        Sensitivity of the considered outages, defaults to None, i.e. N-0.
+
+    Returns
+    -------
+    redispatch_grid : pd.DataFrame
+        The ptdf, the line capacities as ram and the zones of each line (zone_i, zone_j).
+        With *sensitivity* also cb, co for each row, which is indexed by the cbco label.
+    """
+    lines = line_zones.index[(line_zones.zone_i == zone) | (line_zones.zone_j == zone)]
+    if sensitivity is None:
+        redispatch_grid = pd.DataFrame(index=lines, columns=grid.nodes.index,
+                                       data=grid.ptdf[grid.lines.index.get_indexer(lines)])
+        redispatch_grid["ram"] = grid.lines.maxflow[lines]
+        cb = lines
+    else:
+        _, _, redispatch_grid = grid.create_filtered_n_1_ptdf(sensitivity, lines=lines)
+        redispatch_grid.index = pd.Index(grid.cbco_labels(grid.cbco_codes(redispatch_grid.cb, 
+                                                                           redispatch_grid.co)), name="index")
+        cb = redispatch_grid.cb
+    redispatch_grid["zone_i"] = line_zones.zone_i[cb].values
+    redispatch_grid["zone_j"] = line_zones.zone_j[cb].values
+    return redispatch_grid
 
 class GridModel():
     """GridRepresentation of POMATO, represents the network in the market model.
@@ -82,9 +140,13 @@ class GridModel():
                                                          slack_zones=None,
                                                          grid=pd.DataFrame(),
                                                          redispatch_grid=pd.DataFrame(),
-                                                         ntc=pd.DataFrame())
+                                                         zonal_redispatch_grids={},
+                                                         ntc=pd.DataFrame(),
+                                                         timestep_essential_sets=None,
+                                                         nodal_injection_limits=None)
        
         self.julia_instance = None
+        self._grid_representation_cache = {}
         self.logger.info("CBCOModule Initialized!")
 
     def _start_julia_daemon(self):
@@ -105,30 +167,130 @@ class GridModel():
             - *redispatch_grid*: DataFrame including the ptdf for the redispatch.
               As default this is nodal but could also be an N-1 ptdf, similar to
               *grid*.
+            - *zonal_redispatch_grids*: dict of DataFrames with the restricted redispatch grid of 
+              each redispatched zone (only with option *redispatch.zonal_grid*).
             - *ntc*: DataFrame with the zonal commercial exchange capacities.
+            - *timestep_essential_sets*: Series with the essential set (column *essential_set* 
+              of *grid*) of each timestep (only with option *timestep_clusters*, otherwise None).
+            - *nodal_injection_limits*: Series with the nodal injection limits, used to 
+              report the error of the sparse export of the market model (only with 
+              option *sparse_grid*).
 
         All values are set according the chosen option and might remain empty.
+
+        Grid representations are memoized, identified by :meth:`~grid_representation_fingerprint`.
+        When only options that do not alter the grid representation change, e.g. the
+        capacity multiplier, the memoized *grid*, *timestep_essential_sets*, *redispatch_grid*,
+        *zonal_redispatch_grids* and *ntc* are used and the capacity multiplier is applied on the ram.
         """
         # Data Structure of grid_representation dict
         self.grid_representation.option = self.options["optimization"]["type"]
         self.grid_representation.multiple_slack = self.grid.multiple_slack
         self.grid_representation.slack_zones = self.grid.slack_zones()
 
-        if self.options["optimization"]["type"] == "ntc":
-            self.process_ntc()
-        elif self.options["optimization"]["type"] == "nodal":
-            self.process_nodal()
-        elif self.options["optimization"]["type"] == "zonal":
-            self.process_zonal()
-        elif self.options["optimization"]["type"] == "cbco_nodal":
-            self.process_cbco_nodal()
-        elif self.options["optimization"]["type"] == "cbco_zonal":
-            self.process_cbco_zonal()
+        capacity_multiplier = self.options["grid"]["capacity_multiplier"]
+        fingerprint = self.grid_representation_fingerprint()
+        cached = self._grid_representation_cache.get(fingerprint)
+        if cached:
+            self.logger.info("Using memoized grid representation.")
+            self.grid_representation.grid = self._scale_ram(cached.grid, cached.capacity_multiplier)
+            self.grid_representation.ntc = cached.ntc.copy()
+            self.grid_representation.timestep_essential_sets = cached.timestep_essential_sets
         else:
-            self.logger.info("No grid representation needed for dispatch model")
-
+            self.grid_representation.grid = pd.DataFrame()
+            self.grid_representation.ntc = pd.DataFrame()
+            self.grid_representation.timestep_essential_sets = None
+            if self.options["optimization"]["type"] == "ntc":
+                self.process_ntc()
+            elif self.options["optimization"]["type"] == "nodal":
+                self.process_nodal()
+            elif self.options["optimization"]["type"] == "zonal":
+                self.process_zonal()
+            elif self.options["optimization"]["type"] == "cbco_nodal":
+                self.process_cbco_nodal()
+            elif self.options["optimization"]["type"] == "cbco_zonal":
+                self.process_cbco_zonal()
+            else:
+                self.logger.info("No grid representation needed for dispatch model")
+            cached = types.SimpleNamespace(grid=self.grid_representation.grid.copy(),
+                                           ntc=self.grid_representation.ntc.copy(),
+                                           timestep_essential_sets=self.grid_representation.timestep_essential_sets,
+                                           redispatch_grid=None,
+                                           zonal_redispatch_grids={},
+                                           capacity_multiplier=capacity_multiplier)
+            if capacity_multiplier != 0:
+                self._memoize_grid_representation(fingerprint, cached)
+
+        self.grid_representation.nodal_injection_limits = None
+        if self.options["optimization"]["sparse_grid"]["include"]:
+            self.grid_representation.nodal_injection_limits = pd.Series(
+                index=self.data.nodes.index, data=self.create_nodal_injection_limits()[:, 0])
+
+        self.grid_representation.redispatch_grid = pd.DataFrame()
         if self.options["optimization"]["redispatch"]["include"]:
-            self.add_redispatch_grid()
+            if cached.redispatch_grid is None:
+                self.add_redispatch_grid()
+                cached.redispatch_grid = self.grid_representation.redispatch_grid.copy()
+            else:
+                self.grid_representation.redispatch_grid = self._scale_ram(cached.redispatch_grid,
+                                                                           cached.capacity_multiplier)
+
+        self.grid_representation.zonal_redispatch_grids = {}
+        redispatch_option = self.options["optimization"]["redispatch"]
+        if (redispatch_option["include"] and redispatch_option["zonal_redispatch"] 
+                and redispatch_option["zonal_grid"]["include"]):
+            key = json.dumps([redispatch_option["zones"], redispatch_option["zonal_grid"]], sort_keys=True)
+            if key not in cached.zonal_redispatch_grids:
+                self.add_zonal_redispatch_grids()
+                cached.zonal_redispatch_grids[key] = {zone: grid.copy() for zone, grid 
+                                                      in self.grid_representation.zonal_redispatch_grids.items()}
+            else:
+                self.grid_representation.zonal_redispatch_grids = {
+                    zone: self._scale_ram(grid, cached.capacity_multiplier) 
+                    for zone, grid in cached.zonal_redispatch_grids[key].items()}
+
+    def grid_representation_fingerprint(self):
+        """Return a fingerprint of the options and data that determine the grid representation.
+
+        These are the model type, all grid options except the capacity multiplier (which is 
+        applied on the fly) and options that only affect the runtime, the plant types and 
+        infeasibility bounds (which determine gsk and nodal injection limits), the ptdf and
+        the relevant input data. A precalculated cbco file is identified by its name and 
+        modification time.
+
+        Returns
+        -------
+        fingerprint : str
+            Hash of the options and data.
+        """
+        runtime_options = ["capacity_multiplier", "processes", "cbco_cache", "topology_cache", 
+                           "n_1_block_size", "warm_start_filename"]
+        options = {"type": self.options["optimization"]["type"],
+                   "plant_types": self.options["optimization"]["plant_types"],
+                   "infeasibility": self.options["optimization"]["infeasibility"],
+                   "grid": {key: value for key, value in self.options["grid"].items() 
+                            if key not in runtime_options}}
+        precalc_file = self.julia_dir.joinpath(f"cbco_data/{self.options['grid']['precalc_filename']}.csv")
+        if self.options["grid"]["precalc_filename"] and precalc_file.is_file():
+            options["precalc_mtime"] = precalc_file.stat().st_mtime
+        data = [self.data.nodes[["zone"]], self.data.lines, self.data.dclines, self.data.zones, self.data.ntc,
+                self.data.plants[["node", "g_max", "plant_type"]], self.data.demand_el, 
+                self.data.net_export, self.data.availability]
+        return tools.array_hash(np.array(json.dumps(options, sort_keys=True, default=str)), self.grid.ptdf,
+                                *[pd.util.hash_pandas_object(frame.reset_index()) for frame in data])
+
+    def _memoize_grid_representation(self, fingerprint, cached, max_size=4):
+        """Memoize a grid representation, keeping the *max_size* most recent ones."""
+        if len(self._grid_representation_cache) >= max_size:
+            self._grid_representation_cache.pop(next(iter(self._grid_representation_cache)))
+        self._grid_representation_cache[fingerprint] = cached
+
+    def _scale_ram(self, grid, capacity_multiplier):
+        """Return a copy of grid with the ram scaled from *capacity_multiplier* to the current option."""
+        grid = grid.copy()
+        if "ram" in grid.columns and capacity_multiplier != self.options["grid"]["capacity_multiplier"]:
+            grid["ram"] *= self.options["grid"]["capacity_multiplier"]/capacity_multiplier
+        return grid
 
     def process_nodal(self):
         """Process grid information for nodal N-0 representation.
@@ -174,6 +336,37 @@ class GridModel():
         self.grid_representation.redispatch_grid = ptdf_df
         self.grid_representation.redispatch_grid = self._add_zone_to_grid_representation(self.grid_representation.redispatch_grid)
 
+    def add_zonal_redispatch_grids(self):
+        """Add a restricted redispatch grid for each zone in *options["redispatch"]["zones"]*.
+
+        With zonal redispatch each zone is redispatched separately, therefore only the 
+        lines touching the zone are relevant, see :func:`~zonal_redispatch_grid`. With option 
+        *zonal_grid.n_1* the outages with an impact above *options["grid"]["sensitivity"]*
+        are included. The redispatch grids of the zones are created in 
+        *options["grid"]["processes"]* parallel processes.
+
+        Here *grid_representation.zonal_redispatch_grids* maps each zone to its redispatch grid.
+        """
+        zones = self.options["optimization"]["redispatch"]["zones"]
+        sensitivity = None
+        if self.options["optimization"]["redispatch"]["zonal_grid"]["n_1"]:
+            sensitivity = self.options["grid"]["sensitivity"]
+            # screen outages once, the result is shared with the worker processes
+            self.grid.lodf_screening(sensitivity)
+        line_zones = self._line_zones(self.grid.lines)
+        processes = self.options["grid"]["processes"]
+        if processes > 1 and len(zones) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                                        initargs=(self.grid, line_zones, sensitivity)) as executor:
+                redispatch_grids = list(executor.map(_zonal_redispatch_grid_worker, zones))
+        else:
+            redispatch_grids = [zonal_redispatch_grid(self.grid, line_zones, zone, sensitivity) for zone in zones]
+        for redispatch_grid in redispatch_grids:
+            redispatch_grid["ram"] *= self.options["grid"]["capacity_multiplier"]
+        self.grid_representation.zonal_redispatch_grids = dict(zip(zones, redispatch_grids))
+        self.logger.info("Created redispatch grids with %s rows for zones %s.", 
+                         ", ".join(str(len(grid)) for grid in redispatch_grids), ", ".join(zones))
+
     def process_zonal(self):
         """Process grid information for zonal N-0 representation.
 
@@ -193,7 +386,7 @@ class GridModel():
         if grid_option["cbco_option"] == "clarkson":
             A = self.grid.ptdf
             # nodal -> zonal ptdf via gsk
-            A = np.dot(A, self.create_gsk(gsk))
+            A = zonal_ptdf(A, self.create_gsk(gsk, sparse=True))
             b = self.grid.lines.maxflow.values.reshape(len(self.grid.lines.index), 1)
             info = pd.DataFrame(columns=self.data.zones.index, data=A)
             info["cb"] = list(self.grid.lines.index)
@@ -206,7 +399,7 @@ class GridModel():
             self.grid_representation.grid.ram *= grid_option["capacity_multiplier"]
 
         else:
-            ptdf = np.dot(self.grid.ptdf, self.create_gsk(gsk))
+            ptdf = zonal_ptdf(self.grid.ptdf, self.create_gsk(gsk, sparse=True))
             ptdf_df = pd.DataFrame(index=self.grid.lines.index,
                                    columns=self.data.zones.index,
                                    data=np.round(ptdf, decimals=4))
@@ -248,12 +441,10 @@ class GridModel():
         to identify which lines should be redispatched. 
         """
 
-        if "cb" in grid.columns:
-            grid["zone_i"] = self.grid.nodes.loc[self.grid.lines.loc[grid.cb, "node_i"], "zone"].values
-            grid["zone_j"] = self.grid.nodes.loc[self.grid.lines.loc[grid.cb, "node_j"], "zone"].values
-        else:
-            grid["zone_i"] = self.grid.nodes.loc[self.grid.lines.loc[grid.index, "node_i"], "zone"].values
-            grid["zone_j"] = self.grid.nodes.loc[self.grid.lines.loc[grid.index, "node_j"], "zone"].values
+        line_zones = self._line_zones(self.grid.lines)
+        lines = grid.cb if "cb" in grid.columns else grid.index
+        grid["zone_i"] = line_zones.zone_i[lines].values
+        grid["zone_j"] = line_zones.zone_j[lines].values
 
         return grid
 
@@ -278,6 +469,13 @@ class GridModel():
         and "save" saving the relevant files for the RedundancyRemoval
         algorithm so that it can be run separately from the python POMATO.
 
+        With *clarkson_base* and *options["grid"]["timestep_clusters"]*, the
+        redundancy removal runs for clusters of timesteps with similar nodal
+        injection limits (see :meth:`~timestep_clarkson_algorithm`) and the grid
+        representation contains the cbco's of each distinct essential set, indicated 
+        by the column *essential_set*, and *timestep_essential_sets* the essential set of 
+        each timestep.
+
         """
         A, b, cbco_info = self.create_cbco_data(self.options["grid"]["sensitivity"],
                                                 self.options["grid"]["preprocess"])
@@ -286,16 +484,8 @@ class GridModel():
             try:
                 filename = self.options["grid"]["precalc_filename"]
                 self.logger.info("Using cbco indices from pre-calc: %s", filename)
-                precalc_cbco = pd.read_csv(self.julia_dir.joinpath(f"cbco_data/{filename}.csv"),
-                                           delimiter=',')
-                if len(precalc_cbco.columns) > 1:
-                    condition = cbco_info[["cb", "co"]].apply(tuple, axis=1) \
-                                    .isin(precalc_cbco[["cb", "co"]].apply(tuple, axis=1))
-                    cbco_index = list(cbco_info.reset_index().index[condition])
-                    self.logger.info("Number of CBCOs from pre-calc: %s", str(len(cbco_index)))
-                else:
-                    cbco_index = list(precalc_cbco.constraints.values)
-                    self.logger.info("Number of CBCOs from pre-calc: %s", str(len(cbco_index)))
+                cbco_index = self.read_cbco_file(filename, cbco_info)
+                self.logger.info("Number of CBCOs from pre-calc: %s", str(len(cbco_index)))
 
             except FileNotFoundError:
                 self.logger.warning("FileNotFound: No Precalc available")
@@ -308,12 +498,17 @@ class GridModel():
             if self.options["grid"]["cbco_option"] == "full":
                 cbco_index = list(range(0, len(b)))
 
+            elif self.options["grid"]["cbco_option"] == "clarkson_base" and \
+                    self.options["grid"]["timestep_clusters"]:
+                cbco_index = self.timestep_clarkson_algorithm(A, b)
+
             elif self.options["grid"]["cbco_option"] == "clarkson_base":
                 nodal_injection_limits = self.create_nodal_injection_limits()
-                cbco_index = self.clarkson_algorithm(A=A, b=b, x_bounds=nodal_injection_limits)
+                cbco_index = self.clarkson_algorithm(A=A, b=b, x_bounds=nodal_injection_limits,
+                                                     **self._warm_start(cbco_info))
 
             elif self.options["grid"]["cbco_option"] == "clarkson":
-                cbco_index = self.clarkson_algorithm(A=A, b=b)
+                cbco_index = self.clarkson_algorithm(A=A, b=b, **self._warm_start(cbco_info))
 
             elif self.options["grid"]["cbco_option"] == "save":
                 nodal_injection_limits = self.create_nodal_injection_limits()
@@ -325,16 +520,139 @@ class GridModel():
                 self.logger.warning("No valid cbco_option set!")
 
 
-        self.grid_representation.grid = self.return_cbco(cbco_info, cbco_index)
+        if isinstance(cbco_index, dict):
+            self.grid_representation.grid, self.grid_representation.timestep_essential_sets = \
+                self.return_timestep_cbco(cbco_info, cbco_index)
+        else:
+            self.grid_representation.grid = self.return_cbco(cbco_info, cbco_index)
         self.grid_representation.grid = self._add_zone_to_grid_representation(self.grid_representation.grid)
         self.grid_representation.grid.ram *= self.options["grid"]["capacity_multiplier"]
 
+    def read_cbco_file(self, filename, cbco_info):
+        """Read cbco's from a file in the cbco_data folder.
+
+        The file either contains the indices of the cbco's (column *constraints*),
+        as saved by :meth:`~clarkson_algorithm`, or their labels (columns *cb* and *co*), 
+        e.g. from a previous grid representation. The latter are mapped to the rows
+        of *cbco_info*.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file, without suffix.
+        cbco_info : DataFrame
+            DataFrame containing the ptdf, ram and information which cbco each row 
+            corresponds to, see :meth:`~create_cbco_data`.
+
+        Returns
+        -------
+        cbco_index : list
+            Indices of the cbco's in *cbco_info*.
+        """
+        cbco_file = pd.read_csv(self.julia_dir.joinpath(f"cbco_data/{filename}.csv"), delimiter=',')
+        if len(cbco_file.columns) > 1:
+            condition = np.isin(self.grid.cbco_codes(cbco_info.cb, cbco_info.co),
+                                self.grid.cbco_codes(cbco_file.cb, cbco_file.co))
+            return list(np.flatnonzero(condition))
+        else:
+            return list(cbco_file.constraints.values)
+
+    def _warm_start(self, cbco_info):
+        """Return the initial essential set *I* from the warm_start file, if set."""
+        filename = self.options["grid"]["warm_start_filename"]
+        if not filename:
+            return {}
+        try:
+            initial = self.read_cbco_file(filename, cbco_info)
+        except FileNotFoundError:
+            self.logger.warning("FileNotFound: No warm start available")
+            return {}
+        self.logger.info("Warm start redundancy removal with %d cbco's from: %s", len(initial), filename)
+        return {"I": np.array(initial, dtype=int)}
+
+    def cluster_timesteps(self, nodal_injection_limits, number_of_clusters):
+        """Cluster timesteps with similar nodal injection limits.
+
+        Uses k-means clustering of the nodal injection limits of each timestep,
+        initialized with timesteps evenly spaced in the order of their total limits. With
+        at least as many clusters as timesteps, each timestep forms its own cluster.
+
+        Parameters
+        ----------
+        nodal_injection_limits : pd.DataFrame
+            Nodal injection limits per timestep, see
+            :meth:`~create_timestep_nodal_injection_limits`.
+        number_of_clusters : int
+            Number of clusters.
+
+        Returns
+        -------
+        clusters : list
+            List of clusters, each a list of timesteps.
+        """
+        timesteps = nodal_injection_limits.columns
+        if number_of_clusters >= len(timesteps):
+            return [[timestep] for timestep in timesteps]
+        limits = nodal_injection_limits.values.T.astype(float)
+        order = np.argsort(limits.sum(axis=1), kind="stable")
+        initial = limits[order[np.linspace(0, len(order) - 1, number_of_clusters).astype(int)]]
+        _, labels = scipy.cluster.vq.kmeans2(limits, initial, minit="matrix")
+        return [list(timesteps[labels == label]) for label in np.unique(labels)]
+
+    def timestep_clarkson_algorithm(self, A, b):
+        """Run the redundancy removal algorithm for clusters of timesteps.
+
+        The nodal injection limits of each timestep are clustered into
+        *options["grid"]["timestep_clusters"]* clusters (see :meth:`~cluster_timesteps`)
+        and the redundancy removal runs with the limits of each cluster, i.e. the
+        maximum over its timesteps. Clusters with identical limits share one
+        run and results are taken from the cache if possible (see :meth:`~clarkson_algorithm`).
+        With the python implementation, the clusters are processed in
+        *options["grid"]["processes"]* parallel processes.
+
+        Parameters
+        ----------
+        A : np.ndarray
+            N-1 ptdf matrix.
+        b : np.ndarray
+            Line capacities of the cbco in A.
+
+        Returns
+        -------
+        cbco : dict
+            The essential indices (value) of each timestep (key).
+        """
+        limits = self.create_timestep_nodal_injection_limits()
+        clusters = self.cluster_timesteps(limits, self.options["grid"]["timestep_clusters"])
+        x_bounds = [limits[cluster].max(axis=1).values.reshape(len(limits), 1) for cluster in clusters]
+        cache_keys = [self.cbco_cache_key(A=A, b=b, x_bounds=bounds) for bounds in x_bounds]
+        unique_bounds = dict(zip(cache_keys, x_bounds))
+        self.logger.info("Running redundancy removal for %d clusters of %d timesteps.",
+                         len(unique_bounds), len(limits.columns))
+
+        cbco = {key: self.load_cached_cbco(key) for key in unique_bounds}
+        missing = [key for key in unique_bounds if cbco[key] is None]
+        if self.options["grid"]["redundancy_removal"] == "python":
+            results = map_redundancy_removal(A, b, [unique_bounds[key] for key in missing],
+                                             self.options["grid"]["processes"])
+            for key, result in zip(missing, results):
+                cbco[key] = result
+                self.cache_cbco(key, result)
+        else:
+            for key in missing:
+                cbco[key] = self.clarkson_algorithm(A=A, b=b, x_bounds=unique_bounds[key])
+
+        cluster_cbco = {timestep: cbco[key] for key, cluster in zip(cache_keys, clusters) 
+                        for timestep in cluster}
+        return {timestep: cluster_cbco[timestep] for timestep in limits.columns}
+
     def create_cbco_data(self, sensitivity=5e-2, preprocess=True, gsk=None):
         """Create all relevant N-1 ptdfs in the form of Ax<b (ptdf x < ram).
 
-        This uses the method :meth:`~pomato.grid.create_filtered_n_1_ptdf` to
+        This uses the method :meth:`~pomato.grid.GridTopology.iterate_n_1_ptdf` to
         generate a filtered ptdf matrix, including outages with a higher impact
-        of the argument *sensitivity*.
+        of the argument *sensitivity*. The N-1 ptdf is processed in blocks, therefore
+        only the remaining rows after preprocessing are kept in memory.
 
         Parameters
         ----------
@@ -344,10 +662,11 @@ class GridModel():
             relative to its maximum capacity, more than the sensitivity is
             considered critical.
         preprocess : bool, optional
-            Performing a light preprocessing by removing duplicate constraints.
-        gsk : np.ndarray, optional
+            Performing a light preprocessing by removing duplicate and positively scaled
+            constraints, i.e. identical rows of the ptdf normalized by the ram.
+        gsk : np.ndarray, str, optional
             When gsk is an argument, this method creates a zonal ptdf matrix
-            with it.
+            with it. Can also be the gsk option (*gmax* or *flat*).
 
         Returns
         -------
@@ -361,33 +680,90 @@ class GridModel():
             row corresponds to.
 
         """
-        A, b, info = self.grid.create_filtered_n_1_ptdf(sensitivity=sensitivity)
-        # Processing: Rounding, remove duplicates and 0...0 rows
+        if isinstance(gsk, str):
+            gsk = self.create_gsk(gsk, sparse=True)
+
+        # The N-1 ptdf is processed in blocks, so that only the remaining (and
+        # possibly zonal) rows are kept in memory.
+        A, label_lines, label_outages, row_index = [], [], [], []
+        unique_rows = np.array([], dtype=np.uint64)
+        capacity = self.grid.lines.maxflow.values
+        ram_reference = np.max(capacity) if np.any(capacity > 0) else 1
+        offset = 0
+        for ptdf, cb, co in self.grid.iterate_n_1_ptdf(sensitivity=sensitivity):
+            keep = np.arange(0, len(cb))
+            # Processing: remove duplicate and positively scaled constraints, keeping the first
+            if preprocess:
+                keep, row_hash = self._unique_constraints(ptdf, self.grid.lines.maxflow[cb].values,
+                                                          ram_reference, unique_rows)
+                unique_rows = np.hstack([unique_rows, row_hash])
+            ptdf = ptdf[keep]
+            if gsk is not None:  # replace nodal ptdf by zonal ptdf
+                ptdf = zonal_ptdf(ptdf, gsk)
+            A.append(ptdf)
+            label_lines.extend([cb[i] for i in keep])
+            label_outages.extend([co[i] for i in keep])
+            row_index.extend(offset + keep)
+            offset += len(cb)
+
         if preprocess:
-            self.logger.info("Preprocessing Ab...")
-            _, idx = np.unique(info[list(self.grid.nodes.index) + ["ram"]].round(decimals=6).values,
-                               axis=0, return_index=True)
-            A = A[np.sort(idx)]
-            b = b[np.sort(idx)]
-            info = info.loc[np.sort(idx), :]
-
-        if gsk:  # replace nodal ptdf by zonal ptdf
-            A = np.dot(A, gsk)
-            info = pd.concat((info.loc[:, ["cb", "co", "ram"]],
-                              pd.DataFrame(columns=self.data.zones.index,
-                                           data=A)), axis=1)
+            self.logger.info("Preprocessing Ab: %d of %d rows remain.", len(row_index), offset)
+
+        columns = list(self.data.zones.index) if gsk is not None else list(self.grid.nodes.index)
+        A = np.vstack(A) if A else np.zeros((0, len(columns)), dtype=self.grid.ptdf.dtype)
+        b = self.grid.lines.maxflow[label_lines].values.reshape(len(label_lines), 1)
+        info = pd.DataFrame(index=row_index, columns=columns, data=A)
+        info["cb"] = label_lines
+        info["co"] = label_outages
+        info["ram"] = b
+        info = info[["cb", "co", "ram"] + columns]
         return A, b, info
 
-    def write_cbco_info(self, folder, suffix, **kwargs):
+    @staticmethod
+    def _unique_constraints(ptdf, ram, ram_reference, unique_rows):
+        """Identify duplicate and positively scaled constraints ptdf x <= ram.
+
+        The rows are normalized by their ram and scaled by *ram_reference*, the largest
+        line capacity, so that rounding to 6 decimals is never coarser than rounding 
+        the ptdf itself, i.e. only identical or positively scaled constraints (up to 
+        rounding) are duplicates. The rounded rows are hashed. Rows with a hash in 
+        *unique_rows*, e.g. from a previous block of the N-1 ptdf, or a hash of a 
+        previous row of the block are duplicates.
+
+        Returns
+        -------
+        keep : np.ndarray
+            Integer indices of the rows that are kept.
+        row_hash : np.ndarray
+            Hashes of the kept rows.
+        """
+        positive = ram > 0
+        scale = np.where(positive, ram_reference/np.where(positive, ram, 1), 1)
+        # Adding 0 replaces -0.0 with 0.0, constraints without capacity are normalized 
+        # separately.
+        rows = np.round(np.hstack([ptdf.astype(float)*scale[:, np.newaxis], 
+                                   np.where(positive, 1, ram)[:, np.newaxis]]), decimals=6) + 0.
+        row_hash = pd.util.hash_pandas_object(pd.DataFrame(rows), index=False).values
+        duplicate = pd.Index(row_hash).duplicated() | pd.Index(row_hash).isin(unique_rows)
+        keep = np.flatnonzero(~duplicate)
+        return keep, row_hash[keep]
+
+    def write_cbco_info(self, folder, suffix, file_format=None, **kwargs):
         """Write cbco information to disk to run the redundancy removal algorithm.
 
+        Arrays are either written as text (*csv*) or binary (*npy*) files, DataFrames
+        as *csv* or *npz* files, see :meth:`~read_cbco_info`.
+
         Parameters
         ----------
         folder : pathlib.Path
             Save file to the specified folder.
         suffix : str
             A suffix for each file, to make it recognizable.
+        file_format : str, optional
+            Either *csv* or *npy*, defaults to *options["grid"]["cbco_file_format"]*.
         """
+        file_format = file_format or self.options["grid"]["cbco_file_format"]
         self.logger.info("Saving A, b...")
         
         for data in [d for d in ["x_bounds", "I"] if d not in kwargs]:
@@ -395,15 +771,81 @@ class GridModel():
 
         for data in kwargs:
             self.logger.info("Saving %s to disk...", data)
-            if isinstance(kwargs[data], np.ndarray):
+            if isinstance(kwargs[data], np.ndarray) and file_format == "npy":
+                np.save(folder.joinpath(f"{data}_{suffix}.npy"), kwargs[data])
+
+            elif isinstance(kwargs[data], np.ndarray):
                 np.savetxt(folder.joinpath(f"{data}_{suffix}.csv"),
                            np.asarray(kwargs[data]), delimiter=",")
 
+            elif isinstance(kwargs[data], pd.DataFrame) and file_format == "npy":
+                # Each column is saved as array, labels as unicode strings to avoid pickling.
+                columns = {f"column_{i}": kwargs[data][col].values for i, col in enumerate(kwargs[data].columns)}
+                columns = {col: values.astype(str) if values.dtype == object else values
+                           for col, values in columns.items()}
+                index = kwargs[data].index.values
+                np.savez(folder.joinpath(f"{data}.npz"), index=index.astype(str) if index.dtype == object else index,
+                         columns=np.array(kwargs[data].columns, dtype=str), **columns)
+
             elif isinstance(kwargs[data], pd.DataFrame):
                 kwargs[data].to_csv(str(folder.joinpath(f'{data}.csv')), index_label='index')
 
         self.logger.info("Saved everything to folder: \n %s", str(folder))
 
+    def read_cbco_info(self, folder, suffix, file_format=None):
+        """Read cbco information written by :meth:`~write_cbco_info`.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+            Folder containing the files.
+        suffix : str
+            Suffix of the files.
+        file_format : str, optional
+            Either *csv* or *npy*, defaults to *options["grid"]["cbco_file_format"]*.
+
+        Returns
+        -------
+        cbco_info : dict
+            A, b, x_bounds and I as np.ndarray and Ab_info as DataFrame, as far as
+            these files exist in *folder*.
+        """
+        file_format = file_format or self.options["grid"]["cbco_file_format"]
+        cbco_info = {}
+        for data in ["A", "b", "x_bounds", "I"]:
+            file = folder.joinpath(f"{data}_{suffix}.{file_format}")
+            if not file.is_file():
+                continue
+            if file_format == "npy":
+                cbco_info[data] = np.load(file)
+            elif file.stat().st_size == 0:
+                cbco_info[data] = np.array([])
+            else:
+                cbco_info[data] = np.loadtxt(file, delimiter=",", ndmin=2)
+
+        if file_format == "npy" and folder.joinpath("Ab_info.npz").is_file():
+            with np.load(folder.joinpath("Ab_info.npz")) as data:
+                cbco_info["Ab_info"] = pd.DataFrame(
+                    {col: data[f"column_{i}"] for i, col in enumerate(data["columns"])}, 
+                    index=data["index"])
+        elif file_format == "csv" and folder.joinpath("Ab_info.csv").is_file():
+            cbco_info["Ab_info"] = pd.read_csv(folder.joinpath("Ab_info.csv"), index_col="index")
+        return cbco_info
+
+    def _nodal_capacities(self):
+        """Per node installed capacity, storage/power-to-heat capacity and dcline capacity."""
+        plant_types = self.options["optimization"]["plant_types"]
+        plants = self.data.plants
+        capacities = pd.DataFrame(index=self.data.nodes.index)
+        capacities["g_max"] = plants.groupby("node").g_max.sum()
+        capacities["demand_max"] = plants[plants.plant_type.isin(plant_types["es"])].groupby("node").g_max.sum()
+        capacities["demand_max"] = capacities.demand_max.add(
+            plants[plants.plant_type.isin(plant_types["ph"])].groupby("node").g_max.sum(), fill_value=0)
+        dclines = self.data.dclines.astype({"maxflow": float})
+        capacities["dc"] = dclines.groupby("node_i").maxflow.sum().add(
+            dclines.groupby("node_j").maxflow.sum(), fill_value=0)
+        return capacities.fillna(0)
+
     def create_nodal_injection_limits(self):
         """Create nodal injection limits.
 
@@ -416,6 +858,8 @@ class GridModel():
         depending on the (arbitrary) definition of the incidence matrix,
         only the max(positive bound, abs(negative bound)) is considered.
 
+        The limits are the worst case over all timesteps, see
+        :meth:`~create_timestep_nodal_injection_limits` for limits per timestep.
 
         Returns
         -------
@@ -424,45 +868,67 @@ class GridModel():
 
         """
         infeasibility_upperbound = self.options["optimization"]["infeasibility"]["electricity"]["bound"]
-        nodal_injection_limits = []
-
-        for node in self.data.nodes.index:
-            plant_types = self.options["optimization"]["plant_types"]
-            condition_storage = (self.data.plants.node == node) & \
-                                (self.data.plants.plant_type.isin(plant_types["es"]))
-            condition_el_heat = (self.data.plants.node == node) & \
-                                (self.data.plants.plant_type.isin(plant_types["ph"]))
-
-            max_dc_inj = self.data.dclines.maxflow[(self.data.dclines.node_i == node) |
-                                                   (self.data.dclines.node_j == node)].sum()
-            nex_max = max(0, self.data.net_export.loc[self.data.net_export.node == node, "net_export"].max())
-            nex_min = -min(0, self.data.net_export.loc[self.data.net_export.node == node, "net_export"].min())
-            upper = max(self.data.plants.g_max[self.data.plants.node == node].sum()
-                        - self.data.demand_el.loc[self.data.demand_el.node == node, "demand_el"].min()
-                        + nex_max
-                        + max_dc_inj
-                        + infeasibility_upperbound
-                        , 0)
-
-            lower = max(self.data.demand_el.loc[self.data.demand_el.node == node, "demand_el"].max()
-                        + self.data.plants.g_max[condition_storage].sum()
-                        + self.data.plants.g_max[condition_el_heat].sum()
-                        + nex_min
-                        + max_dc_inj
-                        + infeasibility_upperbound, 0)
-
-            nodal_injection_limits.append(max(upper, lower))
-
-        nodal_injection_limits = np.array(nodal_injection_limits).reshape(len(nodal_injection_limits), 1)
-        return nodal_injection_limits
+        capacities = self._nodal_capacities()
+        nodes = self.data.nodes.index
+        demand = self.data.demand_el.groupby("node").demand_el.agg(["min", "max"]).reindex(nodes).fillna(0)
+        net_export = self.data.net_export.groupby("node").net_export.agg(["min", "max"]).reindex(nodes).fillna(0)
+
+        upper = (capacities.g_max - demand["min"] + net_export["max"].clip(lower=0)
+                 + capacities.dc + infeasibility_upperbound).clip(lower=0)
+        lower = (demand["max"] + capacities.demand_max - net_export["min"].clip(upper=0)
+                 + capacities.dc + infeasibility_upperbound).clip(lower=0)
+        nodal_injection_limits = np.maximum(upper.values, lower.values)
+        return nodal_injection_limits.reshape(len(nodal_injection_limits), 1)
+
+    def create_timestep_nodal_injection_limits(self):
+        """Create nodal injection limits for each timestep.
+
+        Analog to :meth:`~create_nodal_injection_limits`, however with demand and
+        net export of each timestep instead of their extremes over all timesteps.
+
+        Returns
+        -------
+        nodal_injection_limits : pd.DataFrame
+            Contains the abs maximum power injected/load at each node (index) and
+            timestep (columns), i.e. ``nodal_injection_limits.values`` is a N x T array.
+
+        """
+        infeasibility_upperbound = self.options["optimization"]["infeasibility"]["electricity"]["bound"]
+        capacities = self._nodal_capacities()
+        nodes = self.data.nodes.index
+        timesteps = self.data.demand_el.timestep.unique()
+        demand = self.data.demand_el.pivot_table(index="node", columns="timestep", values="demand_el",
+                                                 aggfunc="sum").reindex(index=nodes, columns=timesteps).fillna(0)
+        net_export = self.data.net_export.pivot_table(index="node", columns="timestep", values="net_export",
+                                                      aggfunc="sum").reindex(index=nodes, columns=timesteps).fillna(0)
+
+        static = (capacities.dc + infeasibility_upperbound).values[:, np.newaxis]
+        upper = np.clip(capacities.g_max.values[:, np.newaxis] - demand.values 
+                        + np.clip(net_export.values, 0, None) + static, 0, None)
+        lower = np.clip(demand.values + capacities.demand_max.values[:, np.newaxis]
+                        - np.clip(net_export.values, None, 0) + static, 0, None)
+        return pd.DataFrame(index=nodes, columns=timesteps, data=np.maximum(upper, lower))
 
     def clarkson_algorithm(self, args={"file_suffix": "py"}, **kwargs):
         """Run the redundancy removal algorithm.
 
-        The redundancy removal algorithm is run by writing the necessary data
-        to disk with "_py" suffix, starting a julia instance and running the
-        algorithm. After (successful) completion the resulting file with the
-        non-redundant cbco indices is read and returned.
+        Before, the constraints are pre-screened (see :meth:`~prescreen_cbco`) and only
+        the remaining ones are passed on to the algorithm.
+
+        Depending on *options["grid"]["redundancy_removal"]* the algorithm runs
+        in python (see :meth:`~python_clarkson_algorithm`) or in julia. For the
+        latter the necessary data is written to disk with "_py" suffix, a julia
+        instance is started and runs the algorithm. After (successful) completion
+        the resulting file with the non-redundant cbco indices is read and returned.
+
+        With option *cbco_cache*, the essential indices are cached in ``cbco_data/cache``, 
+        identified by a hash of the input data and the algorithm (see :meth:`~cbco_cache_key`),
+        and reused when the redundancy removal runs with the same input again. The cbco file
+        is written in both cases.
+
+        When running in python without data as arguments, the data previously
+        written by :meth:`~write_cbco_info` with the suffix *args["file_suffix"]*
+        is read, analog to the julia algorithm.
 
         Returns
         -------
@@ -470,8 +936,151 @@ class GridModel():
             List of the essential indices, i.e. the indices of the non-redundant
             cbco's.
         """
+        if self.options["grid"]["redundancy_removal"] == "python" and not kwargs:
+            kwargs = self.read_cbco_info(self.julia_dir.joinpath("cbco_data"), args.get("file_suffix", "py"))
+            if np.size(kwargs.get("I", [])) > 0:
+                kwargs["I"] = np.ravel(kwargs["I"]).astype(int)
+            else:
+                kwargs.pop("I", None)
+
+        cache_key = self.cbco_cache_key(**kwargs)
+        cbco = self.load_cached_cbco(cache_key)
+        if cbco is not None:
+            file = self.julia_dir.joinpath(f"cbco_data/cbco_{args.get('file_suffix', 'py')}_"
+                                           f"{dt.datetime.now().strftime('%d%m_%H%M%S')}.csv")
+            pd.DataFrame({"constraints": cbco}).to_csv(file, index=False)
+            self.logger.info("cbco list from cache save for later use to: \n%s", file.stem + ".csv")
+            return cbco
+
+        candidates = None
+        if "A" in kwargs:
+            candidates = self.prescreen_cbco(kwargs["A"], kwargs["b"], kwargs.get("x_bounds"))
+            kwargs["A"], kwargs["b"] = kwargs["A"][candidates], kwargs["b"][candidates]
+            if "I" in kwargs:
+                kwargs["I"] = np.flatnonzero(np.isin(candidates, kwargs["I"]))
+
+        if self.options["grid"]["redundancy_removal"] == "python":
+            cbco = self.python_clarkson_algorithm(args, **kwargs)
+            file = self.julia_dir.joinpath(f"cbco_data/cbco_{args.get('file_suffix', 'py')}_"
+                                           f"{dt.datetime.now().strftime('%d%m_%H%M%S')}.csv")
+        else:
+            cbco, file = self._julia_clarkson_algorithm(args, **kwargs)
+
+        if cbco is not None:
+            if candidates is not None:
+                cbco = [int(candidates[index]) for index in cbco]
+            pd.DataFrame({"constraints": cbco}).to_csv(file, index=False)
+            self.logger.info("cbco list save for later use to: \n%s", file.stem + ".csv")
+            self.cache_cbco(cache_key, cbco)
+        return cbco
+
+    def _cbco_cache_folder(self):
+        """Return the folder of the essential set cache or None if disabled."""
+        if self.options["grid"]["cbco_cache"]["include"]:
+            return self.julia_dir.joinpath("cbco_data/cache")
+        return None
+
+    def cbco_cache_key(self, **kwargs):
+        """Hash of the input data of the redundancy removal.
+
+        The key is derived from the content of the data that defines the essential
+        set, i.e. A, b, x_bounds or the flow based domain in Ab_info, and the redundancy 
+        removal algorithm (python or julia). Therefore it reflects all options that alter 
+        this data, e.g. sensitivity, preprocess and gsk.
+
+        Returns
+        -------
+        cache_key : str
+            Hash of the input data.
+        """
+        data = [np.array(self.options["grid"]["redundancy_removal"])]
+        for name in [d for d in ["A", "b", "x_bounds", "Ab_info"] if d in kwargs]:
+            value = kwargs[name]
+            if isinstance(value, pd.DataFrame):
+                data.extend([value.columns, value.values])
+            else:
+                data.append(np.asarray(value, dtype=float))
+        return tools.array_hash(*data)
+
+    def load_cached_cbco(self, cache_key):
+        """Load the essential indices from the cache.
+
+        Parameters
+        ----------
+        cache_key : str
+            Hash of the input data, see :meth:`~cbco_cache_key`.
+
+        Returns
+        -------
+        cbco : list, None
+            List of the essential indices or None if they are not in the cache.
+        """
+        cache_folder = self._cbco_cache_folder()
+        if not cache_folder or not cache_folder.joinpath(cache_key + ".npy").is_file():
+            return None
+        file = cache_folder.joinpath(cache_key + ".npy")
+        try:
+            cbco = [int(index) for index in np.load(file)]
+        except (OSError, ValueError):
+            self.logger.warning("Could not load cbco indices from cache.")
+            return None
+        file.touch()
+        self.logger.info("Using %d cbco indices from cache: %s", len(cbco), file.name)
+        return cbco
+
+    def cache_cbco(self, cache_key, cbco):
+        """Save the essential indices to the cache and evict old entries.
+
+        Parameters
+        ----------
+        cache_key : str
+            Hash of the input data, see :meth:`~cbco_cache_key`.
+        cbco : list
+            List of the essential indices.
+        """
+        cache_folder = self._cbco_cache_folder()
+        if not cache_folder:
+            return
+        tmp_file = cache_folder.joinpath(cache_key + ".tmp")
+        try:
+            cache_folder.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, "wb") as file:
+                np.save(file, np.array(cbco, dtype=int))
+            tmp_file.rename(cache_folder.joinpath(cache_key + ".npy"))
+            tools.evict_cache(cache_folder, self.options["grid"]["cbco_cache"]["max_size"], self.logger)
+        except OSError:
+            self.logger.warning("Could not save cbco indices to cache.")
+            if tmp_file.is_file():
+                tmp_file.unlink()
+
+    def prescreen_cbco(self, A, b, x_bounds=None):
+        """Pre-screen constraints before the redundancy removal.
+
+        Removes the constraints of Ax <= b that cannot be violated within the nodal
+        injection limits *x_bounds* and constraints that are dominated by a parallel
+        constraint, see :func:`~pomato.grid.redundancy_removal.prescreen`. This
+        requires no LP and therefore reduces the input to the redundancy removal cheaply.
+
+        Returns
+        -------
+        candidates : np.ndarray
+            Indices of the remaining constraints.
+        """
+        number_of_constraints = len(b)
+        candidates, removed = prescreen(A, b, x_bounds)
+        for stage, number_removed in removed.items():
+            self.logger.info("Pre-screening (%s) removed %d constraints.", stage, number_removed)
+        self.logger.info("Pre-screening: %d of %d constraints remain.", len(candidates), number_of_constraints)
+        return candidates
+
+    def _julia_clarkson_algorithm(self, args, **kwargs):
+        """Run the redundancy removal algorithm in julia.
 
-        self.write_cbco_info(self.julia_dir.joinpath("cbco_data"), "py", **kwargs)
+        The RedundancyRemoval julia package reads its input as csv files.
+        """
+        if np.size(kwargs.pop("I", [])) > 0:
+            self.logger.warning("Warm start is only supported by the python redundancy removal.")
+        self.write_cbco_info(self.julia_dir.joinpath("cbco_data"), "py", file_format="csv", **kwargs)
 
         if not self.julia_instance:
             self.julia_instance = tools.JuliaDaemon(self.logger, self.wdir, self.package_dir, "redundancy_removal")
@@ -489,11 +1098,49 @@ class GridModel():
 
         if self.julia_instance.solved:
             file = tools.newest_file_folder(self.julia_dir.joinpath("cbco_data"), keyword="cbco")
-            self.logger.info("cbco list save for later use to: \n%s", file.stem + ".csv")
             cbco = list(pd.read_csv(file, delimiter=',').constraints.values)
         else:
             self.logger.critical("Error in Julia code")
-            cbco = None
+            file, cbco = None, None
+        return cbco, file
+
+    def python_clarkson_algorithm(self, args={"file_suffix": "py"}, **kwargs):
+        """Run the redundancy removal algorithm in python.
+
+        Uses :func:`~pomato.grid.redundancy_removal.redundancy_removal`, which
+        solves the LPs with the HiGHS solver of scipy and checks candidates in
+        *options["grid"]["processes"]* parallel processes. Takes the same arguments
+        as :meth:`~clarkson_algorithm`.
+
+        With the argument *fbmc_domain*, the flow based domain in *Ab_info* is
+        reduced for each timestep separately. An initial essential set *I* warm 
+        starts the algorithm, see :func:`~pomato.grid.redundancy_removal.clarkson`.
+
+        Returns
+        -------
+        cbco : list
+            List of the essential indices, i.e. the indices of the non-redundant
+            cbco's.
+        """
+        processes = self.options["grid"]["processes"]
+        t_start = dt.datetime.now()
+        self.logger.info("Start-Time: %s", t_start.strftime("%H:%M:%S"))
+
+        if args.get("fbmc_domain", False):
+            info = kwargs["Ab_info"]
+            A = info[list(self.data.zones.index)].values
+            b = info.ram.values
+            cbco = []
+            for timestep_rows in info.reset_index(drop=True).groupby("timestep").indices.values():
+                cbco.extend(redundancy_removal(A, b, candidates=timestep_rows, processes=processes))
+            cbco = sorted(cbco)
+        else:
+            cbco = redundancy_removal(kwargs["A"], kwargs["b"], kwargs.get("x_bounds"), processes=processes,
+                                      initial=kwargs.get("I"))
+
+        t_end = dt.datetime.now()
+        self.logger.info("End-Time: %s", t_end.strftime("%H:%M:%S"))
+        self.logger.info("Total Time: %s", str((t_end-t_start).total_seconds()) + " sec")
         return cbco
 
     def return_cbco(self, cbco_info, cbco_index):
@@ -507,11 +1154,46 @@ class GridModel():
 
         """
         cbco_info = cbco_info.iloc[cbco_index].copy()
-        cbco_info.loc[:, "index"] = cbco_info.cb + "_" + cbco_info.co
-        cbco_info = cbco_info.set_index("index")
+        labels = self.grid.cbco_labels(self.grid.cbco_codes(cbco_info.cb, cbco_info.co))
+        cbco_info.index = pd.Index(labels, name="index")
         return cbco_info
 
-    def create_gsk(self, option="flat"):
+    def return_timestep_cbco(self, cbco_info, cbco_index):
+        """Return the cbco's of each distinct essential set and the essential set of each timestep.
+
+        Analog to :meth:`~return_cbco` for essential indices per timestep. Timesteps 
+        with identical essential sets share the same rows, i.e. the rows of each distinct 
+        essential set are returned once, indicated by the column *essential_set*, and are 
+        mapped to the timesteps by *timestep_essential_sets*. 
+
+        Parameters
+        ----------
+        cbco_info : DataFrame
+            DataFrame containing the ptdf, ram and information which cbco each row 
+            corresponds to.
+        cbco_index : dict
+            The essential indices (value) of each timestep (key).
+
+        Returns
+        -------
+        cbco_info : DataFrame
+            Contingency ptdfs of each essential set with the additional column *essential_set*.
+        timestep_essential_sets : pd.Series
+            The essential set (value) of each timestep (index).
+        """
+        essential_sets = {}
+        for index in cbco_index.values():
+            essential_sets.setdefault(tuple(index), len(essential_sets))
+        timestep_essential_sets = pd.Series({timestep: essential_sets[tuple(index)] 
+                                             for timestep, index in cbco_index.items()}, name="essential_set")
+        timestep_essential_sets.index.name = "timestep"
+        columns = list(cbco_info.columns)
+        columns.insert(columns.index("ram") + 1, "essential_set")
+        cbco_info = pd.concat([self.return_cbco(cbco_info, list(index)).assign(essential_set=essential_set) 
+                               for index, essential_set in essential_sets.items()])[columns]
+        return cbco_info, timestep_essential_sets
+
+    def create_gsk(self, option="flat", sparse=False):
         """Create generation shift key (gsk).
 
         The gsk represents a node to zone mapping or the assumption on how nodal injections
@@ -524,35 +1206,24 @@ class GridModel():
         ----------
         option : str, optional
             Deciding how nodal injections are weighted. Currently *flat* or *gmax*.
+        sparse : bool, optional
+            Return the gsk as sparse matrix, see 
+            :func:`~pomato.grid.gsk.generation_shift_keys`, defaults to False.
 
         Returns
         -------
-        gsk : np.ndarrays
+        gsk : np.ndarray, scipy.sparse.csr_matrix
             gsk in the form of a NxZ matrix (Nodes, Zones). With each column representing
             the weighting of nodes within a zone. The product ptdf * gsk yields the zonal
-            ptdf matrix.
+            ptdf matrix (see :func:`~pomato.grid.gsk.zonal_ptdf`).
 
         """
         self.logger.info("Creating gsk with option: %s", option)
-        gsk = pd.DataFrame(index=self.data.nodes.index)
-        condition = (self.data.plants.plant_type.isin(self.options["optimization"]["plant_types"]["ts"]) 
-                        & (~self.data.plants.plant_type.isin(self.options["optimization"]["plant_types"]["es"])))
-        gmax_per_node = self.data.plants.loc[condition, ["g_max", "node"]].groupby("node").sum()
-
-        for zone in self.data.zones.index:
-            nodes_in_zone = self.data.nodes.index[self.data.nodes.zone == zone]
-            gsk[zone] = 0
-            gmax_in_zone = gmax_per_node[gmax_per_node.index.isin(nodes_in_zone)]
-            if option == "gmax":
-                if not gmax_in_zone.empty:
-                    gsk_value = gmax_in_zone.g_max/gmax_in_zone.values.sum()
-                    gsk.loc[gsk.index.isin(gmax_in_zone.index), zone] = gsk_value
-
-            elif option == "flat":
-                # if not gmax_in_zone.empty:
-                gsk.loc[gsk.index.isin(nodes_in_zone), zone] = 1/len(nodes_in_zone)
-
-        return gsk.values
+        plant_types = self.options["optimization"]["plant_types"]
+        condition = (self.data.plants.plant_type.isin(plant_types["ts"]) 
+                     & (~self.data.plants.plant_type.isin(plant_types["es"])))
+        gsk = generation_shift_keys(self.data.nodes, self.data.zones.index, self.data.plants[condition])
+        return gsk[option] if sparse else gsk[option].toarray()
 
     def process_ntc(self):
         """Process grid information for NTC representation.
@@ -573,37 +1244,38 @@ class GridModel():
         simplified line representation.
 
         """
-        tmp = []
-        for from_zone, to_zone in itertools.combinations(set(self.data.nodes.zone), 2):
-            lines = []
+        zones, adjacency = self.zone_adjacency()
+        from_zone, to_zone = np.triu_indices(len(zones), k=1)
+        # the ntc table contains all pairs of zones, therefore the adjacency is used as dense matrix
+        ntc = np.where(adjacency.toarray()[from_zone, to_zone], 1e5, 0)
+        self.grid_representation.ntc = pd.DataFrame({
+            "zone_i": np.column_stack([zones[from_zone], zones[to_zone]]).ravel(),
+            "zone_j": np.column_stack([zones[to_zone], zones[from_zone]]).ravel(),
+            "ntc": np.repeat(ntc, 2)})
 
-            from_nodes = self.data.nodes.index[self.data.nodes.zone == from_zone]
-            to_nodes = self.data.nodes.index[self.data.nodes.zone == to_zone]
+    def zone_adjacency(self):
+        """Zone-to-zone adjacency of the network.
 
-            condition_i_from = self.data.lines.node_i.isin(from_nodes)
-            condition_j_to = self.data.lines.node_j.isin(to_nodes)
+        Two zones are adjacent if they are connected by a line or a dcline.
 
-            condition_i_to = self.data.lines.node_i.isin(to_nodes)
-            condition_j_from = self.data.lines.node_j.isin(from_nodes)
-
-            lines += list(self.data.lines.index[condition_i_from & condition_j_to])
-            lines += list(self.data.lines.index[condition_i_to & condition_j_from])
-
-            dclines = []
-            condition_i_from = self.data.dclines.node_i.isin(from_nodes)
-            condition_j_to = self.data.dclines.node_j.isin(to_nodes)
-
-            condition_i_to = self.data.dclines.node_i.isin(to_nodes)
-            condition_j_from = self.data.dclines.node_j.isin(from_nodes)
-
-            dclines += list(self.data.dclines.index[condition_i_from & condition_j_to])
-            dclines += list(self.data.dclines.index[condition_i_to & condition_j_from])
-
-            if lines or dclines:
-                tmp.append([from_zone, to_zone, 1e5])
-                tmp.append([to_zone, from_zone, 1e5])
-            else:
-                tmp.append([from_zone, to_zone, 0])
-                tmp.append([to_zone, from_zone, 0])
-
-        self.grid_representation.ntc = pd.DataFrame(tmp, columns=["zone_i", "zone_j", "ntc"])
+        Returns
+        -------
+        zones : pd.Index
+            Zones, in order of the rows and columns of the adjacency.
+        adjacency : scipy.sparse.csr_matrix
+            Symmetric, boolean ZxZ matrix.
+        """
+        zones = pd.Index(pd.unique(self.data.nodes.zone.dropna()))
+        line_zones = pd.concat([self._line_zones(self.data.lines), self._line_zones(self.data.dclines)])
+        zone_i, zone_j = zones.get_indexer(line_zones.zone_i), zones.get_indexer(line_zones.zone_j)
+        condition = (zone_i >= 0) & (zone_j >= 0)
+        adjacency = scipy.sparse.coo_matrix((np.ones(np.sum(condition), dtype=bool), 
+                                             (zone_i[condition], zone_j[condition])),
+                                            shape=(len(zones), len(zones))).tocsr()
+        return zones, adjacency + adjacency.T
+
+    def _line_zones(self, lines):
+        """Return the zones of the start and end node of each line (or dcline)."""
+        zone = self.data.nodes.zone
+        return pd.DataFrame(index=lines.index, data={"zone_i": zone.reindex(lines.node_i).values,
+                                                     "zone_j": zone.reindex(lines.node_j).values})
@@ -1,9 +1,26 @@
 """Grid Model of POMATO"""
 import sys
+import concurrent.futures
+import contextlib
 import logging
+import shutil
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 import scipy
+import scipy.sparse
+import scipy.sparse.linalg
+
+import pomato.tools as tools
+
+def _component_ptdf(grid):
+    """Return the ptdf of a connected component, used by worker processes."""
+    return grid.create_ptdf_matrix()
+
+def _component_lodf(grid, ptdf, contingency):
+    """Return the N-1 lodf of a connected component, used by worker processes."""
+    return grid.create_n_1_lodf_matrix(ptdf, contingency)
 
 class GridTopology():
     """GridTopology of POMATO
@@ -25,6 +42,21 @@ class GridTopology():
         - A selection of methods that allow for contingency analysis by obtaining
           N-1 ptdf matrices by lines, outages or with a sensitivity filter.
 
+    The ptdf matrix can be calculated either by inverting the dense nodal
+    susceptance matrix (default) or, for large networks, based on a sparse LU
+    factorization of the nodal susceptance matrix. This is selected with the
+    option *ptdf_method* in the grid options. The grid parameters are always
+    calculated in double precision, but can be stored in single precision
+    (option *dtype*), halving the memory of ptdf, psdf, lodf and all derived
+    N-1 ptdf matrices. The resulting flow deviation can be assessed with
+    :meth:`~precision_deviation`.
+
+    If a working directory is supplied, the ptdf, psdf and lodf matrices are
+    cached in ``data_temp/grid_cache``, identified by a hash of the topology, see
+    :meth:`~create_topology_hash`. On subsequent runs with the same topology the matrices
+    are loaded memory mapped instead of being recalculated. The cache is configured
+    with the option *topology_cache* in the grid options.
+
     This module is initialized solely with nodes and lines data. It purposely
     does not contain additional data or results, as analysis tasks line power
     flow calculation are done in respective modules
@@ -35,6 +67,11 @@ class GridTopology():
     :meth:`~create_filtered_n_1_ptdf` which reappears in similar form in the
     other contingency related as well.
 
+    If the network consists of multiple disconnected components (islands), ptdf
+    and lodf are block-diagonal. Each component is then calculated separately,
+    optionally in parallel processes (option *processes*), and component labels
+    of nodes and lines are kept to derive the slack zones.
+
     The initialization does the following:
         - set nodes/lines as attributes.
         - check if slacks are set.
@@ -45,13 +82,18 @@ class GridTopology():
 
     Parameters
     ----------
-    nodes : DataFrame
-        Nodes data, initialized as attribute of GridTopology.
-    lines : DataFrame
-        Lines data, initialized as attribute of GridTopology.
+    options : dict, optional
+        The options from POMATO main method, defaults to
+        :meth:`~pomato.tools.default_options`.
+    wdir : pathlib.Path, optional
+        Working directory, enables the cache of grid parameters in ``data_temp/grid_cache``.
 
     Attributes
     ----------
+    options : dict
+        The options from POMATO main method persist in the GridTopology.
+    wdir : pathlib.Path
+        Working directory.
     nodes : DataFrame
         Nodes table, which .
     lines : DataFrame
@@ -62,13 +104,21 @@ class GridTopology():
         psdf (phase shifting distribution factor) matrix :math:`(L \\times L)`.
     lodf : np.ndarray
         N-1 lodf (load outage distribution factor) matrix :math:`(L \\times L)`.
+    topology_hash : str
+        Hash of the input topology, identifying the cached grid parameters.
+    node_components : np.ndarray
+        Label of the connected component of each node.
+    line_components : np.ndarray
+        Label of the connected component of each line.
     """
 
     numpy_settings = np.seterr(divide="raise")
 
-    def __init__(self):
+    def __init__(self, options=None, wdir=None):
 
         self.logger = logging.getLogger('Log.MarketModel.GridTopology')
+        self.options = options if options else tools.default_options()
+        self.wdir = wdir
         self.nodes = None
         self.lines = None
         self.incidence_matrix = None
@@ -77,40 +127,155 @@ class GridTopology():
         self.multiple_slack = False
         self.lodf = None
         self.combined_contingencies = None
+        self.topology_hash = None
+        self._phase_shift_updates = []
+        self.node_components = None
+        self.line_components = None
+        self._lodf_screening = {}
 
     def calculate_parameters(self, nodes, lines):
-        
+        """Calculate grid parameters from nodes and lines.
+
+        The ptdf, psdf and lodf matrices are loaded from the cache if available, see
+        :meth:`~load_cached_parameters`.
+        """
         self.logger.info("Calculating Grid Parameters!")
         self.nodes = nodes
         self.lines = lines
+        self._phase_shift_updates = []
+        self._lodf_screening = {}
         self.check_slack()
-        self.logger.info("Calculating PTDF and PSDF Matrices!")
+        # The hash is created after the slack check and the lodf is identified by the
+        # contingencies after the topology check, i.e. the data the matrices are calculated from.
+        self.topology_hash = self.create_topology_hash()
         self.incidence_matrix = self.create_incidence_matrix()
-        self.ptdf = self.create_ptdf_matrix()
-        self.psdf = self.create_psdf_matrix()
         self.multiple_slack = False
-        self.check_grid_topology()
-        self.logger.info("Calculating LODF Matrix!")
-        self.lodf = self.create_n_1_lodf_matrix()
+        dtype = self.options["grid"]["dtype"]
+        if self.load_cached_parameters(self.topology_hash, ["ptdf", "psdf"]):
+            self.check_grid_topology()
+            ptdf = None
+        else:
+            self.logger.info("Calculating PTDF and PSDF Matrices!")
+            # the ptdf is stored in the chosen dtype after the lodf is calculated in double precision
+            ptdf = self.create_ptdf_matrix()
+            self.ptdf = ptdf
+            self.psdf = self.create_psdf_matrix().astype(dtype, copy=False)
+            self.check_grid_topology()
+            self.ptdf = ptdf.astype(dtype, copy=False)
+            self.cache_parameters(self.topology_hash, {"ptdf": self.ptdf, "psdf": self.psdf})
+        lodf = self._lodf_cache_name()
+        if not self.load_cached_parameters(self.topology_hash, [lodf]):
+            self.logger.info("Calculating LODF Matrix!")
+            self.lodf = self.create_n_1_lodf_matrix(ptdf).astype(dtype, copy=False)
+            self.cache_parameters(self.topology_hash, {lodf: self.lodf})
         self.combined_contingencies = self.create_contingency_groups()
         self.logger.info("Grid parameters Calculated!")
 
+    def create_topology_hash(self):
+        """Return a hash of the topology, identifying the grid parameters.
+
+        The hash is based on nodes (index, slack) and lines (index, node_i, node_j, b),
+        i.e. all data the ptdf and psdf matrices depend on, and the dtype they are stored in.
+        The lodf additionally depends on the contingencies, see :meth:`~_lodf_cache_name`.
+        """
+        return tools.array_hash(self.nodes.index, self.nodes.slack,
+                                self.lines.index, self.lines.node_i, self.lines.node_j,
+                                self.lines.b, np.array(self.options["grid"]["dtype"]))
+
+    def _lodf_cache_name(self):
+        """Return the cache name of the lodf, identified by the contingencies."""
+        return "lodf_" + tools.array_hash(self.lines.contingency.values)
+
+    def _cache_folder(self):
+        """Return the folder of the grid parameter cache or None if disabled."""
+        if self.wdir and self.options["grid"]["topology_cache"]["include"]:
+            return Path(self.wdir).joinpath("data_temp/grid_cache")
+        return None
+
+    def load_cached_parameters(self, topology_hash, parameters):
+        """Load grid parameters from the cache.
+
+        The matrices are memory mapped copy-on-write, i.e. they are not read into
+        memory upfront and changes are not written back to disk.
+
+        Parameters
+        ----------
+        topology_hash : str
+            Hash of the topology, see :meth:`~create_topology_hash`.
+        parameters : list
+            Names of the parameters, *ptdf*, *psdf* or the lodf (see :meth:`~_lodf_cache_name`).
+
+        Returns
+        -------
+        success : bool
+            True if the grid parameters were loaded from the cache.
+        """
+        cache_folder = self._cache_folder()
+        if not cache_folder or not cache_folder.joinpath(topology_hash).is_dir():
+            return False
+        folder = cache_folder.joinpath(topology_hash)
+        if not all(folder.joinpath(param + ".npy").is_file() for param in parameters):
+            return False
+        try:
+            matrices = {param: np.load(folder.joinpath(param + ".npy"), mmap_mode="c")
+                        for param in parameters}
+        except (OSError, ValueError):
+            self.logger.warning("Could not load grid parameters from cache.")
+            return False
+        for param, matrix in matrices.items():
+            setattr(self, "lodf" if param.startswith("lodf") else param, matrix)
+        folder.touch()
+        self.logger.info("Loaded %s from cache.", ", ".join(param.split("_")[0].upper() for param in parameters))
+        return True
+
+    def cache_parameters(self, topology_hash, parameters):
+        """Save grid parameters to the cache and evict old entries.
+
+        Parameters
+        ----------
+        topology_hash : str
+            Hash of the topology, see :meth:`~create_topology_hash`.
+        parameters : dict
+            Matrices by name, see :meth:`~load_cached_parameters`.
+        """
+        cache_folder = self._cache_folder()
+        if not cache_folder:
+            return
+        folder = cache_folder.joinpath(topology_hash)
+        try:
+            folder.mkdir(parents=True, exist_ok=True)
+            # files are written under a temporary name, so that only complete files are loaded
+            for param, matrix in parameters.items():
+                np.save(folder.joinpath(param + ".tmp.npy"), matrix)
+                folder.joinpath(param + ".tmp.npy").replace(folder.joinpath(param + ".npy"))
+            tools.evict_cache(cache_folder, self.options["grid"]["topology_cache"]["max_size"],
+                              self.logger)
+        except OSError:
+            self.logger.warning("Could not save grid parameters to cache.")
+            for param in parameters:
+                if folder.joinpath(param + ".tmp.npy").is_file():
+                    folder.joinpath(param + ".tmp.npy").unlink()
+
     def check_slack(self):
         """Check slack configuration from input data.
 
         By checking the components of the network, i.e. the Node-to-Node incidence matrix.
         For Each component it is checked if a slack is defined, and if not the first node
         will be set as a slack. Therefore, each subnetwork will be balanced.
+
+        The component labels are kept as attributes *node_components* and *line_components*.
         """
-        A = self.create_incidence_matrix()
-        network_components = scipy.sparse.csgraph.connected_components(np.dot(A.T, A))
+        A = self.create_incidence_matrix(sparse=True)
+        number_of_components, self.node_components = \
+            scipy.sparse.csgraph.connected_components(A.T.dot(A), directed=False)
+        node_i, _ = self._incidence_indices()
+        self.line_components = self.node_components[node_i]
         self.logger.info("The network consits of %d components. Making sure a slack is set for each.",
-                         network_components[0])
-        for i in range(0, network_components[0]):
-            condition_subnetwork = network_components[1] == i
-            if not any(self.nodes.loc[condition_subnetwork, "slack"]):
-                # self.nodes.loc[condition_subnetwork, "slack"][0] = True
-                self.nodes.loc[self.nodes.index[np.argmax(condition_subnetwork)], "slack"] = True
+                         number_of_components)
+        _, first_node = np.unique(self.node_components, return_index=True)
+        components_with_slack = np.unique(self.node_components[self.nodes.slack.values])
+        missing_slack = np.setdiff1d(np.arange(0, number_of_components), components_with_slack)
+        self.nodes.loc[self.nodes.index[first_node[missing_slack]], "slack"] = True
         self.multiple_slack = bool(len(self.nodes.index[self.nodes.slack]) > 1)
 
     def check_grid_topology(self):
@@ -127,19 +292,19 @@ class GridTopology():
         """
         self.logger.info("Checking Grid Topology...")
 
-        radial_nodes = []
-        for node in self.nodes.index:
-            if len(self.lines[(self.lines.node_i == node) | (self.lines.node_j == node)]) < 2:
-                radial_nodes.append(node)
+        # Number of lines connected to each node, lines connecting a node with itself count once.
+        connected_nodes = pd.concat([self.lines.node_i,
+                                     self.lines.node_j[self.lines.node_i != self.lines.node_j]])
+        number_of_lines = connected_nodes.value_counts().reindex(self.nodes.index, fill_value=0)
+        radial_nodes = list(self.nodes.index[number_of_lines.values < 2])
 
-        radial_lines = []
-        for idx, line in enumerate(self.lines.index):
-            tmp = np.abs(self.ptdf[idx, :])
-            tmp = np.around(tmp, decimals=3)
-            if 1 in tmp:
-                radial_lines.append(line)
-#           elif self.lines.at["l1", "b"] == 0:
-#               radial_lines.append(line)
+        # Radial lines carry the full injection of at least one node, checked in blocks of lines
+        # to avoid copies of the full ptdf.
+        radial = np.zeros(len(self.lines), dtype=bool)
+        for start in range(0, len(self.lines), 1000):
+            ptdf = np.abs(self.ptdf[start:start + 1000])
+            radial[start:start + 1000] = np.any(np.around(ptdf, decimals=3) == 1, axis=1)
+        radial_lines = list(self.lines.index[radial])
 
         condition = (self.lines.node_i.isin(radial_nodes)) | \
                     (self.lines.node_j.isin(radial_nodes)) & self.lines.contingency
@@ -161,16 +326,9 @@ class GridTopology():
     def add_number_of_systems(self):
         """Add number of systems to lines dataframe, i.e. how many systems a line is part of."""
 
-        tmp = self.lines[["node_i", "node_j"]].copy()
-        tmp.loc[:, "systems"] = 1
-        tmp = tmp.groupby(["node_i", "node_j"]).sum()
-        tmp = tmp.reset_index()
-        self.lines.loc[:, "systems"] = 1
-        self.lines.loc[:, "no"] = 1
-        for node_i, node_j, systems in zip(tmp.node_i, tmp.node_j, tmp.systems):
-            condition = (self.lines.node_i == node_i)&(self.lines.node_j == node_j)
-            self.lines.loc[condition, "systems"] = systems
-            self.lines.loc[condition, "no"] = np.array([nr for nr in range(0, systems)])
+        systems = self.lines.groupby(["node_i", "node_j"], sort=False)
+        self.lines.loc[:, "systems"] = systems["node_i"].transform("size").values
+        self.lines.loc[:, "no"] = systems.cumcount().values
 
     def create_contingency_groups(self, option="double_lines"):
         """Create contingency groups i.e. contingencies that occur together.
@@ -196,16 +354,15 @@ class GridTopology():
             if "systems" not in self.lines.columns:
                 self.add_number_of_systems()
           
-        double_lines = list(self.lines[self.lines.systems == 2].index)
-        for line in double_lines:
-            condition = (self.lines.loc[double_lines, ["node_i", "node_j"]].apply(tuple, axis=1) == tuple(self.lines.loc[line, ["node_i", "node_j"]])).values
-            double_line = list(self.lines.loc[double_lines][condition].index)
-            double_line_idx = [self.lines.index.get_loc(line) for line in double_line]
+        double_lines = self.lines.loc[self.lines.systems == 2, ["node_i", "node_j"]]
+        for _, group in double_lines.groupby(["node_i", "node_j"], sort=False):
+            double_line = list(group.index)
+            double_line_idx = self.lines.index.get_indexer(double_line)
             
             # However if the double line is radial, do not consider a combined outage
             if not any(np.sum(np.around(np.abs(self.ptdf[double_line_idx, :]), decimals=3), axis=0) == 1):
-                combined_contingencies[line] = double_line
-            # combined_contingencies[line] = list(set(combined_contingencies[line]))
+                for line in double_line:
+                    combined_contingencies[line] = list(double_line)
 
         return combined_contingencies
 
@@ -224,48 +381,105 @@ class GridTopology():
         """
         # Creates Slack zones, given that the given slacks are well suited
         # Meaning one slack per zone, all zones have a slack.
-        # Method: slack -> find Line -> look at ptdf
-        # all non-zero elements are in slack zone.
-        slacks = self.nodes.index[self.nodes.slack]
+        # All (non-slack) nodes of the component of each slack are in its slack zone.
+        slack = self.nodes.slack.values
+        components = self._components()
         slack_zones = {}
-        for slack in slacks:
-            condition = (self.lines.node_i == slack) | (self.lines.node_j == slack)
-            if self.lines.index[condition].empty:
-                slack_zones[slack] = [slack]
-            else:
-                slack_line = self.lines.index[condition][0]
-                line_index = self.lines.index.get_loc(slack_line)
-                pos = self.ptdf[line_index, :] != 0
-                tmp = list(self.nodes.index[pos])
-                tmp.append(slack)
-                slack_zones[slack] = tmp
-
+        for slack_idx in np.flatnonzero(slack):
+            nodes_idx, _ = components[self.node_components[slack_idx]]
+            nodes_idx = nodes_idx[~slack[nodes_idx]]
+            slack_zones[self.nodes.index[slack_idx]] = list(self.nodes.index[nodes_idx]) + [self.nodes.index[slack_idx]]
         return slack_zones
 
-    def create_incidence_matrix(self):
+    def _components(self):
+        """Return integer indices of nodes and lines of each connected component."""
+        number_of_components = self.node_components.max() + 1 if len(self.nodes) > 0 else 0
+        components = []
+        for labels in [self.node_components, self.line_components]:
+            order = np.argsort(labels, kind="stable")
+            split = np.cumsum(np.bincount(labels, minlength=number_of_components))[:-1]
+            components.append(np.split(order, split))
+        return list(zip(*components))
+
+    def _component_grid(self, nodes_idx, lines_idx):
+        """Return a GridTopology of a connected component."""
+        grid = GridTopology(self.options)
+        grid.nodes, grid.lines = self.nodes.iloc[nodes_idx], self.lines.iloc[lines_idx]
+        grid.node_components = np.zeros(len(nodes_idx), dtype=int)
+        grid.line_components = np.zeros(len(lines_idx), dtype=int)
+        grid.incidence_matrix = grid.create_incidence_matrix()
+        return grid
+
+    def _map_components(self, func, arguments):
+        """Apply func to the arguments of each component, in parallel if option *processes* > 1."""
+        processes = self.options["grid"]["processes"]
+        if processes > 1 and len(arguments) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+                return list(executor.map(func, *zip(*arguments)))
+        return [func(*args) for args in arguments]
+
+    def _is_multi_component(self):
+        """Return True if the network consists of multiple components with lines."""
+        return self.line_components is not None and len(np.unique(self.line_components)) > 1
+
+    def _incidence_indices(self):
+        """Return integer indices of the from (node_i) and to (node_j) node of each line."""
+        node_i = self.nodes.index.get_indexer(self.lines.node_i)
+        node_j = self.nodes.index.get_indexer(self.lines.node_j)
+        if any(node_i == -1) or any(node_j == -1):
+            raise KeyError("Not all node_i/node_j of lines are indices of nodes!")
+        return node_i, node_j
+
+    def create_incidence_matrix(self, sparse=False):
         """Create incidence matrix from *lines* and *nodes* attributes.
 
+        Parameters
+        ----------
+        sparse : bool, optional
+            Return the incidence matrix as scipy.sparse.csr_matrix.
+
         Returns
         -------
-        incidence : np.ndarray
+        incidence : np.ndarray, scipy.sparse.csr_matrix
             Incidence matrix.
         """
+        if sparse:
+            rows = np.arange(0, len(self.lines))
+            node_i, node_j = self._incidence_indices()
+            data = np.hstack([np.ones(len(rows)), -np.ones(len(rows))])
+            return scipy.sparse.csr_matrix((data, (np.hstack([rows, rows]), np.hstack([node_i, node_j]))),
+                                           shape=(len(self.lines), len(self.nodes)))
+
+        rows = np.arange(0, len(self.lines))
+        node_i, node_j = self._incidence_indices()
         incidence = np.zeros((len(self.lines), len(self.nodes)))
-        for i, elem in enumerate(self.lines.index):
-            incidence[i, self.nodes.index.get_loc(self.lines.node_i[elem])] = 1
-            incidence[i, self.nodes.index.get_loc(self.lines.node_j[elem])] = -1
+        incidence[rows, node_i] = 1
+        incidence[rows, node_j] = -1
         return incidence
 
-    def create_susceptance_matrices(self):
+    def create_susceptance_matrices(self, sparse=False):
         """Create Line (Bl) and Node (Bn) susceptance matrix.
 
+        Parameters
+        ----------
+        sparse : bool, optional
+            Return both matrices as scipy.sparse.csr_matrix, based on a sparse
+            incidence matrix.
+
         Returns
         -------
-        line_susceptance : np.ndarray
+        line_susceptance : np.ndarray, scipy.sparse.csr_matrix
             Line susceptance matrix.
-        node_susceptance : np.ndarray
+        node_susceptance : np.ndarray, scipy.sparse.csr_matrix
             Node susceptance matrix.
         """
+        if sparse:
+            incidence = self.create_incidence_matrix(sparse=True)
+            susceptance_diag = scipy.sparse.diags(self.lines.b.values.astype(float))
+            line_susceptance = (susceptance_diag @ incidence).tocsr()
+            node_susceptance = (incidence.T @ line_susceptance).tocsr()
+            return line_susceptance, node_susceptance
+
         susceptance_vector = self.lines.b
         incidence = self.incidence_matrix
         susceptance_diag = np.diag(susceptance_vector)
@@ -281,8 +495,23 @@ class GridTopology():
         network.
 
         The ptdf matrix is calculated based on the topology and line parameters
-        (i.e. line susceptance).
+        (i.e. line susceptance). Depending on the option *ptdf_method* this is
+        done by inverting the dense nodal susceptance matrix or with
+        :meth:`~create_ptdf_matrix_sparse`.
         """
+        if self._is_multi_component():
+            components = [(nodes_idx, lines_idx) for nodes_idx, lines_idx in self._components()
+                          if len(lines_idx) > 0]
+            results = self._map_components(_component_ptdf, [(self._component_grid(nodes_idx, lines_idx), )
+                                                             for nodes_idx, lines_idx in components])
+            ptdf = np.zeros((len(self.lines), len(self.nodes)))
+            for (nodes_idx, lines_idx), component_ptdf in zip(components, results):
+                ptdf[np.ix_(lines_idx, nodes_idx)] = component_ptdf
+            return ptdf
+
+        if self.options["grid"]["ptdf_method"] == "sparse":
+            return self.create_ptdf_matrix_sparse()
+
         # Find slack
         slack = list(self.nodes.index[self.nodes.slack])
         slack_idx = [self.nodes.index.get_loc(s) for s in slack]
@@ -300,6 +529,36 @@ class GridTopology():
         ptdf = np.dot(line_susceptance, node_susceptance_inv)
         return ptdf
 
+    def create_ptdf_matrix_sparse(self, block_size=1000):
+        """Create ptdf matrix based on a sparse LU factorization.
+
+        Instead of inverting the dense nodal susceptance matrix, the reduced
+        nodal susceptance matrix (without slacks) is factorized as sparse LU and
+        the ptdf is obtained by triangular solves with the (sparse) line
+        susceptance matrix as right hand side. Since the reduced nodal susceptance
+        matrix is symmetric :math:`PTDF^T = B_n^{-1} B_l^T`. The result is identical
+        to the dense calculation.
+
+        Parameters
+        ----------
+        block_size : int, optional
+            Number of lines solved for at once, bounds the size of the dense
+            right hand side.
+        """
+        slack_idx = self.nodes.index.get_indexer(self.nodes.index[self.nodes.slack])
+        list_wo_slack = np.setdiff1d(np.arange(0, len(self.nodes)), slack_idx)
+        line_susceptance, node_susceptance = self.create_susceptance_matrices(sparse=True)
+
+        node_susceptance_wo_slack = node_susceptance[list_wo_slack, :][:, list_wo_slack].tocsc()
+        factorization = scipy.sparse.linalg.splu(node_susceptance_wo_slack)
+        rhs = line_susceptance[:, list_wo_slack].T.tocsc()
+
+        ptdf = np.zeros((len(self.lines), len(self.nodes)))
+        for start in range(0, len(self.lines), block_size):
+            end = min(start + block_size, len(self.lines))
+            ptdf[start:end, list_wo_slack] = factorization.solve(rhs[:, start:end].toarray()).T
+        return ptdf
+
     def create_psdf_matrix(self):
         """Calculate psdf (phase-shifting distribution matrix, LxLL).
 
@@ -314,23 +573,239 @@ class GridTopology():
     def shift_phase_on_line(self, phase_shift):
         """Shifts the phase on line l by angle a (in rad).
 
-        Recalculates the ptdf matrix. This is a static representation of a
-        phase shift rather than a dynamic (and useful one).
+        Updates the ptdf matrix. This is a static representation of a
+        phase shift rather than a dynamic (and useful one):
+        :math:`PTDF' = PTDF + PSDF_{:,S} \\cdot diag(a) \\cdot PTDF_{S,:}` for the set of
+        shifted lines S. As this is a low-rank update, ptdf and lodf are
+        updated in place with :meth:`~_low_rank_update` instead of being
+        recalculated. Each phase shift can be reverted with :meth:`~undo_phase_shift`.
 
         Parameters
         ----------
         phase_shift : dict
             dict with line as key, phase shift [rad] as value.
         """
-        shift = np.zeros(len(self.lines))
-        for line in phase_shift:
-            shift[self.lines.index.get_loc(line)] = phase_shift[line]
-        # recalculate ptdf and lodf
-        shift_matrix = np.multiply(self.psdf, shift)
-        self.ptdf += np.dot(shift_matrix, self.ptdf)
-        self.lodf = self.create_n_1_lodf_matrix()
+        lines_idx = self.lines.index.get_indexer(list(phase_shift))
+        if any(lines_idx == -1):
+            raise KeyError("Not all phase shifted lines are indices of lines!")
+        shift = np.array(list(phase_shift.values()), dtype=self.ptdf.dtype)
+        update = self.psdf[:, lines_idx] * shift
+        self._low_rank_update(lines_idx, update)
+        self._phase_shift_updates.append((lines_idx, update))
+
+    def undo_phase_shift(self):
+        """Revert the last phase shift applied with :meth:`~shift_phase_on_line`.
+
+        The inverse of the update :math:`I + U E_S` is again a low-rank update,
+        :math:`I - U (I + U_{S,:})^{-1} E_S`, where :math:`E_S` selects the rows of
+        the shifted lines S.
+        """
+        if not self._phase_shift_updates:
+            self.logger.warning("No phase shift to undo.")
+            return
+        lines_idx, update = self._phase_shift_updates.pop()
+        inverse = np.linalg.inv(np.eye(len(lines_idx)) + update[lines_idx, :])
+        self._low_rank_update(lines_idx, -np.dot(update, inverse).astype(self.ptdf.dtype))
+
+    def _low_rank_update(self, lines_idx, update):
+        """Update ptdf and lodf in place by :math:`PTDF' = (I + U E_S) PTDF`.
+
+        With :math:`M = PTDF \\cdot A^T` the lodf is :math:`M_{l,o} / (1 - M_{o,o})`, see
+        :meth:`~create_n_1_lodf_matrix`. Since :math:`M' = M + U M_{S,:}`, the
+        lodf is updated from the rows S of M and the diagonal of M, without
+        recalculating M from the full ptdf.
+
+        Parameters
+        ----------
+        lines_idx : np.ndarray
+            Integer indices of the lines S.
+        update : np.ndarray
+            Update matrix U :math:`(L \\times |S|)`.
+        """
+        node_i, node_j = self._incidence_indices()
+        contingency = np.flatnonzero(self.lines.contingency.values)
+        ptdf_rows = self.ptdf[lines_idx]
+        ptdf_incidence_rows = ptdf_rows[:, node_i] - ptdf_rows[:, node_j]
+        diagonal = self.ptdf[np.arange(0, len(self.lines)), node_i] - self.ptdf[np.arange(0, len(self.lines)), node_j]
+        new_diagonal = diagonal + np.sum(update * ptdf_incidence_rows.T, axis=1)
+
+        # M for all contingencies from the lodf, the diagonal was set to -1.
+        ptdf_incidence = self.lodf[:, contingency] * (1 - diagonal[contingency])
+        ptdf_incidence[contingency, np.arange(0, len(contingency))] = diagonal[contingency]
+        ptdf_incidence += np.dot(update, ptdf_incidence_rows[:, contingency])
+        try:
+            self.lodf[:, contingency] = ptdf_incidence / (1 - new_diagonal[contingency])
+        except FloatingPointError:
+            raise ZeroDivisionError('LODFError: Check Slacks, radial Lines/Nodes')
+        self.lodf[contingency, contingency] = -1
+        self.ptdf += np.dot(update, ptdf_rows)
+        self._lodf_screening = {}
+
+    def phase_shift_flows(self, injections, phase_shifts):
+        """Calculate line flows for a batch of phase shifts.
+
+        For nodal injections and each set of phase shifts (see
+        :meth:`~shift_phase_on_line`) the line flows are
+        :math:`F + PSDF_{:,S} \\cdot diag(a) \\cdot F_S`, with the flows F based on the current ptdf.
+        This does not change the ptdf and all phase shifts are evaluated in one product,
+        which allows to efficiently sweep over phase shifter settings.
+
+        Parameters
+        ----------
+        injections : np.ndarray
+            Nodal injections (N).
+        phase_shifts : pd.DataFrame
+            Phase shifts [rad] with lines as columns, one set of phase shifts per row.
+
+        Returns
+        -------
+        flows : pd.DataFrame
+            Line flows with lines as index, one column per row of *phase_shifts*.
+        """
+        lines_idx = self.lines.index.get_indexer(phase_shifts.columns)
+        if any(lines_idx == -1):
+            raise KeyError("Not all phase shifted lines are indices of lines!")
+        flow = np.dot(self.ptdf, injections)
+        flows = flow[:, np.newaxis] + np.dot(self.psdf[:, lines_idx],
+                                            phase_shifts.values.T * flow[lines_idx, np.newaxis])
+        return pd.DataFrame(index=self.lines.index, columns=phase_shifts.index, data=flows)
+
+    def switch_lines(self, susceptance):
+        """Return ptdf and lodf for lines with changed susceptance.
+
+        Lines are switched off by setting their susceptance to 0 or re-parameterized,
+        e.g. after upgrades, with a new susceptance. Instead of recalculating the grid
+        parameters, the ptdf is updated with the Sherman-Morrison-Woodbury formula:
+        with :math:`M = PTDF \\cdot A^T`, the changed lines S and their change in
+        susceptance :math:`\\Delta b`
+
+        .. math:: PTDF' = diag(b'/b) (PTDF - M_{:,S} (diag(b_S/\\Delta b) + M_{S,S})^{-1} PTDF_{S,:})
+
+        and the lodf follows in closed form from the updated ptdf, see
+        :meth:`~create_n_1_lodf_matrix`. Switched off lines and lines that become
+        radial are not considered as contingency.
+
+        This does not change the GridTopology, to temporarily apply the changes
+        use :meth:`~switched_lines`.
+
+        Parameters
+        ----------
+        susceptance : dict
+            dict with line as key, new susceptance as value.
+
+        Returns
+        -------
+        ptdf : np.ndarray
+            Updated ptdf matrix.
+        lodf : np.ndarray
+            Updated N-1 lodf matrix.
+
+        Raises
+        ------
+        ZeroDivisionError
+            If switching off the lines disconnects the network.
+        """
+        ptdf, _, lodf, _ = self._switched_parameters(susceptance)
+        return ptdf, lodf
 
-    def create_n_1_lodf_matrix(self):
+    @contextlib.contextmanager
+    def switched_lines(self, susceptance):
+        """Context manager that temporarily changes the susceptance of lines.
+
+        Within the context, ptdf, psdf, lodf, the susceptance and contingency of lines and
+        the contingency groups represent the switched topology (see :meth:`~switch_lines`).
+        The original state is restored on exit.
+
+        Parameters
+        ----------
+        susceptance : dict
+            dict with line as key, new susceptance as value.
+        """
+        ptdf, psdf, lodf, contingency = self._switched_parameters(susceptance)
+        original = (self.ptdf, self.psdf, self.lodf, self.combined_contingencies,
+                    self.lines.b.copy(), self.lines.contingency.copy(), self._lodf_screening)
+        try:
+            self.ptdf, self.psdf, self.lodf = ptdf, psdf, lodf
+            self._lodf_screening = {}
+            self.lines.loc[list(susceptance), "b"] = list(susceptance.values())
+            self.lines.loc[:, "contingency"] = contingency
+            self.combined_contingencies = self.create_contingency_groups()
+            yield self
+        finally:
+            self.ptdf, self.psdf, self.lodf, self.combined_contingencies = original[:4]
+            self.lines.loc[:, "b"] = original[4]
+            self.lines.loc[:, "contingency"] = original[5]
+            self._lodf_screening = original[6]
+
+    def _switched_parameters(self, susceptance):
+        """Return ptdf, psdf, lodf and contingencies for lines with changed susceptance."""
+        lines_idx = self.lines.index.get_indexer(list(susceptance))
+        if any(lines_idx == -1):
+            raise KeyError("Not all switched lines are indices of lines!")
+        b = self.lines.b.values.astype(float)
+        new_b = b.copy()
+        new_b[lines_idx] = list(susceptance.values())
+        lines_idx = lines_idx[new_b[lines_idx] != b[lines_idx]]
+        if any(b[lines_idx] == 0):
+            raise ValueError("Lines without susceptance cannot be re-parameterized.")
+
+        node_i, node_j = self._incidence_indices()
+        ptdf_incidence = self.ptdf[:, node_i[lines_idx]] - self.ptdf[:, node_j[lines_idx]]
+        capacitance = np.diag(b[lines_idx]/(new_b[lines_idx] - b[lines_idx])) + ptdf_incidence[lines_idx]
+        if np.linalg.cond(capacitance) > 1e10:
+            raise ZeroDivisionError("Switching off lines disconnects the network.")
+        correction = np.linalg.solve(capacitance, self.ptdf[lines_idx])
+        ratio = np.divide(new_b, b, out=np.ones(len(b)), where=b != 0)
+        ptdf = (ratio[:, np.newaxis]*(self.ptdf - np.dot(ptdf_incidence, correction))).astype(self.ptdf.dtype)
+
+        # Switched off and radial lines are no contingencies, see check_grid_topology.
+        radial = np.any(np.around(np.abs(ptdf), decimals=3) == 1, axis=1)
+        contingency = self.lines.contingency.values & (new_b != 0) & ~radial
+        lodf = self.create_n_1_lodf_matrix(ptdf, contingency)
+        psdf = np.diag(new_b) - (ptdf[:, node_i] - ptdf[:, node_j])*new_b
+        return ptdf, psdf.astype(self.ptdf.dtype), lodf, contingency
+
+    def precision_deviation(self, injections, dtype="float32"):
+        """Maximum flow deviation of grid parameters in reduced precision.
+
+        Compares N-0 and N-1 line flows, resulting from the supplied nodal
+        injections, calculated with ptdf and lodf in double precision to the
+        flows with ptdf and lodf in *dtype*. The N-1 flows include all lines
+        under all single outages. This allows to judge whether the option
+        *dtype* can be safely set to float32 for a given dataset.
+
+        Parameters
+        ----------
+        injections : np.ndarray
+            Nodal injections, either one (N) or multiple timesteps (T x N).
+        dtype : str, optional
+            Reduced precision dtype, defaults to float32.
+
+        Returns
+        -------
+        deviation : pd.Series
+            Maximum absolute flow deviation for N-0 and N-1 flows (*n_0*, *n_1*)
+            and the maximum deviation relative to line capacities (*n_0_relative*,
+            *n_1_relative*).
+        """
+        injections = np.atleast_2d(injections)
+        ptdf = self.create_ptdf_matrix()
+        lodf = self.create_n_1_lodf_matrix(ptdf)
+        # lines without capacity are excluded from the relative deviation
+        maxflow = np.where(self.lines.maxflow.values > 0, self.lines.maxflow.values, np.inf)
+        deviation = pd.Series(0., index=["n_0", "n_1", "n_0_relative", "n_1_relative"])
+        for injection in injections:
+            flow = np.dot(ptdf, injection)
+            flow_reduced = np.dot(ptdf.astype(dtype), injection.astype(dtype))
+            n_1_deviation = np.abs(flow[:, None] + lodf*flow
+                                   - (flow_reduced[:, None] + lodf.astype(dtype)*flow_reduced))
+            n_0_deviation = np.abs(flow - flow_reduced)
+            deviation = np.maximum(deviation, [n_0_deviation.max(), n_1_deviation.max(),
+                                               (n_0_deviation/maxflow).max(),
+                                               (n_1_deviation.max(axis=1)/maxflow).max()])
+        return deviation
+
+    def create_n_1_lodf_matrix(self, ptdf=None, contingency=None):
         """Create N-1 LODF matrix.
 
         The lodf matrix represents a line to line sensitivity in the case of
@@ -342,10 +817,52 @@ class GridTopology():
         This LODF matrix therefore represents the N-1 case, as only one outage 
         is considered per case. Multiple contingencies have to be explicitly calculated 
         with the more general :meth:`~create_lodf` method.
+
+        The matrix is calculated in closed form for all outages at once: with
+        :math:`M = PTDF \\cdot A^T` the lodf for line l and outage o is
+        :math:`M_{l,o} / (1 - M_{o,o})` and -1 for the outaged line itself. Outages
+        of lines that cannot be a contingency (see :meth:`~check_grid_topology`)
+        remain 0.
+
+        Parameters
+        ----------
+        ptdf : np.ndarray, optional
+            ptdf matrix the lodf is based on, defaults to the ptdf attribute.
+        contingency : np.ndarray, optional
+            Boolean array indicating which lines are contingencies, defaults to
+            the contingency attribute of lines.
+
+        Raises
+        ------
+        ZeroDivisionError
+            Indicates error in configuration of slack(s) or contingencies.
         """
-        
-        lodf = np.hstack([self.create_lodf([line for line in range(0, len(self.lines))], 
-                                           [outage]) for outage in range(0, len(self.lines))])   
+        ptdf = self.ptdf if ptdf is None else ptdf
+        if contingency is None:
+            contingency = self.lines.contingency.values
+        if self._is_multi_component():
+            components = [(nodes_idx, lines_idx) for nodes_idx, lines_idx in self._components()
+                          if len(lines_idx) > 0]
+            results = self._map_components(_component_lodf, [(self._component_grid(nodes_idx, lines_idx),
+                                                              ptdf[np.ix_(lines_idx, nodes_idx)],
+                                                              contingency[lines_idx])
+                                                             for nodes_idx, lines_idx in components])
+            lodf = np.zeros((len(self.lines), len(self.lines)), dtype=ptdf.dtype)
+            for (_, lines_idx), component_lodf in zip(components, results):
+                lodf[np.ix_(lines_idx, lines_idx)] = component_lodf
+            return lodf
+
+        node_i, node_j = self._incidence_indices()
+        # PTDF * A^T, i.e. the flow on each line from a unit transfer between the nodes of each line
+        ptdf_incidence = ptdf[:, node_i] - ptdf[:, node_j]
+        contingency = np.flatnonzero(contingency)
+
+        lodf = np.zeros((len(self.lines), len(self.lines)), dtype=ptdf.dtype)
+        try:
+            lodf[:, contingency] = ptdf_incidence[:, contingency] / (1 - ptdf_incidence[contingency, contingency])
+        except FloatingPointError:
+            raise ZeroDivisionError('LODFError: Check Slacks, radial Lines/Nodes')
+        lodf[contingency, contingency] = -1
         return lodf
 
     def create_lodf(self, lines, outages):
@@ -381,7 +898,7 @@ class GridTopology():
             Indicates error in configuration of slack(s) or contingencies.
         """
         try:
-            A = self.incidence_matrix            
+            node_i, node_j = self._incidence_indices()
             # LODF LxO matrix
             lodf = np.zeros((len(lines), len(outages)))
             
@@ -389,18 +906,21 @@ class GridTopology():
             outages = [outage for outage in outages if self.lines.iloc[outage].contingency]
         
             # LODF for outaged line is set to -1
-            outages_in_lines = [line in outages for line in lines]
-            lines_in_outages = [outage in lines for outage in outages]
-            lodf[outages_in_lines, lines_in_outages] = -1
+            for col, outage in enumerate(outages):
+                lodf[[line == outage for line in lines], col] = -1
             
             # For all lines that are not outaged as part of the contingency the LODF is calculated
             valid_lines = [line not in outages for line in lines]
             lines = [line for line in lines if not line in outages]
          
-            if len(outages) > 0:        
-                lodf[valid_lines, :] = np.dot(self.ptdf[lines, :] @ A[outages, :].reshape(len(outages), len(self.nodes)).T,
-                                              np.linalg.inv(np.eye(len(outages)) - (self.ptdf[outages, :] 
-                                                            @ A[outages,:].reshape(len(outages), len(self.nodes)).T)))
+            if len(outages) > 0:
+                # PTDF * A^T for the outaged lines, obtained by indexing instead of a matrix product.
+                # The product with the (small) inverse is done elementwise, so that each row
+                # is calculated identically, independent of how many lines are requested.
+                ptdf_incidence = self.ptdf[np.ix_(lines, node_i[outages])] - self.ptdf[np.ix_(lines, node_j[outages])]
+                outage_incidence = self.ptdf[np.ix_(outages, node_i[outages])] - self.ptdf[np.ix_(outages, node_j[outages])]
+                inverse = np.linalg.inv(np.eye(len(outages)) - outage_incidence)
+                lodf[valid_lines, :] = np.sum(ptdf_incidence[:, :, np.newaxis] * inverse[np.newaxis, :, :], axis=1)
                 
             return lodf
 
@@ -440,13 +960,49 @@ class GridTopology():
         if not isinstance(line, int):
             line = self.lines.index.get_loc(line)
 
-        condition = abs(np.multiply(self.lodf[line], self.lines.maxflow.values)) >= \
-            sensitivity*self.lines.maxflow[line]
-
+        outages = self.lodf_screening(sensitivity)[line].indices
         if as_index:
-            return [self.lines.index.get_loc(line) for line in self.lines.index[condition]]
+            return list(outages)
         else:
-            return self.lines.index[condition]
+            return self.lines.index[outages]
+
+    def lodf_screening(self, sensitivity=5e-2):
+        """Return which outages impact each line with more than the specified sensitivity.
+
+        Vectorized version of :meth:`~lodf_filter` for all lines: entry (l, o) is True
+        if the outage of line o, in the worst case of it being fully loaded, impacts
+        line l with more than *sensitivity* of its capacity, i.e.
+        :math:`|LODF_{l,o}| \\cdot maxflow_o \\geq sensitivity \\cdot maxflow_l`.
+
+        The result is memoized per sensitivity and line capacities, so that all methods 
+        that screen outages share it, and reset when the lodf changes.
+
+        Parameters
+        ----------
+        sensitivity : float, optional
+            The sensitivity defines the threshold from which outages are
+            considered critical.
+
+        Returns
+        -------
+        screening : scipy.sparse.csr_matrix
+            Boolean :math:`(L \\times L)` matrix with lines as rows and outages as columns.
+        """
+        maxflow = self.lines.maxflow.values
+        key = (sensitivity, tools.array_hash(maxflow))
+        if key not in self._lodf_screening:
+            # screenings of previous line capacities are outdated
+            self._lodf_screening = {memo_key: screening for memo_key, screening in self._lodf_screening.items()
+                                    if memo_key[1] == key[1]}
+            blocks = []
+            for start in range(0, len(self.lines), 1000):
+                lodf = np.abs(self.lodf[start:start + 1000] * maxflow)
+                blocks.append(scipy.sparse.csr_matrix(lodf >= sensitivity*maxflow[start:start + 1000, np.newaxis]))
+            screening = scipy.sparse.vstack(blocks, format="csr") if blocks else \
+                scipy.sparse.csr_matrix((0, 0), dtype=bool)
+            screening.sort_indices()
+            self._lodf_screening[key] = screening
+        return self._lodf_screening[key]
 
     def create_n_1_ptdf_line(self, line):
         """Create N-1 ptdf for one specific line and all other lines as outages.
@@ -526,12 +1082,127 @@ class GridTopology():
         if not isinstance(line, int):
             line = self.lines.index.get_loc(line)
 
-        outages = [self.lines.index.get_loc(line) for line in self.combined_contingencies[self.lines.index[outage]]]
+        return self.create_n_1_ptdf_cbcos([line], [outage])
+
+    def create_n_1_ptdf_cbcos(self, lines, outages):
+        """Create N-1 ptdf for pairs of lines (cb) and outages (co).
 
-        n_1_ptdf_cbco = self.ptdf[line, :] + np.dot(self.create_lodf([line], outages), self.ptdf[outages, :])
-        return n_1_ptdf_cbco
+        Batched version of :meth:`~create_n_1_ptdf_cbco`. For outages that are
+        not part of a combined contingency (see :meth:`~create_contingency_groups`)
+        all rows are derived at once from the N-1 lodf matrix as
+        :math:`PTDF_{cb} + LODF_{cb, co} PTDF_{co}`. Outages with combined
+        contingencies are grouped, so that the lodf is calculated once per
+        group for all affected lines.
+
+        Parameters
+        ----------
+        lines : list(int), np.ndarray
+            Integer indices of the lines (cb).
+        outages : list(int), np.ndarray
+            Integer indices of the outages (co), same length as *lines*.
+
+        Returns
+        -------
+        ptdf : np.ndarray
+            Returns ptdf matrix (len(lines) x N), each row is the ptdf of a line
+            under the corresponding outage.
+        """
+        lines = np.asarray(lines, dtype=int)
+        outages = np.asarray(outages, dtype=int)
+
+        combined_outages = {}
+        for outage in np.unique(outages):
+            tmp = self.combined_contingencies[self.lines.index[outage]]
+            if len(tmp) > 1:
+                combined_outages[outage] = tuple(self.lines.index.get_indexer(tmp))
+
+        single = ~np.isin(outages, list(combined_outages))
+        n_1_ptdf = np.empty((len(lines), len(self.nodes)), dtype=self.ptdf.dtype)
+        n_1_ptdf[single] = self.ptdf[lines[single]] \
+                           + self.lodf[lines[single], outages[single], np.newaxis] * self.ptdf[outages[single]]
+
+        groups = {}
+        for outage, group in combined_outages.items():
+            groups.setdefault(group, []).append(outage)
+        for group, group_outages in groups.items():
+            rows = np.flatnonzero(np.isin(outages, group_outages))
+            group_lines, inverse = np.unique(lines[rows], return_inverse=True)
+            lodf = self.create_lodf(list(group_lines), list(group))[inverse]
+            n_1_ptdf[rows] = self.ptdf[lines[rows]] \
+                             + np.sum(lodf[:, :, np.newaxis] * self.ptdf[np.newaxis, list(group), :], axis=1)
+        return n_1_ptdf
 
-    def create_filtered_n_1_ptdf(self, sensitivity=5e-2):
+    def filtered_cbco_indices(self, sensitivity=5e-2):
+        """Return integer indices of all contingency lines (cb) and outages (co) with significant impact.
+
+        Vectorized equivalent to applying :meth:`~lodf_filter` on all lines that
+        are contingencies. The returned pairs are ordered by line and outage.
+
+        Parameters
+        ----------
+        sensitivity : float, optional
+            The sensitivity defines the threshold from which outages are
+            considered critical.
+
+        Returns
+        -------
+        lines, outages : np.ndarray
+            Integer indices of cb and co.
+        """
+        contingency = np.flatnonzero(self.lines.contingency.values)
+        lines, outages = self.lodf_screening(sensitivity)[contingency].nonzero()
+        return contingency[lines], outages
+
+    def cbco_codes(self, cb, co):
+        """Return integer codes of pairs of critical branches (cb) and outages (co).
+
+        The code of line cb under outage co is :math:`cb (L + 1) + co + 1`, with the integer
+        indices of cb and co in *lines* and co = -1 for the basecase (no outage). Codes allow to
+        compare and join cbco's as integer arrays instead of by their labels, see :meth:`~cbco_labels`.
+
+        Parameters
+        ----------
+        cb : list-like
+            Line indices of the critical branches.
+        co : list-like
+            Line indices of the outages or *basecase*.
+
+        Returns
+        -------
+        codes : np.ndarray
+            Integer codes, -1 for cb or co that are not in *lines*.
+        """
+        basecase = pd.Index(co).isin(["basecase"])
+        cb_index = self.lines.index.get_indexer(pd.Index(cb))
+        co_index = np.where(basecase, -1, self.lines.index.get_indexer(pd.Index(co)))
+        codes = cb_index*(len(self.lines) + 1) + co_index + 1
+        invalid = (cb_index < 0) | ((co_index < 0) & ~basecase)
+        codes[invalid] = -1
+        return codes
+
+    def cbco_labels(self, codes):
+        """Return the labels *cb_co* of cbco codes.
+
+        The labels are only created once for each distinct code, from the labels of
+        the lines and outages.
+
+        Parameters
+        ----------
+        codes : np.ndarray
+            Integer codes, see :meth:`~cbco_codes`.
+
+        Returns
+        -------
+        labels : np.ndarray
+            Labels *cb_co* of the codes.
+        """
+        unique_codes, inverse = np.unique(np.asarray(codes, dtype=int), return_inverse=True)
+        cb_index, co_index = np.divmod(unique_codes, len(self.lines) + 1)
+        lines = np.array(self.lines.index.astype(str), dtype=object)
+        outages = np.hstack([np.array(["basecase"], dtype=object), lines])
+        return (lines[cb_index] + "_" + outages[co_index])[inverse]
+
+    def create_filtered_n_1_ptdf(self, sensitivity=5e-2, lines=None):
         """Create a N-1 ptdf/info containing all lines under outages with significant impact.
 
         Create a ptdf that covers the N-0 ptdf (with the outage indicated as
@@ -557,6 +1228,8 @@ class GridTopology():
             considered critical. A outage that can impact the lineflow,
             relative to its maximum capacity, more than the sensitivity is
             considered critical.
+        lines : list, pd.Index, optional
+            Restrict the ptdf to these lines (cb), e.g. the lines of a zone, defaults to all lines.
 
         Returns
         -------
@@ -567,27 +1240,23 @@ class GridTopology():
             equal to the line capacity (but does not have to).
         """
         try:
-            A = [self.ptdf]
-            label_lines = list(self.lines.index)
-            label_outages = ["basecase" for i in range(0, len(self.lines.index))]
-
-            for line in self.lines.index[self.lines.contingency]:
-                outages = list(self.lodf_filter(line, sensitivity))
-                label_lines.extend([line for i in range(0, len(outages))])
-                label_outages.extend(outages)
+            cb, co = self.filtered_cbco_indices(sensitivity)
+            basecase = np.arange(0, len(self.lines.index))
+            if lines is not None:
+                basecase = np.sort(self.lines.index.get_indexer(pd.Index(lines)))
+                condition = np.isin(cb, basecase)
+                cb, co = cb[condition], co[condition]
+            label_lines = list(self.lines.index[basecase]) + list(self.lines.index[cb])
+            label_outages = ["basecase" for i in range(0, len(basecase))] + list(self.lines.index[co])
 
             # estimate size of array = nr_elements * bits per element (float32) / (8 * 1e6) MB
             estimate_size = len(label_lines)*len(self.nodes.index)*32/(8*1e6)
             self.logger.info(f"Estimated size in RAM for A is: {estimate_size} MB")
             if estimate_size > 3000:
-                raise ArithmeticError("Estimated Size of A too large!")
-
-            for line in self.lines.index[self.lines.contingency]:
-                outages = list(self.lodf_filter(line, sensitivity))
-                tmp_ptdf = np.vstack([self.create_n_1_ptdf_cbco(line, o) for o in outages])
-                A.append(tmp_ptdf)
+                self.logger.warning("Estimated size of A is large, consider using iterate_n_1_ptdf to "
+                                    "process the N-1 ptdf in blocks.")
 
-            A = np.concatenate(A).reshape(len(label_lines), len(list(self.nodes.index)))
+            A = np.vstack([self.ptdf[basecase], self.create_n_1_ptdf_cbcos(cb, co)])
             b = self.lines.maxflow[label_lines].values.reshape(len(label_lines), 1)
 
             df_info = pd.DataFrame(columns=list(self.nodes.index), data=A)
@@ -599,12 +1268,64 @@ class GridTopology():
         except:
             self.logger.exception('error:create_n_1_ptdf')
 
+    def iterate_n_1_ptdf(self, sensitivity=5e-2, cbco=None, block_size=None):
+        """Iterate over the N-1 ptdf in blocks of bounded size.
+
+        Generator version of :meth:`~create_filtered_n_1_ptdf`, that allows to
+        process arbitrarily large N-1 ptdf matrices in constant memory. Each block
+        contains at most *block_size* rows. Per default the rows are the N-0 ptdf
+        (with outage *basecase*) followed by all lines under outages with significant
+        impact, i.e. the same rows as in :meth:`~create_filtered_n_1_ptdf`.
+
+        Parameters
+        ----------
+        sensitivity : float, optional
+            The sensitivity defines the threshold from which outages are
+            considered critical.
+        cbco : tuple(list-like, list-like), optional
+            Explicitly define the rows by a tuple of lines (cb) and outages (co),
+            both as lines.index, where outages can be *basecase*. Overwrites the
+            sensitivity filter.
+        block_size : int, optional
+            Maximum number of rows per block, defaults to the option *n_1_block_size*.
+
+        Yields
+        ------
+        ptdf : np.ndarray
+            N-1 ptdf block (rows x N).
+        label_lines : list
+            Lines (cb) of each row.
+        label_outages : list
+            Outages (co) of each row.
+        """
+        if not block_size:
+            block_size = self.options["grid"]["n_1_block_size"]
+
+        if cbco is None:
+            cb, co = self.filtered_cbco_indices(sensitivity)
+            cb = np.hstack([np.arange(0, len(self.lines)), cb])
+            co = np.hstack([-np.ones(len(self.lines), dtype=int), co])
+        else:
+            cb = self.lines.index.get_indexer(cbco[0])
+            co = self.lines.index.get_indexer(cbco[1])
+            if any(cb == -1):
+                raise KeyError("Not all CBs are indices of lines!")
+
+        for start in range(0, len(cb), int(block_size)):
+            block_cb, block_co = cb[start:start + int(block_size)], co[start:start + int(block_size)]
+            basecase = block_co == -1
+            ptdf = np.empty((len(block_cb), len(self.nodes)), dtype=self.ptdf.dtype)
+            ptdf[basecase] = self.ptdf[block_cb[basecase]]
+            ptdf[~basecase] = self.create_n_1_ptdf_cbcos(block_cb[~basecase], block_co[~basecase])
+            label_outages = np.array(self.lines.index[block_co], dtype=object)
+            label_outages[basecase] = "basecase"
+            yield ptdf, list(self.lines.index[block_cb]), list(label_outages)
+
     def slack_zones_index(self):
         """Return the integer indices for each node per slack_zones."""
         slack_zones = self.slack_zones()
         slack_zones_idx = []
         for slack in slack_zones:
-            slack_zones_idx.append([self.nodes.index.get_loc(node)
-                                    for node in slack_zones[slack]])
+            slack_zones_idx.append(list(self.nodes.index.get_indexer(slack_zones[slack])))
         slack_zones_idx.append([x for x in range(0, len(self.nodes))])
         return slack_zones_idx
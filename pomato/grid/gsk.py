@@ -0,0 +1,88 @@
+"""Generation Shift Keys of POMATO"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import pomato.tools as tools
+
+# Generation shift keys of recent calls, keyed by a hash of the node and plant data.
+_GSK_CACHE = {}
+_GSK_CACHE_SIZE = 16
+
+def generation_shift_keys(nodes, zones, plants, fill_empty_zones=False):
+    """Create the *flat* and *gmax* generation shift keys (gsk) of all zones.
+
+    The gsk represents a node to zone mapping or the assumption on how nodal injections
+    within a zone are distributed if you only know the zonal net position. With *flat*
+    all nodes of a zone are weighted equally, with *gmax* nodes are weighted according
+    to the installed capacity of the supplied plants.
+
+    Both gsks are created at once as sparse NxZ matrices and are cached, keyed by
+    the node and plant data, as they are repeatedly used e.g. in the FBMC calculation.
+    The returned matrices are shared and should not be modified.
+
+    Parameters
+    ----------
+    nodes : pd.DataFrame
+        Nodes with column *zone*.
+    zones : pd.Index
+        Zones, defining the columns of the gsk.
+    plants : pd.DataFrame
+        Plants with columns *node* and *g_max* that determine the *gmax* gsk.
+    fill_empty_zones : bool, optional
+        Use the *flat* gsk in the *gmax* gsk for zones without capacity,
+        defaults to False, i.e. these columns are zero.
+
+    Returns
+    -------
+    gsk : dict
+        The *flat* and *gmax* gsk as scipy.sparse.csr_matrix (Nodes, Zones).
+    """
+    zones = pd.Index(zones)
+    key = tools.array_hash(nodes.index, nodes.zone, zones, plants.node, plants.g_max, [fill_empty_zones])
+    if key in _GSK_CACHE:
+        return _GSK_CACHE[key]
+
+    zone_index = zones.get_indexer(nodes.zone)
+    nodes_in_zones = np.flatnonzero(zone_index >= 0)
+    zone_index = zone_index[nodes_in_zones]
+    shape = (len(nodes), len(zones))
+
+    nodes_per_zone = np.bincount(zone_index, minlength=len(zones))
+    flat = 1/nodes_per_zone[zone_index]
+
+    gmax = plants.groupby("node").g_max.sum().reindex(nodes.index, fill_value=0).values[nodes_in_zones]
+    gmax_per_zone = np.bincount(zone_index, weights=gmax, minlength=len(zones))
+    empty_zone = gmax_per_zone[zone_index] <= 0
+    gmax = np.divide(gmax, gmax_per_zone[zone_index], out=np.zeros(len(gmax)), where=~empty_zone)
+    if fill_empty_zones:
+        gmax[empty_zone] = flat[empty_zone]
+
+    gsk = {option: sp.csr_matrix((values, (nodes_in_zones, zone_index)), shape=shape)
+           for option, values in [("flat", flat), ("gmax", gmax)]}
+    for option in gsk:
+        gsk[option].eliminate_zeros()
+
+    if len(_GSK_CACHE) >= _GSK_CACHE_SIZE:
+        _GSK_CACHE.pop(next(iter(_GSK_CACHE)))
+    _GSK_CACHE[key] = gsk
+    return gsk
+
+def zonal_ptdf(ptdf, gsk):
+    """Return the zonal ptdf, the product ptdf * gsk, in the dtype of the ptdf.
+
+    Parameters
+    ----------
+    ptdf : np.ndarray
+        Nodal ptdf (L x N).
+    gsk : np.ndarray, scipy.sparse.spmatrix
+        Generation shift key (N x Z), sparse gsks are multiplied as sparse product.
+
+    Returns
+    -------
+    zonal_ptdf : np.ndarray
+        Zonal ptdf (L x Z).
+    """
+    if sp.issparse(gsk):
+        return np.ascontiguousarray(gsk.T.astype(ptdf.dtype).dot(ptdf.T).T)
+    return np.dot(ptdf, np.asarray(gsk).astype(ptdf.dtype))
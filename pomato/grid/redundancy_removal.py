@@ -0,0 +1,277 @@
+"""Redundancy Removal of POMATO"""
+import concurrent.futures
+import itertools
+
+import numpy as np
+import pandas as pd
+import scipy.optimize
+
+# Data shared with the worker processes, set once per process by _init_worker.
+_WORKER_DATA = {}
+
+def _init_worker(A, b):
+    """Initialize worker process with the constraints Ax <= b."""
+    _WORKER_DATA["A"] = A
+    _WORKER_DATA["b"] = b
+
+def _reduce_worker(x_bounds):
+    return prescreened_redundancy_removal(_WORKER_DATA["A"], _WORKER_DATA["b"], x_bounds)
+
+def _bounds(A, x_bounds):
+    """Return the bounds of x in the format of scipy.optimize.linprog."""
+    if x_bounds is None or np.size(x_bounds) == 0:
+        return [(None, None)]*A.shape[1]
+    x_bounds = np.ravel(x_bounds)
+    return np.vstack([-x_bounds, x_bounds]).T
+
+def prescreen(A, b, x_bounds=None, decimals=6):
+    """Remove constraints of Ax <= b that are redundant without solving a LP.
+
+    Two vectorized screening stages are applied:
+        - bounds: with bounds on x, constraint i is redundant if it cannot be violated
+          within the bounds, i.e. :math:`\\sum_j |A_{ij}| x_{bounds, j} \\leq b_i`.
+        - parallel: constraints that are positively scaled versions of each other
+          are identified by their normalized rows and only the one with the lowest
+          normalized right hand side is kept. Zero rows are redundant (as :math:`b \\geq 0`).
+
+    Parameters
+    ----------
+    A : np.ndarray
+        Constraint matrix (n x m).
+    b : np.ndarray
+        Right hand side (n) or (n x 1).
+    x_bounds : np.ndarray, optional
+        Symmetric bounds of x, see :func:`~clarkson`.
+    decimals : int, optional
+        Decimals of the normalized rows to identify parallel constraints, defaults to 6.
+
+    Returns
+    -------
+    candidates : np.ndarray
+        Indices of the remaining constraints.
+    removed : dict
+        Number of constraints removed by each stage.
+    """
+    b = np.ravel(b)
+    candidates = np.arange(0, len(b))
+    removed = {}
+    if x_bounds is not None and np.size(x_bounds) > 0:
+        condition = np.dot(np.abs(A), np.ravel(x_bounds)) > b
+        removed["bounds"] = len(candidates) - np.sum(condition)
+        candidates = candidates[condition]
+
+    norm = np.max(np.abs(A[candidates]), axis=1)
+    number_of_candidates = len(candidates)
+    candidates, norm = candidates[norm > 0], norm[norm > 0]
+    # Adding 0 replaces -0.0 with 0.0
+    rows = np.round(A[candidates]/norm[:, np.newaxis], decimals=decimals) + 0.
+    rows = pd.DataFrame({"row": [hash(row.tobytes()) for row in rows], "rhs": b[candidates]/norm})
+    candidates = np.sort(candidates[rows.groupby("row").rhs.idxmin().values.astype(int)])
+    removed["parallel"] = number_of_candidates - len(candidates)
+    return candidates, removed
+
+def _maximize(A, b, bounds, essential, k):
+    """Maximize a_k x s.t. A_I x <= b_I, return x or None if the LP cannot be solved."""
+    # The constraint a_k x <= b_k + 1 keeps the LP bounded. HiGHS' presolve can
+    # falsely report unboundedness when x is not bounded and the simplex can fail
+    # numerically, therefore resolve without presolve and with the interior point method.
+    lp = {"A_ub": np.vstack([A[essential], A[k]]), "b_ub": np.hstack([b[essential], b[k] + 1]),
+          "bounds": bounds}
+    for solver in [{"method": "highs"}, {"method": "highs", "options": {"presolve": False}},
+                   {"method": "highs-ipm"}]:
+        result = scipy.optimize.linprog(-A[k], **lp, **solver)
+        if result.status == 0:
+            return result.x
+    return None
+
+def verify_essential(A, b, x_bounds=None, candidates=None, constraints=None):
+    """Verify that constraints of Ax <= b are essential without solving a LP.
+
+    A ray from the origin along the normal vector :math:`a_k` of constraint k
+    is shot. If constraint k is hit first and strictly within the bounds on x,
+    constraint k is essential. Constraints that are not verified this way may
+    still be essential.
+
+    Parameters
+    ----------
+    A : np.ndarray
+        Constraint matrix (n x m).
+    b : np.ndarray
+        Right hand side (n) or (n x 1).
+    x_bounds : np.ndarray, optional
+        Symmetric bounds of x, see :func:`~clarkson`.
+    candidates : np.ndarray, optional
+        Subset of the rows of A that is considered, defaults to all rows.
+    constraints : np.ndarray, optional
+        Constraints to verify, must be candidates, defaults to all candidates.
+
+    Returns
+    -------
+    essential : np.ndarray
+        The constraints that are verified to be essential.
+    """
+    b = np.ravel(b)
+    candidates = np.arange(0, len(b)) if candidates is None else np.asarray(candidates, dtype=int)
+    constraints = candidates if constraints is None else np.asarray(constraints, dtype=int)
+    position = pd.Series(np.arange(0, len(candidates)), index=candidates)
+    verified = []
+    for block in np.array_split(constraints, max(1, int(np.ceil(len(constraints)/1000)))):
+        if len(block) == 0:
+            continue
+        direction = np.dot(A[candidates], A[block].T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(direction > 1e-9, b[candidates, np.newaxis]/direction, np.inf)
+            own_step = step[position[block].values, np.arange(0, len(block))]
+        step[position[block].values, np.arange(0, len(block))] = np.inf
+        condition = own_step < np.min(step, axis=0)*(1 - 1e-9)
+        if x_bounds is not None and np.size(x_bounds) > 0:
+            with np.errstate(invalid="ignore"):
+                point = np.abs(own_step[:, np.newaxis]*A[block])
+            condition &= np.all(point <= np.ravel(x_bounds)*(1 - 1e-9), axis=1)
+        verified.append(block[condition])
+    return np.hstack(verified) if verified else np.array([], dtype=int)
+
+def clarkson(A, b, x_bounds=None, candidates=None, initial=None):
+    """Find the essential set of constraints of Ax <= b with Clarkson's algorithm.
+
+    Each candidate constraint k is tested against the current essential set I by
+    the LP :math:`\\max a_k x` s.t. :math:`A_I x \\leq b_I` (and the bounds on x).
+    If the optimal solution :math:`x^*` violates constraint k, a ray from the origin
+    to :math:`x^*` is shot and the first constraint it hits is essential and added to
+    I, otherwise constraint k is redundant. The essential set is therefore built up
+    from small LPs, instead of solving a LP with all constraints for each candidate.
+
+    The origin has to be a feasible point, i.e. :math:`b \\geq 0`, which is the
+    case for line capacities.
+
+    The algorithm can be warm started with an initial set I, e.g. the essential set
+    of a similar problem. Its constraints are verified first (see :func:`~verify_essential`),
+    the verified ones form the initial essential set and the remaining ones are
+    tested as all other candidates. The result is identical to a cold start.
+
+    Parameters
+    ----------
+    A : np.ndarray
+        Constraint matrix (n x m).
+    b : np.ndarray
+        Right hand side (n) or (n x 1).
+    x_bounds : np.ndarray, optional
+        Symmetric bounds of x, i.e. :math:`-x_{bounds} \\leq x \\leq x_{bounds}` (m)
+        or (m x 1). Without bounds, only constraints that limit the feasible
+        region are essential.
+    candidates : np.ndarray, optional
+        Subset of the rows of A that is considered, defaults to all rows.
+    initial : np.ndarray, optional
+        Initial essential set, only constraints that are also candidates are considered.
+
+    Returns
+    -------
+    essential : list
+        Sorted indices of the essential constraints.
+    """
+    b = np.ravel(b)
+    bounds = _bounds(A, x_bounds)
+    candidates = np.arange(0, len(b)) if candidates is None else np.asarray(candidates, dtype=int)
+    initial = [] if initial is None else list(verify_essential(A, b, x_bounds, candidates,
+                                                                np.intersect1d(initial, candidates)))
+    is_essential = np.zeros(len(b), dtype=bool)
+    is_essential[initial] = True
+    essential = list(initial)
+    for k in candidates:
+        while not is_essential[k]:
+            x = _maximize(A, b, bounds, essential, k)
+            if x is None:
+                is_essential[k] = True
+                essential.append(k)
+                break
+            if np.dot(A[k], x) <= b[k] + 1e-6*max(1, abs(b[k])):
+                break
+            # Ray shooting from the origin towards x, constraints in I are satisfied
+            # along the ray and are therefore not considered.
+            pool = candidates[~is_essential[candidates]]
+            direction = np.dot(A[pool], x)
+            hit = direction > 1e-9
+            step = b[pool[hit]]/direction[hit]
+            j = pool[hit][np.argmin(step)]
+            is_essential[j] = True
+            essential.append(j)
+    return sorted(essential)
+
+def redundancy_removal(A, b, x_bounds=None, candidates=None, processes=1, initial=None):
+    """Find the essential set of constraints of Ax <= b.
+
+    With multiple processes, the candidates are split into chunks and
+    :func:`~clarkson` runs on each chunk in parallel. Constraints that are essential
+    for the whole problem are also essential for each chunk, therefore a final run on the
+    union of the essential sets of all chunks yields the essential set.
+
+    Parameters
+    ----------
+    A : np.ndarray
+        Constraint matrix (n x m).
+    b : np.ndarray
+        Right hand side (n) or (n x 1).
+    x_bounds : np.ndarray, optional
+        Symmetric bounds of x, see :func:`~clarkson`.
+    candidates : np.ndarray, optional
+        Subset of the rows of A that is considered, defaults to all rows.
+    processes : int, optional
+        Number of processes, defaults to 1.
+    initial : np.ndarray, optional
+        Initial essential set to warm start the algorithm, see :func:`~clarkson`.
+
+    Returns
+    -------
+    essential : list
+        Sorted indices of the essential constraints.
+    """
+    candidates = np.arange(0, len(np.ravel(b))) if candidates is None else np.asarray(candidates, dtype=int)
+    if processes > 1 and len(candidates) > processes:
+        chunks = np.array_split(candidates, processes)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            results = executor.map(clarkson, itertools.repeat(A), itertools.repeat(b),
+                                   itertools.repeat(x_bounds), chunks, itertools.repeat(initial))
+            candidates = np.array(sorted(itertools.chain.from_iterable(results)), dtype=int)
+    return clarkson(A, b, x_bounds, candidates, initial)
+
+def prescreened_redundancy_removal(A, b, x_bounds=None, processes=1, initial=None):
+    """Find the essential set of constraints of Ax <= b after pre-screening.
+
+    Runs :func:`~redundancy_removal` on the constraints that remain after
+    :func:`~prescreen`.
+
+    Returns
+    -------
+    essential : list
+        Sorted indices of the essential constraints.
+    """
+    candidates, _ = prescreen(A, b, x_bounds)
+    return redundancy_removal(A, b, x_bounds, candidates, processes, initial)
+
+def map_redundancy_removal(A, b, x_bounds, processes=1):
+    """Find the essential sets of constraints of Ax <= b for multiple bounds on x.
+
+    Each of the bounds is reduced by :func:`~prescreened_redundancy_removal` in
+    a pool of worker processes that share A and b.
+
+    Parameters
+    ----------
+    A : np.ndarray
+        Constraint matrix (n x m).
+    b : np.ndarray
+        Right hand side (n) or (n x 1).
+    x_bounds : list
+        List of symmetric bounds of x, see :func:`~clarkson`.
+    processes : int, optional
+        Number of processes, defaults to 1.
+
+    Returns
+    -------
+    essential : list
+        List of the essential sets for each of the bounds.
+    """
+    if processes > 1 and len(x_bounds) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                                    initargs=(A, b)) as executor:
+            return list(executor.map(_reduce_worker, x_bounds))
+    return [prescreened_redundancy_removal(A, b, bounds) for bounds in x_bounds]
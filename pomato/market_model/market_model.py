@@ -14,6 +14,7 @@ import logging
 import subprocess
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 import pomato
@@ -149,13 +150,69 @@ class MarketModel():
             self.logger.warning("Process not terminated successfully!")
             self.status = 'error'
 
+    def sparse_grid_to_csv(self, grid, name, threshold):
+        """Export a grid representation in long sparse form.
+
+        The ptdf columns (nodes or zones) of *grid* are written as rows (row, node, value)
+        to *{name}_ptdf.csv*, omitting entries with an absolute value below *threshold*, where
+        row is the position of the constraint in *{name}.csv*. The remaining columns, e.g. ram,
+        are written to *{name}.csv*.
+
+        The omitted entries cause an error in the line flows, that is at most the sum of
+        their absolute values times the nodal injection limits (summed per zone for a zonal
+        ptdf). This worst-case error is written to *{name}_threshold_error.csv*, absolute and
+        relative to the ram, if the grid representation contains nodal injection limits.
+
+        Parameters
+        ----------
+        grid : pd.DataFrame
+            Grid representation, e.g. *grid_representation.grid*.
+        name : str
+            Name of the exported files.
+        threshold : float
+            Entries with an absolute value below are omitted.
+
+        Returns
+        -------
+        threshold_error : pd.DataFrame, None
+            Worst-case flow error of each constraint or None without nodal injection limits.
+        """
+        if grid.columns.isin(self.data.nodes.index).any():
+            columns = grid.columns[grid.columns.isin(self.data.nodes.index)]
+        else:
+            columns = grid.columns[grid.columns.isin(self.data.zones.index)]
+        ptdf = grid[columns].values
+        rows, cols = np.nonzero(np.abs(ptdf) >= threshold)
+        pd.DataFrame({"row": rows, "node": columns[cols], "value": ptdf[rows, cols]}) \
+            .to_csv(str(self.data_dir.joinpath(f'{name}_ptdf.csv')), index=False)
+        grid.drop(columns, axis=1).to_csv(str(self.data_dir.joinpath(f'{name}.csv')), index_label='index')
+        self.logger.info("Exported %d of %d ptdf entries of %s with threshold %s.", 
+                         len(rows), ptdf.size, name, threshold)
+
+        limits = getattr(self.grid_representation, "nodal_injection_limits", None)
+        if limits is None:
+            return None
+        if not columns.isin(limits.index).all():
+            limits = limits.groupby(self.data.nodes.zone).sum()
+        omitted = np.where(np.abs(ptdf) >= threshold, 0, np.abs(ptdf))
+        threshold_error = pd.DataFrame(index=grid.index)
+        threshold_error["error"] = np.dot(omitted, limits.reindex(columns).fillna(0).values)
+        if "ram" in grid.columns:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                threshold_error["relative_error"] = threshold_error.error/grid.ram.values
+        threshold_error.to_csv(str(self.data_dir.joinpath(f'{name}_threshold_error.csv')), index_label='index')
+        self.logger.info("Worst-case flow error of %s due to the threshold: %.2f MW.", 
+                         name, threshold_error.error.max())
+        return threshold_error
+
     def data_to_csv(self, model_horizon):
         """Export input data to csv files in the data_dir sub-directory.
 
         Writes all data specified in the *model structure* attribute of DataManagement to csv.
         Additionally stores a comprehensive table of plant types, relevant to distinguish between
         certain generation constraints (storages, res etc.), table of slack zones, the grid
-        representation and the options.
+        representation (with the redispatch grid of each zone as *redispatch_grid_{zone}* and
+        the essential set of each timestep as *grid_essential_sets*) and the options.
 
         """
         if not self.data_dir.is_dir():
@@ -176,17 +233,20 @@ class MarketModel():
             plant_types[ptype][condition] = 1
         plant_types.to_csv(str(self.data_dir.joinpath('plant_types.csv')), index_label='index')
 
-        if self.grid_representation.grid.empty:
-            pd.DataFrame(columns=["ram"]).to_csv(str(self.data_dir.joinpath('grid.csv')), index_label='index')
-        else:
-            self.grid_representation.grid \
-                .to_csv(str(self.data_dir.joinpath('grid.csv')), index_label='index')
+        grids = {name: getattr(self.grid_representation, name) for name in ["grid", "redispatch_grid"]}
+        for zone, grid in getattr(self.grid_representation, "zonal_redispatch_grids", {}).items():
+            grids[f"redispatch_grid_{zone}"] = grid
+        for name, grid in grids.items():
+            if grid.empty:
+                pd.DataFrame(columns=["ram"]).to_csv(str(self.data_dir.joinpath(f'{name}.csv')), index_label='index')
+            elif self.options["optimization"]["sparse_grid"]["include"]:
+                self.sparse_grid_to_csv(grid, name, self.options["optimization"]["sparse_grid"]["threshold"])
+            else:
+                grid.to_csv(str(self.data_dir.joinpath(f'{name}.csv')), index_label='index')
 
-        if self.grid_representation.redispatch_grid.empty:
-            pd.DataFrame(columns=["ram"]).to_csv(str(self.data_dir.joinpath('redispatch_grid.csv')), index_label='index')
-        else:
-            self.grid_representation.redispatch_grid \
-                .to_csv(str(self.data_dir.joinpath('redispatch_grid.csv')), index_label='index')
+        timestep_essential_sets = getattr(self.grid_representation, "timestep_essential_sets", None)
+        if timestep_essential_sets is not None:
+            timestep_essential_sets.to_csv(str(self.data_dir.joinpath('grid_essential_sets.csv')))
 
         if not self.grid_representation.ntc.empty:
             self.grid_representation.ntc.to_csv(str(self.data_dir.joinpath('ntc.csv')), index_label='index')
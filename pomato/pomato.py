@@ -242,7 +242,7 @@ class POMATO():
             self.initialize_options(options_file)
         
         self.data = DataManagement(self.options, self.wdir)
-        self.grid = GridTopology()       
+        self.grid = GridTopology(self.options, self.wdir)
         self.grid_model = GridModel(self.wdir, self.grid, self.data, self.options)
         self.grid_representation = self.grid_model.grid_representation
         self.market_model = MarketModel(self.wdir, self.options, self.data, self.grid_representation)
@@ -4,6 +4,7 @@ This collection is characterized by a certain degree of generality and they cann
 attributed to a specified component of pomato.
 """
 
+import hashlib
 import json
 import operator
 import subprocess
@@ -13,6 +14,7 @@ import time
 from functools import reduce
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pomato._installation.manage_julia_env as julia_management
 
@@ -243,6 +245,67 @@ def newest_file_folder(folder, keyword="", number_of_elm=1):
     else:
         return df.elm[df.time.idxmax()]
 
+def array_hash(*arrays):
+    """Return a hash that identifies the content of the supplied arrays.
+
+    Used as key for on disk caches, e.g. of the grid sensitivity matrices.
+    Object arrays (like node/line indices) are hashed by their string representation.
+
+    Parameters
+    ----------
+    arrays : array-like
+        Arrays, Series or Indices to hash.
+
+    Returns
+    -------
+    hash : str
+        Hex digest of the combined arrays.
+    """
+    sha = hashlib.sha1()
+    for array in arrays:
+        array = np.asarray(array)
+        if array.dtype == object:
+            array = np.asarray(array.astype(str), dtype="U")
+        array = np.ascontiguousarray(array)
+        sha.update(f"{array.dtype}{array.shape}".encode())
+        sha.update(array.tobytes())
+    return sha.hexdigest()
+
+def evict_cache(folder, max_size, logger=None):
+    """Remove least recently used entries of a cache folder.
+
+    Each file or subfolder of *folder* is considered one cache entry. Entries
+    are removed, oldest modification time first, until the total size of the folder
+    is below *max_size*.
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        Cache folder.
+    max_size : float
+        Maximum size of the cache in MB.
+    logger : logger, optional
+        If a logger is supplied the removed entries will be logged there.
+    """
+    def _size(path):
+        if path.is_dir():
+            return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        return path.stat().st_size
+
+    entries = sorted(Path(folder).iterdir(), key=lambda path: path.stat().st_mtime)
+    sizes = [_size(entry) for entry in entries]
+    total_size = sum(sizes)
+    for entry, size in zip(entries, sizes):
+        if total_size <= max_size*1e6:
+            break
+        if logger:
+            logger.info("Removing %s from cache.", entry.name)
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            entry.unlink()
+        total_size -= size
+
 def create_folder_structure(base_path, logger=None):
     """Create folder structure to run POMATO.
 
@@ -358,10 +421,16 @@ def default_options():
             "include": False,
             "zonal_redispatch": True,
             "zones": [],
+            "zonal_grid": {
+                "include": False,
+                "n_1": False},
             "cost": 1},
         "curtailment": {
             "include": False,
             "cost": 1E2},
+        "sparse_grid": {
+            "include": False,
+            "threshold": 1E-4},
         "chance_constrained": {
             "include": False,
             "fixed_alpha": True,
@@ -390,9 +459,23 @@ def default_options():
         }
 
     options_dict["grid"] = {
+            "ptdf_method": "dense",
+            "dtype": "float64",
+            "processes": 1,
             "cbco_option": "full",
+            "redundancy_removal": "julia",
+            "cbco_file_format": "csv",
+            "timestep_clusters": 0,
+            "cbco_cache": {
+                "include": False,
+                "max_size": 100},
             "precalc_filename": "",
+            "warm_start_filename": "",
             "sensitivity": 5e-2,
+            "n_1_block_size": 10000,
+            "topology_cache": {
+                "include": True,
+                "max_size": 2000},
             "capacity_multiplier": 1,
             "preprocess": True,
             "gsk": "gmax",
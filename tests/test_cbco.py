@@ -2,15 +2,19 @@ import copy
 import logging
 import random
 import shutil
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import patch
 
 import numpy as np
 import pandas as pd
+import scipy.optimize
 
 from context import pomato
 from pomato import tools
+from pomato.grid.gsk import generation_shift_keys, zonal_ptdf
+from pomato.grid.redundancy_removal import clarkson, prescreen, redundancy_removal, verify_essential
 
 # pylint: disable-msg=E1101
 class TestPomatoGridRepresentation(unittest.TestCase):
@@ -44,6 +48,88 @@ class TestPomatoGridRepresentation(unittest.TestCase):
         np.testing.assert_equal(gr.redispatch_grid["ram"].values, 
                                 self.data.lines.maxflow.values*self.options["grid"]["capacity_multiplier"])
 
+    def test_zonal_redispatch_grids(self):
+        redispatch_option = self.options["optimization"]["redispatch"]
+        redispatch_option.update({"include": True, "zonal_redispatch": True, 
+                                  "zones": list(self.data.zones.index)})
+        redispatch_option["zonal_grid"]["include"] = True
+        self.grid_model.create_grid_representation()
+        gr = self.grid_model.grid_representation
+        self.assertEqual(list(gr.zonal_redispatch_grids), list(self.data.zones.index))
+        zone_i = self.data.nodes.zone[self.data.lines.node_i].values
+        zone_j = self.data.nodes.zone[self.data.lines.node_j].values
+        for zone, redispatch_grid in gr.zonal_redispatch_grids.items():
+            lines = self.data.lines.index[(zone_i == zone) | (zone_j == zone)]
+            self.assertEqual(list(redispatch_grid.index), list(lines))
+            pd.testing.assert_frame_equal(redispatch_grid, gr.redispatch_grid.loc[lines])
+
+        # N-1, built in parallel, equals the filtered N-1 ptdf of the lines touching the zone
+        redispatch_option["zonal_grid"]["n_1"] = True
+        self.options["grid"]["processes"] = 2
+        self.grid_model.create_grid_representation()
+        _, _, n_1_ptdf = self.grid.create_filtered_n_1_ptdf(self.options["grid"]["sensitivity"])
+        n_1_ptdf = self.grid_model._add_zone_to_grid_representation(n_1_ptdf)
+        for zone, redispatch_grid in gr.zonal_redispatch_grids.items():
+            condition = (n_1_ptdf.zone_i == zone) | (n_1_ptdf.zone_j == zone)
+            self.assertEqual(list(redispatch_grid.index), list(n_1_ptdf.cb[condition] + "_" + n_1_ptdf.co[condition]))
+            np.testing.assert_allclose(redispatch_grid[self.data.nodes.index].values, 
+                                       n_1_ptdf.loc[condition, self.data.nodes.index].values)
+            self.assertTrue(len(redispatch_grid) < len(n_1_ptdf))
+
+        self.options["grid"]["capacity_multiplier"] = 0.8
+        with patch.object(self.grid_model, "add_zonal_redispatch_grids") as add_zonal_redispatch_grids:
+            self.grid_model.create_grid_representation()
+            add_zonal_redispatch_grids.assert_not_called()
+        for zone, redispatch_grid in gr.zonal_redispatch_grids.items():
+            np.testing.assert_allclose(redispatch_grid.ram.values, 
+                                       self.data.lines.maxflow[redispatch_grid.cb].values*0.8)
+
+    def test_fbmc_info_blocks(self):
+        self.options["grid"]["n_1_block_size"] = 37
+        cb, co = self.grid.filtered_cbco_indices(0.05)
+        cbco_list = pd.DataFrame({"cb": list(self.grid.lines.index[:30]) + list(self.grid.lines.index[cb[:400]]),
+                                  "co": ["basecase"]*30 + list(self.grid.lines.index[co[:400]])})
+        fbmc = pomato.fbmc.FBMCModule(self.wdir, self.grid, self.data, self.options, cbco_list=cbco_list)
+        info = fbmc.domain_info
+        self.assertEqual(len(info), 2*len(cbco_list))
+        basecase = info.co == "basecase"
+        np.testing.assert_equal(fbmc.nodal_fbmc_ptdf[:30], self.grid.ptdf[:30])
+        np.testing.assert_equal(fbmc.nodal_fbmc_ptdf[30:60], -self.grid.ptdf[:30])
+        self.assertEqual(basecase.sum(), 60)
+        # per cb, the rows under its outages are followed by their negatives
+        start = 60
+        for line, outages in cbco_list[30:].groupby("cb", sort=False).co:
+            ptdf = self.grid.create_n_1_ptdf_cbcos([self.grid.lines.index.get_loc(line)]*len(outages), 
+                                                   self.grid.lines.index.get_indexer(outages))
+            np.testing.assert_allclose(fbmc.nodal_fbmc_ptdf[start:start + len(outages)], ptdf)
+            np.testing.assert_allclose(fbmc.nodal_fbmc_ptdf[start + len(outages):start + 2*len(outages)], -ptdf)
+            self.assertEqual(list(info.co[start:start + 2*len(outages)]), list(outages)*2)
+            self.assertTrue(all(info.cb[start:start + 2*len(outages)] == line))
+            start += 2*len(outages)
+
+    def test_create_ntc(self):
+        # an additional zone, only connected to the zone of its neighbours
+        self.data.nodes.loc[self.data.lines.node_i[0], "zone"] = "new_zone"
+        self.grid_model.create_ntc()
+        ntc = self.grid_model.grid_representation.ntc
+        zones = set(self.data.nodes.zone)
+        self.assertEqual(len(ntc), len(zones)*(len(zones) - 1))
+        self.assertTrue(0 in ntc.ntc.values)
+        line_zones = set()
+        for lines in [self.data.lines, self.data.dclines]:
+            for node_i, node_j in zip(lines.node_i, lines.node_j):
+                line_zones.add((self.data.nodes.zone[node_i], self.data.nodes.zone[node_j]))
+        for zone_i, zone_j, value in ntc[["zone_i", "zone_j", "ntc"]].values:
+            connected = (zone_i, zone_j) in line_zones or (zone_j, zone_i) in line_zones
+            self.assertEqual(value, 1e5 if connected else 0)
+
+        zone_index, adjacency = self.grid_model.zone_adjacency()
+        self.assertEqual(set(zone_index), zones)
+        self.assertEqual((adjacency != adjacency.T).nnz, 0)
+        grid = self.grid_model._add_zone_to_grid_representation(pd.DataFrame(index=self.grid.lines.index))
+        np.testing.assert_equal(grid.zone_i.values, self.data.nodes.zone[self.grid.lines.node_i].values)
+        np.testing.assert_equal(grid.zone_j.values, self.data.nodes.zone[self.grid.lines.node_j].values)
+
     def test_zonal(self):
         
         self.grid_model.options["optimization"]["type"] = "zonal"
@@ -63,6 +149,77 @@ class TestPomatoGridRepresentation(unittest.TestCase):
         self.assertTrue(all(grid_representation_flat.grid.columns == test_columns))
         self.assertTrue(all(grid_representation_gmax.grid.columns == test_columns))
 
+    def test_gsk(self):
+        nodes, zones = self.data.nodes, self.data.zones.index
+        plants = self.data.plants[self.data.plants.plant_type.isin(["wind", "solar"])]
+        gsk = generation_shift_keys(nodes, zones, plants)
+        self.assertIs(generation_shift_keys(nodes, zones, plants), gsk)
+        for zone in zones:
+            nodes_in_zone = nodes.zone == zone
+            flat = gsk["flat"][:, zones.get_loc(zone)].toarray()[:, 0]
+            np.testing.assert_allclose(flat, np.where(nodes_in_zone, 1/nodes_in_zone.sum(), 0))
+            gmax_per_node = plants.groupby("node").g_max.sum().reindex(nodes.index, fill_value=0)
+            gmax_per_node[~nodes_in_zone] = 0
+            gmax = gsk["gmax"][:, zones.get_loc(zone)].toarray()[:, 0]
+            np.testing.assert_allclose(gmax, gmax_per_node.values/gmax_per_node.sum())
+
+        # zones without capacity are zero or filled with the flat gsk
+        plants = plants[plants.node.isin(nodes.index[nodes.zone != zones[0]])]
+        self.assertEqual(generation_shift_keys(nodes, zones, plants)["gmax"][:, 0].nnz, 0)
+        gsk = generation_shift_keys(nodes, zones, plants, fill_empty_zones=True)
+        np.testing.assert_allclose(gsk["gmax"][:, 0].toarray(), gsk["flat"][:, 0].toarray())
+
+        np.testing.assert_allclose(zonal_ptdf(self.grid.ptdf, gsk["gmax"]),
+                                   np.dot(self.grid.ptdf, gsk["gmax"].toarray()))
+        np.testing.assert_equal(self.grid_model.create_gsk("flat"),
+                                self.grid_model.create_gsk("flat", sparse=True).toarray())
+
+    def test_preprocess_cbco_data(self):
+        A, b, info = self.grid_model.create_cbco_data(0.05, preprocess=False)
+        A_pre, b_pre, info_pre = self.grid_model.create_cbco_data(0.05, preprocess=True)
+        self.assertTrue(len(b_pre) < len(b))
+        # each removed constraint is a positively scaled version of the first occurrence 
+        normalized = np.round(A/b*b.max(), decimals=6) + 0.
+        normalized_pre = pd.DataFrame(np.round(A_pre/b_pre*b.max(), decimals=6) + 0.).apply(tuple, axis=1)
+        first_occurrence = pd.Series(info.index, index=pd.DataFrame(normalized).apply(tuple, axis=1))
+        first_occurrence = first_occurrence[~first_occurrence.index.duplicated()]
+        self.assertEqual(list(first_occurrence[normalized_pre].values), list(info_pre.index))
+        self.assertEqual(set(first_occurrence.index), set(normalized_pre))
+        pd.testing.assert_frame_equal(info.loc[info_pre.index], info_pre)
+        # the rounding is never coarser than rounding the ptdf to 6 decimals
+        kept = first_occurrence[pd.DataFrame(normalized).apply(tuple, axis=1)].values
+        kept = info.index.get_indexer(kept)
+        scaled_ptdf = A[kept]*(b/b[kept])
+        self.assertTrue(np.max(np.abs(A - scaled_ptdf)) <= 1e-6)
+
+    def test_grid_representation_memo(self):
+        self.grid_model.options["optimization"]["type"] = "zonal"
+        self.grid_model.options["optimization"]["redispatch"]["include"] = True
+        self.grid_model.create_grid_representation()
+        grid = self.grid_model.grid_representation.grid.copy()
+
+        self.grid_model.options["grid"]["capacity_multiplier"] = 0.8
+        with patch.object(self.grid_model, "process_zonal") as process_zonal:
+            self.grid_model.create_grid_representation()
+            process_zonal.assert_not_called()
+        gr = self.grid_model.grid_representation
+        np.testing.assert_allclose(gr.grid.ram.values, grid.ram.values*0.8)
+        np.testing.assert_allclose(gr.redispatch_grid.ram.values, self.data.lines.maxflow.values*0.8)
+        self.assertTrue(gr.ntc.equals(self.grid_model._grid_representation_cache[
+            self.grid_model.grid_representation_fingerprint()].ntc))
+
+        # changes of the relevant options or data recompute the grid representation
+        for option, value in [("gsk", "flat"), ("sensitivity", 0.1)]:
+            fingerprint = self.grid_model.grid_representation_fingerprint()
+            self.grid_model.options["grid"][option] = value
+            self.assertNotEqual(self.grid_model.grid_representation_fingerprint(), fingerprint)
+        fingerprint = self.grid_model.grid_representation_fingerprint()
+        self.data.lines.loc[self.data.lines.index[0], "maxflow"] *= 2
+        self.assertNotEqual(self.grid_model.grid_representation_fingerprint(), fingerprint)
+        with patch.object(self.grid_model, "process_zonal") as process_zonal:
+            self.grid_model.create_grid_representation()
+            process_zonal.assert_called_once()
+
     def test_nodal(self):
         self.grid_model.options["optimization"]["type"] = "nodal"
         self.grid_model.create_grid_representation()
@@ -98,6 +255,235 @@ class TestPomatoGridRepresentation(unittest.TestCase):
         self.grid_model.create_grid_representation()
         pd.testing.assert_frame_equal(c_ptdf_fallback, self.grid_model.grid_representation.grid)
 
+    def test_nodal_injection_limits(self):
+        self.options["optimization"]["plant_types"]["es"] = ["ror"]
+        self.data.dclines.loc["dc1", ["node_i", "node_j", "maxflow"]] = ["bus001", "bus002", 100]
+        nodal_injection_limits = self.grid_model.create_nodal_injection_limits()
+        timestep_limits = self.grid_model.create_timestep_nodal_injection_limits()
+        self.assertEqual(nodal_injection_limits.shape, (len(self.data.nodes), 1))
+        self.assertEqual(timestep_limits.shape, (len(self.data.nodes), len(self.data.demand_el.timestep.unique())))
+        self.assertTrue((timestep_limits.max(axis=1).values <= nodal_injection_limits[:, 0] + 1e-8).all())
+
+        bound = self.options["optimization"]["infeasibility"]["electricity"]["bound"]
+        plants, demand, net_export = self.data.plants, self.data.demand_el, self.data.net_export
+        timestep = timestep_limits.columns[10]
+        for i, node in enumerate(self.data.nodes.index):
+            storage = plants.g_max[(plants.node == node) & plants.plant_type.isin(["ror"])].sum()
+            dc = 100 if node in ["bus001", "bus002"] else 0
+            node_demand = demand.demand_el[demand.node == node]
+            node_net_export = net_export.net_export[net_export.node == node]
+            upper = max(plants.g_max[plants.node == node].sum() - node_demand.min()
+                        + max(0, node_net_export.max()) + dc + bound, 0)
+            lower = max(node_demand.max() + storage - min(0, node_net_export.min()) + dc + bound, 0)
+            self.assertAlmostEqual(nodal_injection_limits[i, 0], max(upper, lower))
+
+            node_demand = node_demand[demand.timestep == timestep].sum()
+            node_net_export = node_net_export[net_export.timestep == timestep].sum()
+            upper = max(plants.g_max[plants.node == node].sum() - node_demand
+                        + max(0, node_net_export) + dc + bound, 0)
+            lower = max(node_demand + storage - min(0, node_net_export) + dc + bound, 0)
+            self.assertAlmostEqual(timestep_limits.loc[node, timestep], max(upper, lower))
+
+    def test_redundancy_removal(self):
+        rng = np.random.default_rng(0)
+        A, b = rng.normal(size=(100, 4)), rng.uniform(1, 2, size=(100, 1))
+        A[10], b[10] = 2*A[20], 2*b[20]  # scaled duplicate
+        A[30] = 0
+        for x_bounds in [None, rng.uniform(0.2, 1, size=(4, 1))]:
+            bounds = [(None, None)]*4 if x_bounds is None else [(-x, x) for x in x_bounds[:, 0]]
+            essential = clarkson(A, b, x_bounds)
+            # a constraint is redundant if it cannot be violated under all other constraints,
+            # where scaled duplicates are not considered for each other.
+            essential_constraints = []
+            for k in range(0, len(b)):
+                other = ~np.isin(np.arange(0, len(b)), [k, {10: 20, 20: 10}.get(k, k)])
+                result = scipy.optimize.linprog(-A[k], A_ub=A[other], b_ub=b[other, 0],
+                                                bounds=bounds, method="highs")
+                if -result.fun > b[k, 0] + 1e-6:
+                    essential_constraints.append(k)
+            self.assertEqual(set(essential) - {10, 20}, set(essential_constraints) - {10, 20})
+            self.assertEqual(len({10, 20} & set(essential)), 1 if 20 in essential_constraints else 0)
+            self.assertNotIn(30, essential)
+            self.assertEqual(redundancy_removal(A, b, x_bounds, processes=2), essential)
+
+    def test_prescreen(self):
+        rng = np.random.default_rng(1)
+        A, b = rng.normal(size=(100, 4)), rng.uniform(1, 2, size=(100, 1))
+        A[10], b[10] = 2*A[20], 3*b[20]  # dominated by parallel row 20
+        A[30], b[30] = A[40], b[40]
+        A[50] = 0
+        x_bounds = rng.uniform(0.1, 0.5, size=(4, 1))
+        candidates, removed = prescreen(A, b, x_bounds)
+        self.assertEqual(len(b) - len(candidates), removed["bounds"] + removed["parallel"])
+        self.assertTrue(removed["bounds"] > 0)
+        self.assertTrue(np.all(np.dot(np.abs(A[candidates]), x_bounds) > b[candidates]))
+        self.assertNotIn(50, candidates)
+        self.assertTrue(10 not in candidates or 20 not in candidates)
+        self.assertTrue(30 not in candidates or 40 not in candidates)
+        self.assertEqual(clarkson(A, b, x_bounds, candidates), clarkson(A, b, x_bounds))
+
+        candidates, removed = prescreen(A, b)
+        self.assertNotIn("bounds", removed)
+        self.assertEqual(removed["parallel"], 3)
+        self.assertEqual(list(candidates), [i for i in range(0, len(b)) if i not in [10, 40, 50]])
+
+    def test_warm_start(self):
+        rng = np.random.default_rng(2)
+        A, b = rng.normal(size=(200, 5)), rng.uniform(1, 2, size=(200, 1))
+        x_bounds = rng.uniform(0.5, 1, size=(5, 1))
+        essential = clarkson(A, b, x_bounds)
+        b_changed = b*rng.uniform(0.9, 1.1, size=b.shape)
+        essential_changed = clarkson(A, b_changed, x_bounds)
+        self.assertNotEqual(essential, essential_changed)
+        self.assertTrue(set(verify_essential(A, b_changed, x_bounds)) <= set(essential_changed))
+        self.assertTrue(len(verify_essential(A, b_changed, x_bounds, constraints=essential)) > 0)
+        self.assertEqual(clarkson(A, b_changed, x_bounds, initial=essential), essential_changed)
+        self.assertEqual(redundancy_removal(A, b_changed, x_bounds, processes=2, initial=essential),
+                         essential_changed)
+
+        # warm start from a file with the labels of the cbco's
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["cbco_cache"]["include"] = False
+        A, b = self.grid.ptdf, self.grid.lines.maxflow.values.reshape(len(self.grid.lines), 1)
+        x_bounds = self.grid_model.create_nodal_injection_limits()
+        cbco = self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=x_bounds)
+        cbco_info = pd.DataFrame({"cb": self.grid.lines.index, "co": "basecase"})
+        cbco_info.loc[cbco].to_csv(self.grid_model.julia_dir.joinpath("cbco_data/warm_start.csv"), index=False)
+        self.grid_model.options["grid"]["warm_start_filename"] = "warm_start"
+        warm_start = self.grid_model._warm_start(cbco_info)
+        self.assertEqual(list(warm_start["I"]), list(cbco))
+        self.assertEqual(self.grid_model.clarkson_algorithm(A=A, b=b*1.05, x_bounds=x_bounds, **warm_start),
+                         self.grid_model.clarkson_algorithm(A=A, b=b*1.05, x_bounds=x_bounds))
+
+    def test_nodal_clarkson_python(self):
+        self.grid_model.options["optimization"]["type"] = "nodal"
+        self.grid_model.options["grid"]["cbco_option"] = "nodal_clarkson"
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["cbco_cache"]["include"] = False
+        self.grid_model.create_grid_representation()
+        grid = self.grid_model.grid_representation.grid
+        self.assertTrue(0 < len(grid) < len(self.grid.lines))
+        file = tools.newest_file_folder(self.grid_model.julia_dir.joinpath("cbco_data"), keyword="cbco")
+        self.assertEqual(list(pd.read_csv(file).constraints), 
+                         [self.grid.lines.index.get_loc(line) for line in grid.cb])
+
+        # removed lines cannot be overloaded within the nodal injection limits
+        x_bounds = self.grid_model.create_nodal_injection_limits()[:, 0]
+        A, b = grid[self.data.nodes.index].values, grid.ram.values
+        for line in random.sample(list(self.grid.lines.index.difference(grid.cb)), 10):
+            ptdf = self.grid.ptdf[self.grid.lines.index.get_loc(line)]
+            result = scipy.optimize.linprog(-ptdf, A_ub=A, b_ub=b, bounds=np.vstack([-x_bounds, x_bounds]).T,
+                                            method="highs")
+            self.assertLessEqual(-result.fun, self.grid.lines.maxflow[line] + 1e-6)
+
+    def test_cbco_cache(self):
+        self.assertFalse(pomato.tools.default_options()["grid"]["cbco_cache"]["include"])
+        self.grid_model.options["grid"]["cbco_cache"]["include"] = True
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        A, b = self.grid.ptdf, self.grid.lines.maxflow.values.reshape(len(self.grid.lines), 1)
+        x_bounds = self.grid_model.create_nodal_injection_limits()
+        cbco = self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=x_bounds)
+        cache_key = self.grid_model.cbco_cache_key(A=A, b=b, x_bounds=x_bounds)
+        self.assertTrue(self.grid_model.julia_dir.joinpath(f"cbco_data/cache/{cache_key}.npy").is_file())
+        
+        cbco_files = set(self.grid_model.julia_dir.joinpath("cbco_data").glob("cbco_py_*.csv"))
+        time.sleep(1)
+        with patch.object(pomato.grid.GridModel, "python_clarkson_algorithm") as clarkson_algorithm:
+            self.assertEqual(self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=x_bounds), cbco)
+            clarkson_algorithm.assert_not_called()
+            # the cbco file is written from the cache
+            new_files = set(self.grid_model.julia_dir.joinpath("cbco_data").glob("cbco_py_*.csv")) - cbco_files
+            self.assertEqual(len(new_files), 1)
+            self.assertEqual(list(pd.read_csv(new_files.pop()).constraints), cbco)
+            self.grid_model.clarkson_algorithm(A=A, b=b*2, x_bounds=x_bounds)
+            clarkson_algorithm.assert_called_once()
+
+        self.assertNotEqual(self.grid_model.cbco_cache_key(A=A, b=b), cache_key)
+        self.grid_model.options["grid"]["redundancy_removal"] = "julia"
+        self.assertNotEqual(self.grid_model.cbco_cache_key(A=A, b=b, x_bounds=x_bounds), cache_key)
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["cbco_cache"]["max_size"] = 0
+        self.grid_model.cache_cbco(cache_key, cbco)
+        self.assertIsNone(self.grid_model.load_cached_cbco(cache_key))
+
+    def test_cbco_file_format(self):
+        A, b, info = self.grid_model.create_cbco_data(0.05, True)
+        x_bounds = self.grid_model.create_nodal_injection_limits()
+        folder = self.grid_model.julia_dir.joinpath("cbco_data")
+        for file_format in ["csv", "npy"]:
+            self.grid_model.write_cbco_info(folder, "test", file_format=file_format,
+                                            A=A, b=b, x_bounds=x_bounds, Ab_info=info)
+            cbco_info = self.grid_model.read_cbco_info(folder, "test", file_format=file_format)
+            self.assertTrue(folder.joinpath(f"A_test.{file_format}").is_file())
+            np.testing.assert_equal(cbco_info["A"], A)
+            np.testing.assert_equal(cbco_info["b"], b)
+            np.testing.assert_equal(cbco_info["x_bounds"], x_bounds)
+            self.assertEqual(cbco_info["I"].size, 0)
+            pd.testing.assert_frame_equal(cbco_info["Ab_info"], info, check_names=False,
+                                          check_index_type=False, check_dtype=False)
+
+    def test_python_clarkson_from_file(self):
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["cbco_file_format"] = "npy"
+        self.grid_model.options["grid"]["cbco_cache"]["include"] = False
+        A, b = self.grid.ptdf, self.grid.lines.maxflow.values.reshape(len(self.grid.lines), 1)
+        x_bounds = self.grid_model.create_nodal_injection_limits()
+        self.grid_model.write_cbco_info(self.grid_model.julia_dir.joinpath("cbco_data"), "py_test",
+                                        A=A, b=b, x_bounds=x_bounds)
+        self.assertEqual(self.grid_model.clarkson_algorithm(args={"file_suffix": "py_test"}),
+                         self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=x_bounds))
+
+    def test_timestep_clarkson(self):
+        self.grid_model.options["optimization"]["type"] = "cbco_nodal"
+        self.grid_model.options["grid"]["cbco_option"] = "clarkson_base"
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["timestep_clusters"] = 3
+        self.grid_model.options["grid"]["processes"] = 2
+
+        limits = self.grid_model.create_timestep_nodal_injection_limits()
+        clusters = self.grid_model.cluster_timesteps(limits, 3)
+        self.assertEqual(sorted(sum(clusters, [])), sorted(limits.columns))
+        self.assertEqual(len(self.grid_model.cluster_timesteps(limits, len(limits.columns))), len(limits.columns))
+
+        # N-0 ptdf as input to keep the redundancy removal short
+        A, b = self.grid.ptdf, self.grid.lines.maxflow.values.reshape(len(self.grid.lines), 1)
+        info = pd.DataFrame(columns=self.grid.nodes.index, data=A)
+        info["cb"], info["co"], info["ram"] = list(self.grid.lines.index), "basecase", b
+        info = info[["cb", "co", "ram"] + list(self.grid.nodes.index)]
+        with patch.object(pomato.grid.GridModel, "create_cbco_data", return_value=(A, b, info)):
+            self.grid_model.create_grid_representation()
+        grid = self.grid_model.grid_representation.grid
+        essential_sets = self.grid_model.grid_representation.timestep_essential_sets
+        self.assertEqual(list(grid.columns[:4]), ["cb", "co", "ram", "essential_set"])
+        self.assertEqual(list(essential_sets.index), list(limits.columns))
+        # the rows of each essential set are contained once
+        self.assertEqual(set(essential_sets), set(grid.essential_set))
+        self.assertFalse(grid.set_index("essential_set", append=True).index.duplicated().any())
+
+        for cluster in clusters:
+            x_bounds = limits[cluster].max(axis=1).values.reshape(len(limits), 1)
+            cbco = self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=x_bounds)
+            for timestep in cluster:
+                self.assertEqual(list(grid.cb[grid.essential_set == essential_sets[timestep]]), 
+                                 list(info.cb[cbco]))
+        # with cluster specific limits, less constraints than for the worst case limits remain
+        cbco = self.grid_model.clarkson_algorithm(A=A, b=b, x_bounds=self.grid_model.create_nodal_injection_limits())
+        self.assertTrue(grid.groupby("essential_set").size().max() <= len(cbco))
+        self.assertTrue(len(grid) <= len(clusters)*len(cbco))
+
+    def test_cbco_zonal_python(self):
+        self.grid_model.options["optimization"]["type"] = "cbco_zonal"
+        self.grid_model.options["grid"]["redundancy_removal"] = "python"
+        self.grid_model.options["grid"]["processes"] = 2
+        self.grid_model.options["grid"]["gsk"] = "flat"
+        self.grid_model.create_grid_representation()
+        grid = self.grid_model.grid_representation.grid
+
+        A, b, info = self.grid_model.create_cbco_data(self.options["grid"]["sensitivity"], True,
+                                                      self.options["grid"]["gsk"])
+        cbco_index = clarkson(A, b, candidates=prescreen(A, b)[0])
+        self.assertEqual(list(grid.index), list(self.grid_model.return_cbco(info, cbco_index).index))
+
     def test_cbco_nodal_clarkson(self):
         
         self.grid_model.options["optimization"]["type"] = "cbco_nodal"
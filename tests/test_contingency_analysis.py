@@ -0,0 +1,89 @@
+import logging
+import random
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from context import pomato
+
+# pylint: disable-msg=E1101
+class TestPomatoContingencyAnalysis(unittest.TestCase):
+    
+    def setUp(self):
+        self.wdir = Path.cwd().joinpath("examples")
+        self.options = pomato.tools.default_options()
+        self.data = pomato.data.DataManagement(self.options, self.wdir)
+        self.data.logger.setLevel(logging.ERROR)
+        self.data.load_data('data_input/pglib_opf_case118_ieee.m')
+        self.grid = pomato.grid.GridTopology()
+        self.grid.calculate_parameters(self.data.nodes, self.data.lines)
+        self.contingency_analysis = pomato.grid.ContingencyAnalysis(self.grid)
+        injections = np.random.uniform(-100, 100, (3, len(self.grid.nodes)))
+        self.injections = injections - injections.mean(axis=1, keepdims=True)
+
+    def test_outage_sets(self):
+        contingencies = sum(self.grid.lines.contingency)
+        outage_sets = list(self.contingency_analysis.outage_sets(k=2))
+        self.assertEqual(len(outage_sets), contingencies*(contingencies - 1)/2)
+        
+        lodf = np.abs(self.grid.lodf)
+        for outage_set in self.contingency_analysis.outage_sets(k=3, sensitivity=0.1):
+            for line, outage in [(0, 1), (0, 2), (1, 2)]:
+                self.assertTrue(max(lodf[outage_set[line], outage_set[outage]],
+                                    lodf[outage_set[outage], outage_set[line]]) >= 0.1)
+
+    def test_n_1(self):
+        # N-1 worst case equals the maximum over the N-1 flows calculated with the lodf 
+        worst_case = self.contingency_analysis.worst_case_loading(self.injections, k=1, batch_size=50)
+        flow = np.dot(self.grid.ptdf, self.injections.T)
+        maxflow = self.grid.lines.maxflow.values[:, np.newaxis]
+        loading = np.max([np.abs(flow + self.grid.lodf[:, [o]]*flow[o])/maxflow 
+                          for o in np.flatnonzero(self.grid.lines.contingency)], axis=0)
+        np.testing.assert_allclose(worst_case.loading, np.max(loading, axis=1))
+        np.testing.assert_allclose(worst_case.n_0, np.max(np.abs(flow)/maxflow, axis=1))
+
+    def test_n_2(self):
+        worst_case = self.contingency_analysis.worst_case_loading(self.injections, k=2, sensitivity=0.2)
+        for line in random.sample(list(self.grid.lines.index), 10):
+            outages, timestep = worst_case.loc[line, ["outages", "timestep"]]
+            if not outages:
+                continue
+            line_idx = self.grid.lines.index.get_loc(line)
+            outages_idx = list(self.grid.lines.index.get_indexer(outages))
+            ptdf = self.grid.ptdf[line_idx] + np.dot(self.grid.create_lodf([line_idx], outages_idx), 
+                                                     self.grid.ptdf[outages_idx])
+            flow = np.dot(ptdf, self.injections[timestep]).item() if line not in outages else 0
+            self.assertAlmostEqual(abs(flow)/self.grid.lines.maxflow[line], worst_case.loc[line, "loading"])
+        
+        parallel = self.contingency_analysis.worst_case_loading(self.injections, k=2, sensitivity=0.2,
+                                                                batch_size=100, processes=2)
+        pd.testing.assert_frame_equal(worst_case, parallel)
+
+    def test_islanding(self):
+        # Outage of both lines connecting a node disconnects the network
+        connected_nodes = pd.concat([self.grid.lines.node_i, self.grid.lines.node_j]).value_counts()
+        node = connected_nodes.index[connected_nodes == 2][0]
+        lines = self.grid.lines.index[(self.grid.lines.node_i == node) | (self.grid.lines.node_j == node)]
+        outages = self.grid.lines.index.get_indexer(lines)
+        self.contingency_analysis.outage_sets = lambda k, sensitivity: iter([tuple(outages)])
+        worst_case = self.contingency_analysis.worst_case_loading(self.injections, k=2)
+        self.assertEqual(self.contingency_analysis.islanding_outages, [tuple(lines)])
+        self.assertTrue((worst_case.loading == 0).all())
+
+    def test_islanding_scale(self):
+        # A well-conditioned system with a small determinant is not islanding
+        node_i = self.grid.nodes.index.get_indexer(self.grid.lines.node_i)
+        node_j = self.grid.nodes.index.get_indexer(self.grid.lines.node_j)
+        incidence = (node_i, node_j, len(self.grid.nodes))
+        ptdf_incidence = self.grid.ptdf[:, node_i] - self.grid.ptdf[:, node_j]
+        outages = np.array(list(self.contingency_analysis.outage_sets(k=3, sensitivity=0.1)))
+        outages = outages[~pomato.grid.contingency_analysis.disconnecting_outages(outages, incidence)][:1]
+        ptdf_incidence[np.ix_(outages[0], outages[0])] = 0.995*np.eye(3)
+        flow = np.dot(self.grid.ptdf, self.injections.T)
+        maxflow = self.grid.lines.maxflow.values
+        self.assertTrue(np.linalg.det(np.eye(3) - ptdf_incidence[np.ix_(outages[0], outages[0])]) < 1e-6)
+        _, _, _, islanding = pomato.grid.contingency_analysis.evaluate_outages(outages, ptdf_incidence, 
+                                                                               flow, maxflow, incidence)
+        self.assertFalse(islanding[0])
@@ -29,6 +29,260 @@ class TestPomatoGrid(unittest.TestCase):
         self.assertFalse((self.grid.ptdf == np.nan).any())
         self.assertFalse((self.grid.lodf == np.nan).any())
 
+    def test_topology(self):
+        incidence = self.grid.create_incidence_matrix()
+        np.testing.assert_equal(incidence, self.grid.create_incidence_matrix(sparse=True).toarray())
+        for line in random.sample(list(self.grid.lines.index), 10):
+            self.assertEqual(incidence[self.grid.lines.index.get_loc(line),
+                                       self.grid.nodes.index.get_loc(self.grid.lines.node_i[line])], 1)
+            self.assertEqual(incidence[self.grid.lines.index.get_loc(line),
+                                       self.grid.nodes.index.get_loc(self.grid.lines.node_j[line])], -1)
+
+        for (node_i, node_j), lines in self.grid.lines.groupby(["node_i", "node_j"]):
+            self.assertTrue((self.grid.lines.systems[lines.index] == len(lines)).all())
+            self.assertEqual(list(self.grid.lines.no[lines.index]), list(range(0, len(lines))))
+            if len(lines) == 2 and all(self.grid.lines.contingency[lines.index]):
+                for line in lines.index:
+                    self.assertEqual(self.grid.combined_contingencies[line], list(lines.index))
+
+        # lines connected to nodes with only one line cannot be a contingency
+        radial_nodes = [node for node in self.grid.nodes.index 
+                        if sum((self.grid.lines.node_i == node) | (self.grid.lines.node_j == node)) < 2]
+        self.assertFalse(any(self.grid.lines.contingency[self.grid.lines.node_i.isin(radial_nodes)]))
+
+    def test_ptdf_sparse(self):
+        self.grid.options["grid"]["ptdf_method"] = "sparse"
+        ptdf_sparse = self.grid.create_ptdf_matrix()
+        self.grid.options["grid"]["ptdf_method"] = "dense"
+        np.testing.assert_allclose(ptdf_sparse, self.grid.create_ptdf_matrix(), atol=1e-10)
+
+    def test_lodf_closed_form(self):
+        lines = list(range(0, len(self.grid.lines)))
+        lodf = np.hstack([self.grid.create_lodf(lines, [outage]) for outage in lines])
+        np.testing.assert_allclose(self.grid.lodf, lodf, atol=1e-10)
+        contingency = self.grid.lines.contingency.values
+        self.assertTrue((self.grid.lodf[:, ~contingency] == 0).all())
+
+    def test_filtered_n_1_ptdf(self):
+        A, b, info = self.grid.create_filtered_n_1_ptdf(sensitivity=0.05)
+        contingencies = info[info.co != "basecase"]
+        for line in random.sample(list(self.grid.lines.index[self.grid.lines.contingency]), 10):
+            self.assertEqual(list(contingencies.co[contingencies.cb == line]),
+                             list(self.grid.lodf_filter(line, 0.05)))
+
+        # compare to explicitly calculated N-1 ptdf, including combined contingencies
+        for idx in contingencies.index:
+            cb, co = info.loc[idx, ["cb", "co"]]
+            outages = self.grid.lines.index.get_indexer(self.grid.combined_contingencies[co])
+            line = self.grid.lines.index.get_loc(cb)
+            lodf = self.grid.create_lodf([line], list(outages))
+            np.testing.assert_allclose(A[idx], self.grid.ptdf[line] + np.dot(lodf, self.grid.ptdf[outages])[0], 
+                                       atol=1e-10)
+        np.testing.assert_equal(b[:, 0], self.grid.lines.maxflow[info.cb].values)
+
+    def test_lodf_screening(self):
+        screening = self.grid.lodf_screening(0.05)
+        self.assertIs(self.grid.lodf_screening(0.05), screening)
+        self.assertEqual(screening.shape, (len(self.grid.lines), len(self.grid.lines)))
+        maxflow = self.grid.lines.maxflow.values
+        for line in random.sample(range(0, len(self.grid.lines)), 20):
+            condition = np.abs(self.grid.lodf[line]*maxflow) >= 0.05*maxflow[line]
+            np.testing.assert_equal(screening[line].toarray()[0], condition)
+            self.assertEqual(self.grid.lodf_filter(line, 0.05, as_index=True), list(np.flatnonzero(condition)))
+
+        # memoization is reset when the lodf changes
+        line = self.grid.lines.index[0]
+        with self.grid.switched_lines({line: self.grid.lines.b[line]*2}):
+            self.assertIsNot(self.grid.lodf_screening(0.05), screening)
+        self.assertIs(self.grid.lodf_screening(0.05), screening)
+
+        # and when the line capacities change
+        self.grid.lines.loc[self.grid.lines.index[0], "maxflow"] *= 100
+        changed_screening = self.grid.lodf_screening(0.05)
+        self.assertIsNot(changed_screening, screening)
+        condition = np.abs(self.grid.lodf[0]*self.grid.lines.maxflow.values) >= 0.05*self.grid.lines.maxflow.values[0]
+        np.testing.assert_equal(changed_screening[0].toarray()[0], condition)
+        self.assertEqual(len(self.grid._lodf_screening), 1)
+
+    def test_cbco_codes(self):
+        _, _, info = self.grid.create_filtered_n_1_ptdf(sensitivity=0.05)
+        codes = self.grid.cbco_codes(info.cb, info.co)
+        self.assertEqual(len(np.unique(codes)), len(info))
+        self.assertTrue(np.all(codes >= 0))
+        self.assertEqual(list(self.grid.cbco_labels(codes)), list(info.cb + "_" + info.co))
+        self.assertEqual(list(self.grid.cbco_labels(codes[::-1])), list((info.cb + "_" + info.co)[::-1]))
+
+        lines = self.grid.lines.index
+        codes = self.grid.cbco_codes([lines[1], lines[1], "no_line", lines[1]], 
+                                     ["basecase", lines[0], lines[0], "no_line"])
+        self.assertEqual(list(codes), [len(lines) + 1, len(lines) + 2, -1, -1])
+
+    def test_iterate_n_1_ptdf(self):
+        A, _, info = self.grid.create_filtered_n_1_ptdf(sensitivity=0.05)
+        blocks = list(self.grid.iterate_n_1_ptdf(sensitivity=0.05, block_size=500))
+        self.assertTrue(all(len(ptdf) <= 500 for ptdf, _, _ in blocks))
+        np.testing.assert_equal(np.vstack([ptdf for ptdf, _, _ in blocks]), A)
+        self.assertEqual(sum([cb for _, cb, _ in blocks], []), list(info.cb))
+        self.assertEqual(sum([co for _, _, co in blocks], []), list(info.co))
+
+        cb, co = list(info.cb[-10:]), list(info.co[-10:])
+        ptdf, _, _ = next(self.grid.iterate_n_1_ptdf(cbco=(cb, co)))
+        np.testing.assert_equal(ptdf, A[-10:])
+
+    def test_float32(self):
+        self.options["grid"]["dtype"] = "float32"
+        grid = pomato.grid.GridTopology(self.options)
+        grid.calculate_parameters(self.data.nodes, self.data.lines)
+        for matrix in [grid.ptdf, grid.psdf, grid.lodf]:
+            self.assertEqual(matrix.dtype, np.float32)
+        A, _, _ = grid.create_filtered_n_1_ptdf(sensitivity=0.05)
+        self.assertEqual(A.dtype, np.float32)
+        np.testing.assert_allclose(grid.ptdf, self.grid.ptdf, atol=1e-6)
+
+        injections = np.random.uniform(-100, 100, (5, len(grid.nodes)))
+        injections -= injections.mean(axis=1, keepdims=True)
+        deviation = grid.precision_deviation(injections)
+        self.assertTrue(0 < deviation.n_0 < 1e-2 and deviation.n_1 < 1e-2)
+        self.assertTrue(deviation.n_1_relative < 1e-4)
+
+    def test_phase_shift(self):
+        ptdf, lodf = self.grid.ptdf.copy(), self.grid.lodf.copy()
+        lines = random.sample(list(self.grid.lines.index), 3)
+        phase_shift = {line: random.uniform(-0.1, 0.1) for line in lines}
+
+        shift = np.zeros(len(self.grid.lines))
+        shift[self.grid.lines.index.get_indexer(lines)] = list(phase_shift.values())
+        shifted_ptdf = ptdf + np.dot(self.grid.psdf * shift, ptdf)
+
+        self.grid.shift_phase_on_line(phase_shift)
+        np.testing.assert_allclose(self.grid.ptdf, shifted_ptdf, atol=1e-10)
+        np.testing.assert_allclose(self.grid.lodf, self.grid.create_n_1_lodf_matrix(), atol=1e-8)
+
+        self.grid.undo_phase_shift()
+        np.testing.assert_allclose(self.grid.ptdf, ptdf, atol=1e-10)
+        np.testing.assert_allclose(self.grid.lodf, lodf, atol=1e-8)
+
+        # batch of phase shifts equals shifting each individually
+        injections = np.random.uniform(-100, 100, len(self.grid.nodes))
+        injections -= injections.mean()
+        phase_shifts = pd.DataFrame(np.random.uniform(-0.1, 0.1, (5, 3)), columns=lines)
+        flows = self.grid.phase_shift_flows(injections, phase_shifts)
+        for case in phase_shifts.index:
+            self.grid.shift_phase_on_line(phase_shifts.loc[case].to_dict())
+            np.testing.assert_allclose(flows[case], np.dot(self.grid.ptdf, injections), atol=1e-8)
+            self.grid.undo_phase_shift()
+
+    def test_switch_lines(self):
+        contingencies = list(self.grid.lines.index[self.grid.lines.contingency])
+        upgrade = {line: self.grid.lines.b[line]*2 for line in random.sample(contingencies, 2)}
+        switch_off = {random.choice(contingencies): 0}
+        ptdf, lodf, b = self.grid.ptdf.copy(), self.grid.lodf.copy(), self.grid.lines.b.copy()
+
+        for susceptance in [upgrade, switch_off, {**upgrade, **switch_off}]:
+            self.data.load_data('data_input/pglib_opf_case118_ieee.m')
+            self.data.lines.loc[list(susceptance), "b"] = list(susceptance.values())
+            grid = pomato.grid.GridTopology()
+            grid.calculate_parameters(self.data.nodes, self.data.lines)
+            contingency = (grid.lines.contingency & (grid.lines.b != 0)).values
+            
+            switched_ptdf, switched_lodf = self.grid.switch_lines(susceptance)
+            np.testing.assert_allclose(switched_ptdf, grid.ptdf, atol=1e-8)
+            np.testing.assert_allclose(switched_lodf[:, contingency], grid.lodf[:, contingency], atol=1e-8)
+            with self.grid.switched_lines(susceptance):
+                np.testing.assert_allclose(self.grid.ptdf, grid.ptdf, atol=1e-8)
+                np.testing.assert_allclose(self.grid.psdf, grid.psdf, atol=1e-8)
+                self.assertEqual(list(self.grid.lines.contingency), list(contingency))
+            np.testing.assert_equal(self.grid.ptdf, ptdf)
+            np.testing.assert_equal(self.grid.lodf, lodf)
+            pd.testing.assert_series_equal(self.grid.lines.b, b)
+
+        radial_line = self.grid.lines.index[~self.grid.lines.contingency][0]
+        self.assertRaises(ZeroDivisionError, self.grid.switch_lines, {radial_line: 0})
+
+    def test_multiple_components(self):
+        # Two copies of the network, the second without slack
+        nodes, lines = self.data.nodes.copy(), self.data.lines.copy()
+        island_nodes, island_lines = nodes.copy(), lines.copy()
+        island_nodes.index = island_nodes.index + "_island"
+        island_nodes["slack"] = False
+        island_lines.index = island_lines.index + "_island"
+        island_lines[["node_i", "node_j"]] = island_lines[["node_i", "node_j"]] + "_island"
+        
+        self.options["grid"]["processes"] = 2
+        grid = pomato.grid.GridTopology(self.options)
+        grid.calculate_parameters(pd.concat([nodes, island_nodes]), pd.concat([lines, island_lines]))
+        self.assertEqual(len(np.unique(grid.node_components)), 2)
+        self.assertEqual(sum(grid.nodes.slack), 2)
+
+        N, L = len(nodes), len(lines)
+        np.testing.assert_allclose(grid.ptdf[:L, :N], self.grid.ptdf, atol=1e-10)
+        np.testing.assert_allclose(grid.lodf[:L, :L], self.grid.lodf, atol=1e-10)
+        self.assertFalse(grid.ptdf[:L, N:].any() or grid.ptdf[L:, :N].any())
+        self.assertFalse(grid.lodf[:L, L:].any() or grid.lodf[L:, :L].any())
+        # the island's ptdf equals the original ptdf with the first node as slack 
+        self.data.nodes.slack = False
+        self.data.nodes.loc[self.data.nodes.index[0], "slack"] = True
+        self.grid.calculate_parameters(self.data.nodes, self.data.lines)
+        np.testing.assert_allclose(grid.ptdf[L:, N:], self.grid.ptdf, atol=1e-10)
+
+        slack_zones = grid.slack_zones()
+        self.assertEqual(set(slack_zones), set(grid.nodes.index[grid.nodes.slack]))
+        for slack, slack_zone in slack_zones.items():
+            self.assertEqual(set(slack_zone), 
+                             set(grid.nodes.index[grid.node_components == grid.node_components[grid.nodes.index.get_loc(slack)]]))
+        slack_zones_index = grid.slack_zones_index()
+        self.assertEqual(len(slack_zones_index), 3)
+        self.assertEqual(slack_zones_index[-1], list(range(0, 2*N)))
+
+    def test_topology_cache(self):
+        cache_folder = self.wdir.joinpath("data_temp/grid_cache")
+        shutil.rmtree(cache_folder, ignore_errors=True)
+        self.data.load_data('data_input/pglib_opf_case118_ieee.m')
+        grid = pomato.grid.GridTopology(self.options, self.wdir)
+        grid.calculate_parameters(self.data.nodes, self.data.lines)
+        topology_hash = grid.topology_hash
+        self.assertTrue(cache_folder.joinpath(topology_hash).is_dir())
+
+        self.data.load_data('data_input/pglib_opf_case118_ieee.m')
+        cached_grid = pomato.grid.GridTopology(self.options, self.wdir)
+        with patch.object(cached_grid, "create_ptdf_matrix") as create_ptdf_matrix:
+            cached_grid.calculate_parameters(self.data.nodes, self.data.lines)
+            create_ptdf_matrix.assert_not_called()
+        self.assertIsInstance(cached_grid.ptdf, np.memmap)
+        np.testing.assert_equal(cached_grid.ptdf, grid.ptdf)
+        np.testing.assert_equal(cached_grid.psdf, grid.psdf)
+        np.testing.assert_equal(cached_grid.lodf, grid.lodf)
+        self.assertEqual(list(cached_grid.lines.contingency), list(grid.lines.contingency))
+
+        # the same lines, with contingencies already set by the topology check, hit the cache
+        same_process_grid = pomato.grid.GridTopology(self.options, self.wdir)
+        with patch.object(same_process_grid, "create_ptdf_matrix") as create_ptdf_matrix, \
+                patch.object(same_process_grid, "create_n_1_lodf_matrix") as create_n_1_lodf_matrix:
+            same_process_grid.calculate_parameters(self.data.nodes, self.data.lines)
+            create_ptdf_matrix.assert_not_called()
+            create_n_1_lodf_matrix.assert_not_called()
+        self.assertEqual(same_process_grid.topology_hash, topology_hash)
+
+        # other contingencies only recalculate the lodf
+        self.data.lines.loc[self.data.lines.contingency, "contingency"] = \
+            [False] + [True]*(self.data.lines.contingency.sum() - 1)
+        contingency_grid = pomato.grid.GridTopology(self.options, self.wdir)
+        with patch.object(contingency_grid, "create_ptdf_matrix") as create_ptdf_matrix:
+            contingency_grid.calculate_parameters(self.data.nodes, self.data.lines)
+            create_ptdf_matrix.assert_not_called()
+        self.assertEqual(contingency_grid.topology_hash, topology_hash)
+        np.testing.assert_allclose(contingency_grid.lodf, contingency_grid.create_n_1_lodf_matrix(), atol=1e-6)
+        self.assertFalse(np.array_equal(contingency_grid.lodf, grid.lodf))
+        self.assertEqual(len(list(cache_folder.joinpath(topology_hash).glob("lodf_*.npy"))), 2)
+
+        # changing the topology invalidates the cache, size based eviction removes old entries
+        self.data.lines.loc[self.data.lines.index[0], "b"] *= 2
+        self.options["grid"]["topology_cache"]["max_size"] = 0
+        grid.calculate_parameters(self.data.nodes, self.data.lines)
+        self.assertNotEqual(grid.topology_hash, topology_hash)
+        self.assertFalse(cache_folder.joinpath(topology_hash).is_dir())
+        shutil.rmtree(cache_folder, ignore_errors=True)
+
     def nodal_balance(self, flow, inj):
         A = self.grid.create_incidence_matrix()
         nodal_balance = np.dot(flow, A) - inj
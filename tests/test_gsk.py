@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from context import pomato
+from pomato.grid import gsk as gsk_module
+from pomato.grid.gsk import generation_shift_keys, zonal_ptdf
+
+def loop_gsk(nodes, zones, plants, option, fill_empty_zones):
+    """Per zone gsk, as previously created by GridModel/FBMCModule.create_gsk."""
+    gsk = pd.DataFrame(index=nodes.index)
+    gmax_per_node = plants[["g_max", "node"]].groupby("node").sum()
+    for zone in zones:
+        nodes_in_zone = nodes.index[nodes.zone == zone]
+        gsk[zone] = 0
+        gmax_in_zone = gmax_per_node[gmax_per_node.index.isin(nodes_in_zone)]
+        if option == "gmax":
+            if not gmax_in_zone.empty:
+                gsk_value = gmax_in_zone.g_max/gmax_in_zone.values.sum()
+                gsk.loc[gsk.index.isin(gmax_in_zone.index), zone] = gsk_value
+            elif fill_empty_zones:
+                gsk.loc[gsk.index.isin(nodes_in_zone), zone] = 1/len(nodes_in_zone)
+        elif option == "flat":
+            gsk.loc[gsk.index.isin(nodes_in_zone), zone] = 1/len(nodes_in_zone)
+    return gsk.values
+
+# pylint: disable-msg=E1101
+class TestGSK(unittest.TestCase):
+    def setUp(self):
+        gsk_module._GSK_CACHE.clear()
+        self.zones = pd.Index(["z1", "z2", "z3"])
+        # z3 has no plants, n6 is in a zone that is not part of the gsk
+        self.nodes = pd.DataFrame(index=["n1", "n2", "n3", "n4", "n5", "n6"],
+                                  data={"zone": ["z1", "z1", "z2", "z2", "z3", "z4"]})
+        self.plants = pd.DataFrame(index=["p1", "p2", "p3", "p4", "p5"],
+                                   data={"node": ["n1", "n1", "n2", "n4", "n6"],
+                                         "g_max": [100., 50., 50., 20., 10.]})
+
+    def test_gsk_equals_loop(self):
+        for fill_empty_zones in [False, True]:
+            gsk = generation_shift_keys(self.nodes, self.zones, self.plants,
+                                        fill_empty_zones=fill_empty_zones)
+            for option in ["flat", "gmax"]:
+                self.assertTrue(sp.isspmatrix_csr(gsk[option]))
+                np.testing.assert_allclose(gsk[option].toarray(),
+                                           loop_gsk(self.nodes, self.zones, self.plants,
+                                                    option, fill_empty_zones))
+
+    def test_gsk_values(self):
+        gsk = generation_shift_keys(self.nodes, self.zones, self.plants)
+        np.testing.assert_allclose(gsk["gmax"].toarray()[:, 0], [0.75, 0.25, 0, 0, 0, 0])
+        np.testing.assert_allclose(gsk["gmax"].toarray()[:, 1], [0, 0, 0, 1, 0, 0])
+        self.assertEqual(gsk["gmax"][:, 2].nnz, 0)
+        np.testing.assert_allclose(gsk["flat"].sum(axis=0), [[1, 1, 1]])
+        # nodes outside of the zones are not part of the gsk
+        self.assertEqual(gsk["flat"][5].nnz, 0)
+
+    def test_gsk_cache(self):
+        gsk = generation_shift_keys(self.nodes, self.zones, self.plants)
+        self.assertIs(generation_shift_keys(self.nodes, self.zones, self.plants.copy()), gsk)
+        self.assertIsNot(generation_shift_keys(self.nodes, self.zones, self.plants,
+                                               fill_empty_zones=True), gsk)
+
+        plants = self.plants.copy()
+        plants.loc["p1", "g_max"] = 50
+        gsk_changed = generation_shift_keys(self.nodes, self.zones, plants)
+        self.assertIsNot(gsk_changed, gsk)
+        np.testing.assert_allclose(gsk_changed["gmax"].toarray()[:2, 0], [2/3, 1/3])
+
+        nodes = self.nodes.copy()
+        nodes.loc["n3", "zone"] = "z1"
+        gsk_changed = generation_shift_keys(nodes, self.zones, self.plants)
+        np.testing.assert_allclose(gsk_changed["flat"].toarray()[:3, 0], [1/3, 1/3, 1/3])
+
+        for i in range(gsk_module._GSK_CACHE_SIZE + 1):
+            plants.loc["p1", "g_max"] = i + 1
+            generation_shift_keys(self.nodes, self.zones, plants)
+        self.assertEqual(len(gsk_module._GSK_CACHE), gsk_module._GSK_CACHE_SIZE)
+
+    def test_zonal_ptdf(self):
+        gsk = generation_shift_keys(self.nodes, self.zones, self.plants)["gmax"]
+        ptdf = np.random.default_rng(0).uniform(-1, 1, size=(10, len(self.nodes)))
+        for dtype in [np.float64, np.float32]:
+            result = zonal_ptdf(ptdf.astype(dtype), gsk)
+            self.assertEqual(result.dtype, dtype)
+            self.assertTrue(result.flags["C_CONTIGUOUS"])
+            np.testing.assert_allclose(result, np.dot(ptdf, gsk.toarray()), rtol=1e-6)
+            np.testing.assert_allclose(result, zonal_ptdf(ptdf.astype(dtype), gsk.toarray()), rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
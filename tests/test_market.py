@@ -57,6 +57,59 @@ class TestPomatoMarketModel(unittest.TestCase):
             self.assertTrue(self.market_model.data_dir.joinpath(f'{data}.csv').is_file())
         self.assertTrue(self.market_model.data_dir.joinpath('options.json').is_file())
 
+    def test_save_essential_sets(self):
+        self.grid_model.options["optimization"]["type"] = "ntc"
+        self.grid_model.create_grid_representation()
+        essential_sets = pd.Series([0, 0, 1], index=pd.Index(["t0001", "t0002", "t0003"], name="timestep"), 
+                                   name="essential_set")
+        self.grid_model.grid_representation.timestep_essential_sets = essential_sets
+        self.market_model.update_data()
+        exported = pd.read_csv(self.market_model.data_dir.joinpath("grid_essential_sets.csv"), index_col=0)
+        pd.testing.assert_series_equal(exported.essential_set, essential_sets)
+
+    def test_zonal_redispatch_grids(self):
+        # split the single zone of the case in two
+        self.data.nodes.loc[self.data.nodes.index[:59], "zone"] = "z2"
+        self.options["optimization"]["type"] = "ntc"
+        self.options["optimization"]["redispatch"].update({"include": True, "zonal_redispatch": True, 
+                                                           "zones": ["z1", "z2"]})
+        self.options["optimization"]["redispatch"]["zonal_grid"]["include"] = True
+        self.grid_model.create_grid_representation()
+        self.market_model.update_data()
+        for zone in ["z1", "z2"]:
+            grid = pd.read_csv(self.market_model.data_dir.joinpath(f"redispatch_grid_{zone}.csv"), index_col=0)
+            self.assertTrue(all((grid.zone_i == zone) | (grid.zone_j == zone)))
+            self.assertTrue(0 < len(grid) < len(self.data.lines))
+
+    def test_sparse_grid(self):
+        self.options["optimization"]["type"] = "nodal"
+        self.options["optimization"]["redispatch"]["include"] = True
+        self.options["optimization"]["sparse_grid"] = {"include": True, "threshold": 1e-2}
+        self.grid_model.create_grid_representation()
+        self.market_model.update_data()
+
+        nodes = self.data.nodes.index
+        limits = self.grid_model.grid_representation.nodal_injection_limits.values
+        injection = limits*np.random.default_rng(0).choice([-1, 1], size=len(limits))
+        for name in ["grid", "redispatch_grid"]:
+            grid = getattr(self.grid_model.grid_representation, name)
+            ptdf = pd.read_csv(self.market_model.data_dir.joinpath(f"{name}_ptdf.csv"))
+            self.assertTrue(all(ptdf.value.abs() >= 1e-2))
+            ptdf = ptdf.pivot(index="row", columns="node", values="value")
+            ptdf = ptdf.reindex(index=range(0, len(grid)), columns=nodes).fillna(0)
+            np.testing.assert_allclose(ptdf.values, np.where(np.abs(grid[nodes].values) >= 1e-2, 
+                                                             grid[nodes].values, 0))
+            exported_grid = pd.read_csv(self.market_model.data_dir.joinpath(f"{name}.csv"), index_col=0)
+            self.assertFalse(exported_grid.columns.isin(nodes).any())
+            np.testing.assert_allclose(exported_grid.ram.values, grid.ram.values)
+
+            # the flow error of injections within the nodal injection limits is bounded by the report
+            threshold_error = pd.read_csv(self.market_model.data_dir.joinpath(f"{name}_threshold_error.csv"), 
+                                          index_col=0)
+            flow_error = np.abs(np.dot(grid[nodes].values - ptdf.values, injection))
+            self.assertTrue(np.all(flow_error <= threshold_error.error.values + 1e-6))
+            self.assertTrue(threshold_error.error.max() > 0)
+
     def test_market_model_run(self):
         prepared_result = self.wdir.parent.joinpath('tests/test_data/dispatch_result/')
         to_folder = self.wdir.joinpath('data_temp/julia_files/results/dispatch_result') 